@@ -1,20 +1,31 @@
+import asyncio
 import logging
+import threading
 from enum import StrEnum
 from typing import Literal
 
 import discord
-import re2
 from Levenshtein import ratio
 from discord import ForumChannel
 from discord_py_utilities.messages import send_message
 
+from classes.discordcontrollers.forum.AutoModExecutor import AutoModExecutor
+from classes.discordcontrollers.forum.AutoModPipeline import AutoModContext, AutoModPipeline, AutoModStage
+from classes.discordcontrollers.forum.ForumRuleSet import ForumRuleSet
+from classes.discordcontrollers.forum.VerdictCache import VerdictCache
 from classes.kernel.AccessControl import AccessControl
 from classes.kernel.ConfigData import ConfigData
 from classes.kernel.Queue import Queue
+from classes.support.MinHash import MinHashIndex
+from classes.support.Normalizer import NormalizedText, Normalizer
 from classes.support.singleton import Singleton
+from data.enums.DuplicateScopes import DuplicateScopes
 from data.enums.PatternTypes import ForumPatterns
+from database.database import Forums, ThreadFingerprints
+from database.transactions.FingerprintTransactions import FingerprintTransactions
 from database.transactions.ForumTransactions import ForumTransactions
 from resources.configs.ConfigMapping import ConfigMapping
+from resources.configs.Performance import AUTOMOD_TIMEOUT_ACTION, AUTOMOD_VERDICT_CACHE_SIZE, QUEUE_NOTIFICATION_TTL
 from views.v2.AutomodLayout import AutomodLayout
 
 
@@ -27,55 +38,91 @@ class AutoModActions(StrEnum) :
 	DUPLICATE = "DUPLICATE"  # For messages that are duplicates of previous messages in the thread, this provides a specific message to the user about not posting duplicate content.
 
 
+# These actions remove the message (or the whole thread when it's the starter message).
+REMOVAL_ACTIONS = [AutoModActions.BLOCK, AutoModActions.REQUIRED, AutoModActions.SHORT, AutoModActions.DUPLICATE]
+# What the executor returns instead of a verdict when the checks ran out of time or raised.
+TIMED_OUT = object()
+FAILED = object()
+
+
 # TODO: write special documentation for the automod system, explaining how it works and how to set it up, as well as best practices for using it. This should be done after the initial implementation is complete, and should be updated as new features are added to the automod system.
 class AutoMod(metaclass=Singleton) :
-	_cache = {}
+	# The ids of all forums with automod, this is checked for every message the bot receives so it has to be a set.
+	watched: set[int] = set()
+	_rules: dict[int, ForumRuleSet] = {}
+	# The duplicate index per forum, these are only built for forums that check for duplicates.
+	_duplicates: dict[int, MinHashIndex] = {}
+	_index_lock = threading.Lock()
+	# every index uses the same permutations, this one is only used to sign the fingerprints that are stored.
+	signer = MinHashIndex()
+	# The forums whose existing threads have been fingerprinted, and the backfills that are still running.
+	_backfilled: set[int] = set()
+	_backfills: dict[int, asyncio.Task] = {}
+	verdicts = VerdictCache(AUTOMOD_VERDICT_CACHE_SIZE)
 
 	messages = {
 
 	}
 
 	def __init__(self) :
-		pass
+		# The stages run in this order until enough has been measured to order them per forum, the staff bypass always runs first.
+		# New checks (for example a title check) can be added as a stage.
+		self.pipeline = AutoModPipeline([
+			AutoModStage("staff", lambda context : (self.is_staff(context.message.author), ""), cost=0.1, pinned=True),
+			AutoModStage("length", lambda context : self.check_min_length(context.message, context.rules), cost=0.1),
+			AutoModStage("blacklist", lambda context : self.check_blacklist(context.content, context.rules), cost=1.0),
+			# Block, warn and required patterns are matched in a single scan; required patterns are only enforced on the first message of the thread.
+			AutoModStage("patterns", lambda context : self.check_patterns(context.message.content, context.rules,
+			                                                              context.message.id == context.thread.id),
+			             cost=2.0, premium=True),
+			AutoModStage("duplicate", lambda context : self.check_duplicate(context.content, context.message, context.thread, context.rules),
+			             cost=5.0, premium=True),
+		])
 
 	# == automod ==
 
-	# future: Add a way for titles to be checked - not right now.
-
-	async def run(self, message: discord.Message) :
-		"""This function will run the auto moderation checks on the thread."""
+	async def run(self, message: discord.Message) -> str | None :
+		"""This function will run the auto moderation checks on the thread and returns the action that was taken."""
 		# check if we should activate the automoderation for this message, if not, return early to save resources.
-		action: str | None = None
-		reason = ""
 		thread = message.channel
 		forum = self.is_enabled(thread)
 		if not forum or not thread :
 			return
+		rules = self.get_rules(forum.id)
+		if rules is None :
+			return
 		premium_status = AccessControl().is_premium(forum.guild.id)
-
-
-		action = self.is_staff(message.author)
-		# logging.info(f"staff check disabled")
-		# check simple blacklist first, as this is the least resource intensive check, and if it hits, we can skip the more resource intensive regex checks.
-
-		if not action :
-			action, reason = self.check_min_length(message, forum)
-		if not action :
-			action, reason = self.check_blacklist(message, forum)
-		# Blocks defined pattern
-		if not action and premium_status :
-			action, reason = self.check_patterns(message.content, forum, ForumPatterns.block)
-		# sends a warning when detected, but allows the message to go through.
-		if not action and premium_status :
-			action, reason = self.check_patterns(message.content, forum, ForumPatterns.warn)
-		# requires a pattern to be included in the message, if not, the message is blocked. Only checks the first message of the thread.
-		if not action and premium_status and message.id == thread.id :
-			action, reason = self.check_required_patterns(message.content, forum)
-		if not action and premium_status:
-			action, reason = await self.check_duplicate(message, thread, forum)
+		# Edits that didn't change the content (or the rules) already have a verdict, which has already been acted on.
+		signature = self.verdicts.signature(message.content, rules.version, premium_status)
+		verdict = self.verdicts.get(message.id, signature)
+		if verdict is not None :
+			return verdict[0]
+		# The checks themselves are CPU bound, they run in the executor so a burst of long posts can't block the event loop.
+		verdict = await AutoModExecutor().run(self.evaluate, message, thread, rules, premium_status, fallback=TIMED_OUT, failure=FAILED)
+		# a message that couldn't be checked isn't cached, an edit is checked again.
+		if verdict is TIMED_OUT :
+			action, reason = self.unchecked_verdict("could not finish checking this message in time")
+		elif verdict is FAILED :
+			action, reason = self.unchecked_verdict("ran into an error while checking this message")
+		else :
+			action, reason = verdict
+			self.verdicts.put(message.id, signature, verdict)
 		# the final judgement
 		logging.info(f"final action: {action}, reason: {reason}")
 		await self.check_action(message, thread, forum, action, reason)
+		return action
+
+	def evaluate(self, message: discord.Message, thread: discord.Thread, rules: ForumRuleSet, premium_status: bool) -> tuple[str | None, str | None] :
+		"""Runs the checks through the pipeline, this runs outside the event loop so it may not await anything."""
+		# The content is normalized once here, the blacklist and duplicate checks read the same view. Patterns are matched against the raw content.
+		return self.pipeline.run(AutoModContext(message, thread, rules, premium_status, Normalizer.normalize(message.content)))
+
+	@staticmethod
+	def unchecked_verdict(problem: str) -> tuple[str | None, str | None] :
+		"""The verdict for a message that couldn't be checked, because the time budget ran out or the checks failed."""
+		if AUTOMOD_TIMEOUT_ACTION == "REVIEW" :
+			return AutoModActions.WARN, f"AutoMod {problem}, please review it manually."
+		return None, None
 
 	def is_enabled(self, channel: discord.ForumChannel | discord.Thread) -> bool | ForumChannel :
 		"""This checks if the automoderation is enabled for the forum."""
@@ -83,74 +130,55 @@ class AutoMod(metaclass=Singleton) :
 			channel = channel.parent
 		if not isinstance(channel, discord.ForumChannel) :
 			return False
-		if channel.id not in self.fetch_cache(channel.guild.id) :
+		if channel.id not in self.watched :
 			return False
 		return channel
 
-	def check_min_length(self, message: discord.Message, forum: discord.ForumChannel) :
+	def check_min_length(self, message: discord.Message, rules: ForumRuleSet) :
 		"""This checks if the message meets the minimum length requirement."""
-		min_chars = ForumTransactions().get(forum.id).minimum_characters
+		min_chars = rules.minimum_characters
 		if min_chars == 0 :
 			return None, None
 		if len(message.content) < min_chars :
 			return AutoModActions.SHORT, f"Your message does not meet the minimum character requirement of {min_chars} characters."
 		return None, None
 
-	def check_blacklist(self, message: discord.Message, forum: discord.ForumChannel) -> tuple[Literal[
+	def check_blacklist(self, content: NormalizedText, rules: ForumRuleSet) -> tuple[Literal[
 		AutoModActions.BLOCK], str] | tuple[None, None] :
-		"""This checks if the message contains any blacklisted words."""
-		blacklisted_words = ForumTransactions().get_patterns_by_type(forum.id, ForumPatterns.blacklist)
-		for word in blacklisted_words :
-			if word.pattern.lower() in message.content.lower() :
-				logging.info(f"blacklisted word {word.pattern.lower()}")
-				return AutoModActions.BLOCK, f"Your message contains a blacklisted word: `{word.pattern}`"
-		return None, None
-
-	def check_patterns(self, content: list[str, str], forum: discord.ForumChannel,
-	                   pattern_type: ForumPatterns | str) -> None | tuple[Literal[AutoModActions.BLOCK], str] | tuple[
-		Literal[AutoModActions.WARN], str] | tuple[None, None] :
-		"""This checks all the patterns for the forum and returns the action that should be taken."""
-		try :
-			patterns = ForumTransactions().get_patterns_by_type(forum.id, pattern_type)
-			if not patterns or len(patterns) < 1 :
-				return None, None
-			options = re2.Options()
-			options.case_sensitive = False
-			regex = re2.compile(r"|".join([pattern.pattern for pattern in patterns]), options=options)
-			result = regex.search(content)
-			if result :
-				match pattern_type :
-					case ForumPatterns.warn :
-						return AutoModActions.WARN, f"This message triggered a content warning: `{result.group(0)}`, please check if the message breaks server policy."
-					case _ :
-						logging.info("blocking message")
-						return AutoModActions.BLOCK, f"Your message contains content that is not allowed: `{result.group(0)}` "
-
-		except re2.error as e :
-			logging.warning(e, exc_info=True)
+		"""This checks if the message contains any blacklisted words, obfuscated words like `ѕ*p*a​m` are found through the normalized text."""
+		hits = rules.blacklist.search(content.text, folded=True)
+		if not hits :
 			return None, None
-		return None, None
-
-	def check_required_patterns(self, content: str, forum: discord.ForumChannel) -> tuple[Literal[
-		AutoModActions.REQUIRED], str] | tuple[None, None] :
-		"""This checks all the required patterns for the forum and returns whether the message should be blocked or not, along with a message to the user about what they need to include in their message."""
-
-		pattern_type = ForumPatterns.required
-		patterns = ForumTransactions().get_patterns_by_type(forum.id, pattern_type)
-		options = re2.Options()
-		options.case_sensitive = False
-		for pattern in patterns :
-
-			regex = re2.compile(rf"{pattern.pattern}", options=options)
-			result = regex.search(content)
-			if result :
+		words = list(dict.fromkeys(hit.word for hit in hits))
+		logging.info(f"blacklisted words {', '.join(words)} (written as {', '.join([content.original_span(hit.start, hit.end) for hit in hits])})")
+		return AutoModActions.BLOCK, f"Your message contains blacklisted words: {', '.join([f'`{word}`' for word in words])}"
+
+	def check_patterns(self, content: str, rules: ForumRuleSet, first_message: bool = True) -> tuple[Literal[
+		AutoModActions.BLOCK, AutoModActions.WARN, AutoModActions.REQUIRED], str] | tuple[None, None] :
+		"""This matches all the patterns for the forum in one pass and returns the action that should be taken.
+
+		Blocked patterns take precedence over warnings, warnings take precedence over missing required content. The patterns are written by the server against the message as it's written, so they're matched against the raw content; only the case is ignored."""
+		hits = rules.patterns.match(content)
+		if hits :
+			logging.info(f"patterns fired in forum {rules.forum_id}: {', '.join([rule.name for rule in hits])}")
+		for rule in hits :
+			if rule.action == ForumPatterns.block :
+				return AutoModActions.BLOCK, f"Your message contains content that is not allowed: `{rules.patterns.matched_text(rule, content)}` (rule: `{rule.name}`)"
+		for rule in hits :
+			if rule.action == ForumPatterns.warn :
+				return AutoModActions.WARN, f"This message triggered a content warning: `{rules.patterns.matched_text(rule, content)}` (rule: `{rule.name}`), please check if the message breaks server policy."
+		if not first_message :
+			return None, None
+		for rule in rules.required :
+			if rule in hits :
 				continue
-			return AutoModActions.REQUIRED, f"Your message is missing required content: `{regex.pattern}`"
+			logging.info(f"required pattern missing in forum {rules.forum_id}: {rule.name}")
+			return AutoModActions.REQUIRED, f"Your message is missing required content: `{rule.pattern}` (rule: `{rule.name}`)"
 		return None, None
 
 	async def check_action(self, message, thread, forum, action, reason="") :
 		"""This checks the action that should be taken for the message."""
-		log = await ConfigData().get_channel(forum.guild.id, ConfigMapping.AUTOMOD_LOG, optional=True)
+		log = await ConfigData().get_channel(forum.guild, ConfigMapping.AUTOMOD_LOG, optional=True)
 		match action :
 			case AutoModActions.BLOCK :
 				embed = AutomodLayout(
@@ -159,10 +187,12 @@ class AutoMod(metaclass=Singleton) :
 					title=thread.name,
 					content=message.content,
 				)
-				Queue().add(send_message(message.author, f" ", view=embed))
+				Queue().add(send_message, message.author, f" ", view=embed, priority=2, bucket=message.author.id,
+				            guild=thread.guild.id, key=("automod-dm", message.id), ttl=QUEUE_NOTIFICATION_TTL)
 				if log :
-					Queue().add(
-						send_message(log, f"Message by {message.author.mention} was blocked in `{thread.name}`", view=embed))
+					Queue().add(send_message, log, f"Message by {message.author.mention} was blocked in `{thread.name}`",
+					            view=embed, priority=2, bucket=log.id, guild=thread.guild.id, key=("automod-log", message.id),
+					            ttl=QUEUE_NOTIFICATION_TTL)
 
 				if message.id == thread.id :
 
@@ -177,14 +207,15 @@ class AutoMod(metaclass=Singleton) :
 					title=thread.name,
 					content=message.content,
 				)
-				override = ConfigData().get_channel(forum.guild.id, ConfigMapping.AUTOMOD_WARN_LOG, optional=True)
+				override = await ConfigData().get_channel(forum.guild, ConfigMapping.AUTOMOD_WARN_LOG, optional=True)
 				if override :
 					log = override
 				if not log :
 					return None
-				Queue().add(send_message(log,
-				                         f"Message by {message.author.mention} triggered a content warning in `{thread.name}` but was not blocked, please check if the message breaks server policy.",
-				                         view=embed))
+				Queue().add(send_message, log,
+				            f"Message by {message.author.mention} triggered a content warning in `{thread.name}` but was not blocked, please check if the message breaks server policy.",
+				            view=embed, priority=2, bucket=log.id, guild=thread.guild.id, key=("automod-log", message.id),
+				            ttl=QUEUE_NOTIFICATION_TTL)
 
 				return None
 			case AutoModActions.ALLOW :
@@ -197,11 +228,12 @@ class AutoMod(metaclass=Singleton) :
 					title=thread.name,
 					content=message.content,
 				)
-				Queue().add(send_message(message.author, f" ", view=embed))
+				Queue().add(send_message, message.author, f" ", view=embed, priority=2, bucket=message.author.id,
+				            guild=thread.guild.id, key=("automod-dm", message.id), ttl=QUEUE_NOTIFICATION_TTL)
 				if log :
-					Queue().add(
-						send_message(log, f"Message by {message.author.mention} did not meet the requirements in `{thread.name}`",
-						             view=embed))
+					Queue().add(send_message, log, f"Message by {message.author.mention} did not meet the requirements in `{thread.name}`",
+					            view=embed, priority=2, bucket=log.id, guild=thread.guild.id, key=("automod-log", message.id),
+					            ttl=QUEUE_NOTIFICATION_TTL)
 				if message.id == thread.id :
 					await thread.delete()
 				else :
@@ -215,10 +247,13 @@ class AutoMod(metaclass=Singleton) :
 					title=thread.name,
 					content=message.content,
 				)
-				Queue().add(send_message(message.author, f" ", view=embed))
-				Queue().add(send_message(log,
-				                         f"Message by {message.author.mention} was blocked in `{thread.name}` because it didn't meet the minimum requirements.",
-				                         view=embed))
+				Queue().add(send_message, message.author, f" ", view=embed, priority=2, bucket=message.author.id,
+				            guild=thread.guild.id, key=("automod-dm", message.id), ttl=QUEUE_NOTIFICATION_TTL)
+				if log :
+					Queue().add(send_message, log,
+					            f"Message by {message.author.mention} was blocked in `{thread.name}` because it didn't meet the minimum requirements.",
+					            view=embed, priority=2, bucket=log.id, guild=thread.guild.id, key=("automod-log", message.id),
+					            ttl=QUEUE_NOTIFICATION_TTL)
 				if message.id == thread.id :
 					await thread.delete()
 				else :
@@ -231,11 +266,13 @@ class AutoMod(metaclass=Singleton) :
 					title=thread.name,
 					content=message.content,
 				)
-				Queue().add(send_message(message.author, f" ", view=embed))
+				Queue().add(send_message, message.author, f" ", view=embed, priority=2, bucket=message.author.id,
+				            guild=thread.guild.id, key=("automod-dm", message.id), ttl=QUEUE_NOTIFICATION_TTL)
 				if log :
-					Queue().add(send_message(log,
-					                         f"Message by {message.author.mention} was blocked in `{thread.name}` because it was a duplicate",
-					                         view=embed))
+					Queue().add(send_message, log,
+					            f"Message by {message.author.mention} was blocked in `{thread.name}` because it was a duplicate",
+					            view=embed, priority=2, bucket=log.id, guild=thread.guild.id, key=("automod-log", message.id),
+					            ttl=QUEUE_NOTIFICATION_TTL)
 				if message.id == thread.id :
 					await thread.delete()
 				else :
@@ -251,58 +288,169 @@ class AutoMod(metaclass=Singleton) :
 			return AutoModActions.ALLOW
 		return None
 
-	async def check_duplicate(self, message, thread: discord.Thread, forum_channel: discord.ForumChannel) :
-		"""This checks if the message is a duplicate of a previous message in the thread."""
-		forum = ForumTransactions().get(forum_channel.id)
-		if forum.duplicates :
+	def check_duplicate(self, content: NormalizedText, message: discord.Message, thread: discord.Thread, rules: ForumRuleSet) :
+		"""This checks if the message is a duplicate of a previous thread in the forum.
+
+		The forum's MinHash index only returns likely near-duplicates, the content of those candidates is loaded to calculate the similarity ratio."""
+		if rules.duplicates :
 			return None, None
 		if message.id != thread.id :
 			return None, None
-		found = None
-		originalmsg = message
-		for a in forum_channel.threads :
-			if found :
-				break
-			if a.id == thread.id :
-				continue
-			if a.owner == thread.owner :
-				try :
-					msg: discord.Message = await a.fetch_message(a.id)
-					r = ratio(originalmsg.content, msg.content)
-					if r >= 0.7 :
-						found = msg
-						break
-				except discord.NotFound :
+		index = self.duplicate_index(rules.forum_id)
+		content = self.fingerprint(content)
+		candidates = [thread_id for thread_id, owner_id in index.query(content) if thread_id != thread.id and (
+				rules.duplicate_scope != DuplicateScopes.AUTHOR or owner_id == thread.owner_id)]
+		for thread_id, other in FingerprintTransactions().get_contents(candidates).items() :
+			if ratio(content, other) >= rules.duplicate_threshold :
+				return AutoModActions.DUPLICATE, f"Your message is similar to a previous message in this channel: https://discord.com/channels/{thread.guild.id}/{thread_id}"
+		return None, None
+
+	# == Fingerprints ==
+
+	@staticmethod
+	def fingerprint(content: NormalizedText) -> str :
+		"""The content for the duplicate check, casing, formatting and whitespace differences shouldn't make a post unique."""
+		return " ".join(content.text.split())
+
+	def duplicate_index(self, forum_id: int) -> MinHashIndex :
+		"""Returns the duplicate index of the forum, it's built from the stored signatures the first time the forum is checked.
+
+		This runs in the automod threads. The index only holds the signature and owner of every thread, the content stays in the database."""
+		index = self._duplicates.get(forum_id)
+		if index is not None :
+			return index
+		with self._index_lock :
+			index = self._duplicates.get(forum_id)
+			if index is not None :
+				return index
+			index = MinHashIndex()
+			rows = FingerprintTransactions().get_signatures(forum_id)
+			stored = {row.id : index.unpack(row.signature) for row in rows if row.signature is not None}
+			# fingerprints that were stored before their signature was, or signed with other settings, are signed once and stored.
+			unsigned = FingerprintTransactions().get_contents([row.id for row in rows if stored.get(row.id) is None])
+			signatures = {thread_id : index.signature(content) for thread_id, content in unsigned.items()}
+			for row in rows :
+				signature = stored.get(row.id) or signatures.get(row.id)
+				if signature is not None :
+					index.add_signature(row.id, signature, row.owner_id)
+			if signatures :
+				FingerprintTransactions().set_signatures({thread_id : index.pack(signature) for thread_id, signature in signatures.items()})
+			self._duplicates[forum_id] = index
+			logging.info(f"Loaded {len(index)} thread fingerprints for forum {forum_id}")
+			return index
+
+	async def add_fingerprint(self, message: discord.Message) :
+		"""Stores the fingerprint of the starter message of a thread, the hashing and the database write are done outside the event loop."""
+		thread = message.channel
+		await asyncio.to_thread(self.store_fingerprints, thread.parent_id, [(thread.id, thread.owner_id, message.content)])
+
+	def store_fingerprints(self, forum_id: int, threads: list[tuple[int, int, str]]) :
+		"""Fingerprints and signs the (thread id, owner id, content) of every thread and stores them, a forum whose index is built gets them right away."""
+		fingerprints = []
+		for thread_id, owner_id, content in threads :
+			content = self.fingerprint(Normalizer.normalize(content))
+			fingerprints.append((thread_id, owner_id, content, self.signer.signature(content)))
+		FingerprintTransactions().add_many([
+			ThreadFingerprints(id=thread_id, forum_id=forum_id, owner_id=owner_id, content=content, signature=self.signer.pack(signature))
+			for thread_id, owner_id, content, signature in fingerprints])
+		# the lock makes sure an index that is being built either loaded these fingerprints or is built when they're added.
+		with self._index_lock :
+			index = self._duplicates.get(forum_id)
+			if index is None :
+				return
+			for thread_id, owner_id, content, signature in fingerprints :
+				index.add_signature(thread_id, signature, owner_id)
+
+	async def backfill_fingerprints(self, forum: discord.ForumChannel) :
+		"""Fingerprints the threads that were created before their fingerprint was stored, this runs once per forum the first time its duplicate check is needed.
+
+		Like the history scan this replaces, the active threads and the last 1000 archived threads are compared against. Only the threads without a fingerprint have their starter message fetched, so a later backfill only lists the threads."""
+		if not isinstance(forum, discord.ForumChannel) or forum.id in self._backfilled :
+			return
+		rules = self.get_rules(forum.id)
+		if rules is None or rules.duplicates :
+			return
+		task = self._backfills.get(forum.id)
+		if task is None :
+			task = asyncio.create_task(self.fetch_fingerprints(forum))
+			self._backfills[forum.id] = task
+		# the message that is waiting for the backfill may be cancelled, the backfill itself continues.
+		await asyncio.shield(task)
+
+	async def fetch_fingerprints(self, forum: discord.ForumChannel) :
+		try :
+			known = await asyncio.to_thread(FingerprintTransactions().get_ids, forum.id)
+			threads = list(forum.threads)
+			async for thread in forum.archived_threads(limit=1000) :
+				threads.append(thread)
+			missing = []
+			for thread in threads :
+				if thread.id in known :
 					continue
-		async for x in forum_channel.archived_threads(limit=1000) :
-			if found is not None :
-				break
-			if x.id == thread.id :
-				continue
-			if x.owner == thread.owner :
 				try :
-					msg: discord.Message = await x.fetch_message(x.id)
-					r = ratio(originalmsg.content, msg.content)
-					if r >= 0.7 :
-						found = msg
-
-						break
+					message = thread.starter_message or await thread.fetch_message(thread.id)
 				except discord.NotFound :
 					continue
-		if found :
-			return AutoModActions.DUPLICATE, f"Your message is similar to a previous message in this channel: {found.jump_url}"
-		return None, None
+				missing.append((thread.id, thread.owner_id, message.content))
+			await asyncio.to_thread(self.store_fingerprints, forum.id, missing)
+			self._backfilled.add(forum.id)
+			logging.info(f"Fingerprinted {len(missing)} existing threads in {forum.name}")
+		except discord.HTTPException as e :
+			# the forum is tried again with the next thread.
+			logging.warning(f"Could not fingerprint the existing threads in {forum.name}: {e}")
+		finally :
+			self._backfills.pop(forum.id, None)
+
+	async def remove_fingerprint(self, thread_id: int, forum_id: int) :
+		await asyncio.to_thread(FingerprintTransactions().delete, thread_id)
+		index = self._duplicates.get(forum_id)
+		if index is not None :
+			index.remove(thread_id)
 
 	# == Cache functions ==
 
-	def fetch_cache(self, guild_id: int) -> list[dict] :
-		"""Fetches the cache for the guild, if it doesn't exist, it creates an empty cache."""
-
-		if guild_id not in self._cache :
-			forums = ForumTransactions().get_all(guild_id, id_only=True)
-			self._cache[guild_id] = list(forums)
-		return self._cache[guild_id]
+	def load_rules(self, forums: list[Forums]) :
+		"""Watches the forums and compiles all of their rules up front, the forums have to be loaded with their patterns."""
+		self.watched = {forum.id for forum in forums}
+		self._rules = {forum.id : ForumRuleSet(forum) for forum in forums}
+		logging.info(f"AutoMod is watching {len(self.watched)} forums")
+
+	def watch(self, forum_id: int) :
+		"""Starts watching a forum, the rules are loaded when the first message arrives."""
+		self.watched.add(forum_id)
+		self._rules.pop(forum_id, None)
+
+	def unwatch(self, forum_id: int) :
+		"""Stops watching a forum and drops its rules and duplicate index."""
+		self.watched.discard(forum_id)
+		self._rules.pop(forum_id, None)
+		self._duplicates.pop(forum_id, None)
+		self._backfilled.discard(forum_id)
+
+	def get_rules(self, forum_id: int) -> ForumRuleSet | None :
+		"""Fetches the compiled rules for the forum, they are only loaded from the database when they are not cached yet."""
+		rules = self._rules.get(forum_id)
+		if rules is None :
+			rules = self.refresh_rules(forum_id)
+		return rules
+
+	def refresh_rules(self, forum_id: int) -> ForumRuleSet | None :
+		"""Rebuilds the rules for the forum, the old rules are swapped out in a single assignment so a message is never checked against half-built rules."""
+		forum = ForumTransactions().get(forum_id)
+		if forum is None :
+			self._rules.pop(forum_id, None)
+			return None
+		rules = ForumRuleSet(forum)
+		self._rules[forum_id] = rules
+		if rules.duplicates :
+			# a forum that allows duplicates doesn't need its index, it's built again if that changes.
+			self._duplicates.pop(forum_id, None)
+			self._backfilled.discard(forum_id)
+		return rules
 
 	def clear_cache(self) :
-		"""Clears the cache."""
-		self._cache = {}
+		"""Drops the rules and duplicate indexes of forums that are no longer watched. The rules of watched forums are kept, they're refreshed when they change."""
+		for forum_id in set(self._rules) - self.watched :
+			self._rules.pop(forum_id, None)
+		for forum_id in set(self._duplicates) - self.watched :
+			self._duplicates.pop(forum_id, None)
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from classes.support.singleton import Singleton
+from resources.configs.Performance import AUTOMOD_TIME_BUDGET, AUTOMOD_WORKERS
+
+
+class AutoModExecutor(metaclass=Singleton) :
+	"""Runs the CPU heavy part of automod in a thread pool so it can't block the event loop.
+
+	Every evaluation gets a time budget, when the budget runs out the caller's fallback is returned instead, and when the evaluation raises its failure result is returned. The budget starts when a thread picks the evaluation up, the time spent waiting for a free thread during a burst doesn't count. Python can't stop a running thread, so a timed out evaluation still finishes in the background; its result is discarded.
+	"""
+
+	def __init__(self) :
+		self.pool = ThreadPoolExecutor(max_workers=AUTOMOD_WORKERS, thread_name_prefix="automod")
+		self.budget = AUTOMOD_TIME_BUDGET
+		self.stats = {
+			"offloaded" : 0,
+			"timed_out" : 0,
+			"failed"    : 0,
+		}
+
+	async def run(self, func: Callable, *args, fallback: Any = None, failure: Any = None) -> Any :
+		"""Runs the function in the pool and waits for it within the time budget."""
+		loop = asyncio.get_running_loop()
+		started = loop.create_future()
+
+		def job() :
+			loop.call_soon_threadsafe(lambda : started.done() or started.set_result(None))
+			return func(*args)
+
+		self.stats["offloaded"] += 1
+		future = loop.run_in_executor(self.pool, job)
+		try :
+			await asyncio.wait({started, future}, return_when=asyncio.FIRST_COMPLETED)
+			return await asyncio.wait_for(future, timeout=self.budget)
+		except asyncio.TimeoutError :
+			self.stats["timed_out"] += 1
+			logging.warning(f"AutoMod evaluation exceeded its {self.budget}s budget, using fallback: {fallback}")
+			return fallback
+		except Exception as e :
+			self.stats["failed"] += 1
+			logging.error(f"AutoMod evaluation failed: {e}", exc_info=True)
+			return failure
+		finally :
+			started.cancel()
+
+	def status(self) -> str :
+		return f"Offloaded: {self.stats['offloaded']} Timed out: {self.stats['timed_out']} Failed: {self.stats['failed']} Budget: {self.budget}s"
@@ -0,0 +1,129 @@
+import threading
+import time
+from typing import Callable, NamedTuple
+
+import discord
+
+from classes.discordcontrollers.forum.ForumRuleSet import ForumRuleSet
+from classes.support.Normalizer import NormalizedText
+
+
+class AutoModContext(NamedTuple) :
+	"""Everything a stage needs to check a message."""
+	message: discord.Message
+	thread: discord.Thread
+	rules: ForumRuleSet
+	premium: bool
+	# the message content normalized once for the stages that compare words and text, patterns use the raw content.
+	content: NormalizedText = None
+
+
+class AutoModStage :
+	"""A single automod check.
+
+	The check returns an (action, reason) tuple or (None, None). Every verdict except a warning short-circuits the pipeline; a warning is remembered and only returned when no other stage blocks the message. Pinned stages always run first in the order they were added, this is used for the staff bypass.
+	"""
+
+	def __init__(self, name: str, check: Callable[[AutoModContext], tuple[str | None, str | None]], cost: float = 1.0,
+	             premium: bool = False, pinned: bool = False, short_circuit: Callable[[str], bool] = None) :
+		self.name = name
+		self.check = check
+		self.cost = cost
+		self.premium = premium
+		self.pinned = pinned
+		self.short_circuit = short_circuit or (lambda action : action != "WARN")
+
+
+class StageStats :
+	"""The measured latency and hit rate of a stage in a forum."""
+	__slots__ = ("calls", "hits", "seconds")
+
+	def __init__(self) :
+		self.calls = 0
+		self.hits = 0
+		self.seconds = 0.0
+
+	def record(self, seconds: float, hit: bool) :
+		self.calls += 1
+		self.seconds += seconds
+		if hit :
+			self.hits += 1
+
+	def score(self) -> float :
+		"""The expected time spent before this stage reaches a verdict, cheap stages that hit often score lowest."""
+		latency = self.seconds / self.calls if self.calls else 0.0
+		hit_rate = (self.hits + 1) / (self.calls + 2)
+		return latency / hit_rate
+
+
+class AutoModPipeline :
+	"""Runs the automod stages for a message, ordered per forum by their measured cost and hit rate.
+
+	Until every stage that runs in a forum has run `min_samples` times there, the stages run in the order they were added. After that the order is recalculated every `reorder_every` messages, so the stage that is most likely to end the pipeline cheaply runs first.
+
+	The pipeline runs in the automod threads, the stats and orders are only changed while holding the lock.
+	"""
+
+	def __init__(self, stages: list[AutoModStage], min_samples: int = 50, reorder_every: int = 100) :
+		self.stages = stages
+		self.min_samples = min_samples
+		self.reorder_every = reorder_every
+		self.stats: dict[int, dict[str, StageStats]] = {}
+		self._orders: dict[int, list[AutoModStage]] = {}
+		self._runs: dict[int, int] = {}
+		self._lock = threading.Lock()
+
+	def order(self, forum_id: int) -> list[AutoModStage] :
+		with self._lock :
+			order = self._orders.get(forum_id)
+			runs = self._runs.get(forum_id, 0)
+			if order is None or runs % self.reorder_every == 0 :
+				order = self.calculate_order(forum_id)
+				self._orders[forum_id] = order
+			self._runs[forum_id] = runs + 1
+			return order
+
+	def record(self, forum_id: int, stage: AutoModStage, seconds: float, hit: bool) :
+		with self._lock :
+			self.stats.setdefault(forum_id, {}).setdefault(stage.name, StageStats()).record(seconds, hit)
+
+	def calculate_order(self, forum_id: int) -> list[AutoModStage] :
+		pinned = [stage for stage in self.stages if stage.pinned]
+		adaptive = [stage for stage in self.stages if not stage.pinned]
+		stats = self.stats.get(forum_id, {})
+		# stages that never run in the forum, like the premium stages of a free forum, have no samples and keep their place at the end.
+		sampled = [stage for stage in adaptive if stage.name in stats]
+		if not sampled or any(stats[stage.name].calls < self.min_samples for stage in sampled) :
+			return pinned + adaptive
+		unsampled = [stage for stage in adaptive if stage.name not in stats]
+		return pinned + sorted(sampled, key=lambda stage : (stats[stage.name].score(), stage.cost)) + unsampled
+
+	def run(self, context: AutoModContext) -> tuple[str | None, str | None] :
+		warning = (None, None)
+		for stage in self.order(context.rules.forum_id) :
+			if stage.premium and not context.premium :
+				continue
+			start = time.perf_counter()
+			action, reason = stage.check(context)
+			self.record(context.rules.forum_id, stage, time.perf_counter() - start, action is not None)
+			if not action :
+				continue
+			if stage.short_circuit(action) :
+				return action, reason
+			if warning[0] is None :
+				warning = (action, reason)
+		return warning
+
+	def status(self) -> str :
+		"""The totals per stage across all forums."""
+		with self._lock :
+			totals: dict[str, StageStats] = {stage.name : StageStats() for stage in self.stages}
+			for forum_stats in self.stats.values() :
+				for name, stats in forum_stats.items() :
+					total = totals.setdefault(name, StageStats())
+					total.calls += stats.calls
+					total.hits += stats.hits
+					total.seconds += stats.seconds
+		return "\n".join(
+			[f"{name}: {stats.calls} calls, {stats.hits} hits, {round(stats.seconds / stats.calls * 1000, 3) if stats.calls else 0}ms avg"
+			 for name, stats in totals.items()])
@@ -2,6 +2,7 @@ import discord
 from discord import Message
 from discord_py_utilities.messages import send_message
 
+from classes.discordcontrollers.forum.AutoMod import AutoMod
 from classes.kernel.AccessControl import AccessControl
 from database.transactions.ForumTransactions import ForumTransactions
 from resources.configs.Limits import FREE_BLACKLIST_WORD_LIMIT
@@ -35,7 +36,7 @@ class ForumPatternController :
 			action=action.upper(),
 			pattern=pattern.lower(),
 		)
-
+		AutoMod().refresh_rules(channel.id)
 		return None
 
 	async def remove_pattern(self, interaction: discord.Interaction, channel: discord.TextChannel | discord.ForumChannel,
@@ -48,4 +49,5 @@ class ForumPatternController :
 		if pattern is None :
 			return await send_message(interaction.channel, f"No pattern with the name `{name}` found for {channel.name}.")
 		ForumTransactions().remove_pattern(pattern.id)
+		AutoMod().refresh_rules(channel.id)
 		return None
@@ -0,0 +1,39 @@
+import itertools
+
+from classes.support.AhoCorasick import AhoCorasick
+from classes.support.Normalizer import Normalizer
+from classes.support.PatternMatcher import PatternMatcher, PatternRule
+from data.enums.DuplicateScopes import DuplicateScopes
+from data.enums.PatternTypes import ForumPatterns
+from database.database import Forums
+
+
+class ForumRuleSet :
+	"""A compiled, read-only snapshot of the automod rules for a single forum.
+
+	The snapshot is built once from the database and replaced as a whole when the forum changes, this way AutoMod never has to query the database or compile a regex while checking a message.
+	"""
+	# every snapshot gets a new version, this allows other caches to detect that the rules have changed.
+	_versions = itertools.count(1)
+
+	def __init__(self, forum: Forums) :
+		self.forum_id: int = forum.id
+		self.version: int = next(self._versions)
+		self.minimum_characters: int = forum.minimum_characters or 0
+		self.duplicates: bool = forum.duplicates
+		self.duplicate_threshold: float = forum.duplicate_threshold or 0.7
+		self.duplicate_scope: str = forum.duplicate_scope or DuplicateScopes.AUTHOR
+		blacklist: list[str] = []
+		rules: list[PatternRule] = []
+		for pattern in forum.patterns :
+			if pattern.action == ForumPatterns.blacklist :
+				blacklist.append(pattern.pattern)
+				continue
+			if pattern.action in (ForumPatterns.block, ForumPatterns.warn, ForumPatterns.required) :
+				rules.append(PatternRule(pattern.id, pattern.name, pattern.action, pattern.pattern))
+
+		# all blacklisted words are scanned for at once, the words are normalized the same way as the messages they're matched against.
+		self.blacklist: AhoCorasick = AhoCorasick([Normalizer.normalize(word).text for word in blacklist], whole_words=bool(forum.blacklist_whole_words))
+		# block, warn and required patterns are all matched in a single pass.
+		self.patterns: PatternMatcher = PatternMatcher(rules)
+		self.required: list[PatternRule] = self.patterns.of_type(ForumPatterns.required)
@@ -15,6 +15,7 @@ from classes.support.ThreadArchive import ThreadArchive
 from data.enums.CleanUpTypes import CleanUpTypes
 from database.database import ForumCleanup, Forums
 from resources.configs.ConfigMapping import ConfigMapping
+from resources.configs.Performance import QUEUE_NOTIFICATION_TTL
 
 
 # This needs to be completely overhauled.
@@ -42,7 +43,8 @@ class ForumTask :
 			return
 		for thread in self.threads :
 			# We loop through clean_up types, skipping those that aren't configured.
-			Queue().add(self.cleanup_forum(thread), priority=0)
+			await Queue().put(self.cleanup_forum, thread, priority=0, guild=self.forum.guild.id, forum=self.forum.id,
+			                  key=("cleanup", thread.id))
 
 
 	async def recover_archived_posts(self) :
@@ -59,7 +61,8 @@ class ForumTask :
 				logging.info(f"Too many threads in {self.forum.guild.name}, skipping")
 				return
 			active_threads += 1
-			Queue().add(archived_thread.edit(archived=False))
+			await Queue().put(archived_thread.edit, archived=False, bucket=archived_thread.id, guild=self.forum.guild.id,
+			                  forum=self.forum.id, key=("unarchive", archived_thread.id))
 
 	async def cleanup_forum(self, thread: discord.Thread) :
 		delete = False
@@ -119,7 +122,7 @@ class ForumTask :
 
 				result = regex.search(message.content)
 				if result :
-					Queue().add(message.delete(delay=5), 0)
+					Queue().add_message_delete(message, priority=0, guild=thread.guild.id, forum=thread.parent_id)
 
 		except re2.error as e :
 			logging.warning(e, exc_info=True)
@@ -160,9 +163,11 @@ class ForumTask :
 			await archiver.run()
 			await send_message(channel, f"[Automated Cleanup] `{thread.name}` has been automatically removed: {reason}", files=[discord.File(fp=archiver.zip_path, filename=file_name)])
 			await archiver.clean_up()
-		Queue().add(thread.delete(reason=reason), 0)
+		Queue().add(thread.delete, reason=reason, priority=0, bucket=thread.id, guild=thread.guild.id,
+		            forum=thread.parent_id, key=("delete", thread.id))
 		if thread.owner in thread.guild.members:
-			Queue().add(send_message(thread.owner, f"[Automated Cleanup] `{thread.name}` has been automatically removed: {reason}"))
+			Queue().add_direct_message(thread.owner, f"[Automated Cleanup] `{thread.name}` has been automatically removed: {reason}",
+			                           guild=thread.guild.id, ttl=QUEUE_NOTIFICATION_TTL)
 
 
 
@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from typing import Hashable
+
+
+class VerdictCache :
+	"""A bounded LRU of the last automod verdict per message.
+
+	Discord sends an edit event for embed unfurls, pins and other changes that don't touch the content. A verdict is only reused when the content and the forum rules are the same as when it was made, so these events don't re-run the checks or the action.
+	"""
+
+	def __init__(self, maxsize: int = 10000) :
+		self.maxsize = maxsize
+		self._entries: OrderedDict[int, tuple[Hashable, tuple[str | None, str | None]]] = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self) :
+		return len(self._entries)
+
+	@staticmethod
+	def signature(content: str, rules_version: int, premium: bool) -> Hashable :
+		"""Everything the verdict depends on, the content is hashed so the cache doesn't keep every message in memory."""
+		return hash(content), rules_version, premium
+
+	def get(self, message_id: int, signature: Hashable) -> tuple[str | None, str | None] | None :
+		"""Returns the previous verdict when nothing changed since, otherwise None."""
+		entry = self._entries.get(message_id)
+		if entry is None or entry[0] != signature :
+			self.misses += 1
+			return None
+		self._entries.move_to_end(message_id)
+		self.hits += 1
+		return entry[1]
+
+	def put(self, message_id: int, signature: Hashable, verdict: tuple[str | None, str | None]) :
+		self._entries[message_id] = (signature, verdict)
+		self._entries.move_to_end(message_id)
+		while len(self._entries) > self.maxsize :
+			self._entries.popitem(last=False)
+
+	def clear(self) :
+		self._entries.clear()
+
+	def status(self) -> str :
+		total = self.hits + self.misses
+		rate = round(self.hits / total * 100, 1) if total else 0
+		return f"Hits: {self.hits} Misses: {self.misses} Hit rate: {rate}% Size: {len(self)}/{self.maxsize}"
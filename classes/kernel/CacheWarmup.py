@@ -0,0 +1,22 @@
+import logging
+import time
+
+from classes.discordcontrollers.forum.AutoMod import AutoMod
+from classes.kernel.AccessControl import AccessControl
+from classes.kernel.ConfigData import ConfigData
+from database.transactions.ForumTransactions import ForumTransactions
+
+
+class CacheWarmup :
+	"""Fills every in memory cache before the bot starts handling events.
+
+	Every cache is loaded with a few set based queries that are grouped per guild or forum in python, instead of a query per guild. This way the first message in every guild is handled from memory."""
+
+	@staticmethod
+	def run() :
+		start = time.perf_counter()
+		ConfigData().reload()
+		AccessControl().reload()
+		# the automod rules don't use the cleanup rules, the forum check loads those itself.
+		AutoMod().load_rules(ForumTransactions().get_all_with_rules(cleanup=False))
+		logging.info(f"Caches warmed up in {round((time.perf_counter() - start) * 1000)}ms")
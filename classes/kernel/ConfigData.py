@@ -1,7 +1,9 @@
 """This class is for the guild's Config data, which is stored in the database. It is used to store and retrieve data from the database."""
+import asyncio
 import json
 import logging
 import os
+import time
 
 import discord
 from discord import CategoryChannel, ForumChannel, StageChannel, TextChannel, Thread, VoiceChannel
@@ -11,6 +13,7 @@ from discord_py_utilities.permissions import find_first_accessible_text_channel
 from classes.kernel.Queue import Singleton
 from database.transactions.ConfigTransactions import ConfigTransactions
 from database.transactions.ServerTransactions import ServerTransactions
+from resources.configs.Performance import CONFIG_CHANNEL_FETCH_ATTEMPTS, CONFIG_CHANNEL_NEGATIVE_TTL
 
 
 class KeyNotFound(Exception) :
@@ -20,10 +23,14 @@ class KeyNotFound(Exception) :
 
 
 class ConfigData(metaclass=Singleton) :
-	"""This class generates the Config file, with functions to change and get values from it"""
+	"""This class generates the Config file, with functions to change and get values from it
+
+	The config of every guild is cached by its guild id, the values are converted to ints and bools when they're loaded so reading a key is a dict lookup. Guilds without any config are cached as well."""
 
 	configcontroller = ConfigTransactions()
-	data = {}
+	data: dict[int, dict[str, str | bool | int | None]] = {}
+	# guild id -> channel type -> the resolved channel, or None with the time it expires.
+	channels: dict[int, dict[str, tuple[discord.abc.GuildChannel | None, float]]] = {}
 
 	async def migrate(self) :
 		if not os.path.isdir("configs") :
@@ -53,13 +60,14 @@ class ConfigData(metaclass=Singleton) :
 
 	# os.rmdir("configs")
 	def reload(self) :
-		"""Reloads the Config data from the database"""
-		self.data = {}
-		for guild in ServerTransactions().get_all() :
-			try:
-				self.load_guild(guild)
-			except Exception as e :
-				logging.error(e, exc_info=True)
+		"""Reloads the Config data from the database, the rows of every guild are loaded in one query and grouped per guild."""
+		# guilds without any config rows get an empty config, this way they don't query the database when they're looked up.
+		data = {int(guild) : {} for guild in ServerTransactions().get_all()}
+		for item in self.configcontroller.config_get_all() :
+			data.setdefault(int(item.guild), {})[item.key.upper()] = self.parse(item.value)
+		self.data = data
+		self.channels = {}
+		logging.info(f"Loaded the config of {len(data)} guilds")
 
 	def load(self, guilds) :
 		self.data = {}
@@ -69,47 +77,73 @@ class ConfigData(metaclass=Singleton) :
 	def load_guild(self, serverid) :
 		"""Loads the Config for a guild"""
 		config = self.configcontroller.server_config_get(serverid)
-		self.data[str(serverid)] = {}
-
-		for item in config :
-			self.data[str(serverid)][item.key.upper()] = item.value
+		# the config is built first and swapped in at once, so a lookup never sees a half loaded guild.
+		self.data[int(serverid)] = {item.key.upper() : self.parse(item.value) for item in config}
+		self.invalidate_channels(serverid)
+
+	@staticmethod
+	def parse(value: str | bool | int | None) -> str | bool | int | None :
+		"""Converts a stored value to its typed form, numbers become ints and true/false, 1/0 become bools. An empty value is None, it's read as the default."""
+		if not value :
+			return None
+		if not isinstance(value, str) :
+			return value
+		if value.isnumeric() and value not in ["0", "1"] :
+			return int(value)
+		if value.lower() in ["true", "1", "ENABLED"] :
+			return True
+		if value.lower() in ["false", "0", "DISABLED"] :
+			return False
+		return value
 
 	def add_key(self, serverid, key, value: str | bool | int, overwrite=False) :
 		"""Adds a key to the Config"""
 
-		self.configcontroller.config_unique_add(serverid, key, value, overwrite=overwrite)
-		self.load_guild(serverid)
+		if self.configcontroller.config_unique_add(serverid, key, value, overwrite=overwrite) :
+			self.patch(serverid, {key : value})
+
+	def set_keys(self, serverid, values: dict[str, str | bool | int]) :
+		"""Sets multiple keys in one transaction, existing keys are overwritten"""
+		self.configcontroller.config_upsert_many(serverid, values)
+		self.patch(serverid, values)
 
 	def remove_key(self, serverid, key) :
 		"""Removes a key from the Config"""
 		self.configcontroller.config_unique_remove(serverid, key)
-		self.load_guild(serverid)
+		self.patch(serverid, {key : None})
 
 	def update_key(self, serverid, key, value) :
 		"""Updates a key in the Config"""
-		self.configcontroller.config_update(serverid, key, value)
-		self.load_guild(serverid)
+		if self.configcontroller.config_update(serverid, key, value) :
+			self.patch(serverid, {key : value})
+
+	def patch(self, serverid, values: dict[str, str | bool | int | None]) :
+		"""Writes changed keys through to the cache instead of loading the guild again, a value of None removes the key.
+
+		The values are stored the way the database returns them, so the cache holds the same typed values as after a reload. A guild that isn't cached is loaded on its next lookup."""
+		self.invalidate_channels(serverid)
+		guild = self.data.get(int(serverid))
+		if guild is None :
+			return
+		guild = dict(guild)
+		for key, value in values.items() :
+			if value is None :
+				guild.pop(key.upper(), None)
+				continue
+			guild[key.upper()] = self.parse(str(value))
+		self.data[int(serverid)] = guild
 
 	def get_key(self, serverid, key, default=None) :
-		"""Gets a key from the Config, throws KeyNotFound if not found"""
+		"""Gets a key from the Config, the default is returned when the key isn't set"""
 		guild = self.get_guild(serverid)
-		value = guild.get(key.upper(), default)
-		if not value:
+		key = key.upper()
+		if key in guild :
+			value = guild[key]
+			return default if value is None else value
+		if not default :
 			return default
-
-		if isinstance(value, bool) :
-			return value
-		if value.isnumeric() and value not in ["0", "1"] :
-			return int(value)
-		if isinstance(value, str) :
-			if value.lower() in  ["true", "1", "ENABLED"] :
-				return True
-			if value.lower() in  ["false", "0", "DISABLED"] :
-				return False
-
-			return value
-
-		return default
+		# the default is read the same way as a stored value.
+		return self.parse(default)
 
 	def get_toggle(self, guildid: int, key: str, expected: str = "ENABLED", default: str = "DISABLED") -> bool :
 		"""
@@ -134,7 +168,16 @@ class ConfigData(metaclass=Singleton) :
 
 
 	async def get_channel(self, guild: discord.Guild, channel_type: str = "modchannel", optional = False) -> None | VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel | Thread :
-		"""Gets the channel from the Config"""
+		"""Gets the channel from the Config
+
+		Resolved channels are cached per guild until the guild's config or channels change. A channel that can't be found, or isn't set for a lookup that isn't optional, is remembered for CONFIG_CHANNEL_NEGATIVE_TTL seconds, in this time it isn't fetched again and the guild isn't notified again."""
+		channel_type_key = channel_type.upper()
+		cached = self.channels.get(guild.id, {}).get(channel_type_key)
+		if cached is not None :
+			channel, expires = cached
+			if channel is not None or expires > time.monotonic() :
+				return channel
+
 		channel_id = self.get_key_or_none(guild.id, channel_type)
 		if not isinstance(channel_id, int) :
 
@@ -144,25 +187,21 @@ class ConfigData(metaclass=Singleton) :
 				channel_id = None
 
 		if channel_id is None :
+			if optional:
+				return None
+			# only cached once the guild is notified, a later lookup that has to notify would skip it otherwise.
+			self.cache_channel(guild.id, channel_type_key, None)
 			channel = find_first_accessible_text_channel(guild)
 			if channel is None:
 				channel = guild.owner
-			if optional:
-				return None
 			await send_message(channel,
 			                   f"No `{channel_type}` channel set for {guild.name}, please set it up using the /Config command")
 			return None
 		channel = guild.get_channel(channel_id)
 		if channel is None:
-			attempts = 0
-			while attempts < 3 and channel is None:
-				try:
-					channel = await guild.fetch_channel(channel_id)
-				except discord.NotFound:
-					continue
-				except discord.HTTPException:
-					return None
+			channel = await self.fetch_channel(guild, channel_id)
 		if channel is None :
+			self.cache_channel(guild.id, channel_type_key, None)
 			channel = find_first_accessible_text_channel(guild)
 			if channel is None:
 				channel = guild.owner
@@ -170,10 +209,36 @@ class ConfigData(metaclass=Singleton) :
 			await send_message(channel,
 			                   f"Banwatch could not fetch the `{channel_type}` channel with id {channel_id} in {guild.name}, please verify it exists and is accessible by the bot. If it does then discord may be having issues.")
 			return None
+		self.cache_channel(guild.id, channel_type_key, channel)
 		return channel
 
-	def get_guild(self, guild_id: int) -> dict[str, str | bool | int] :
-		if not guild_id in self.data:
+	@staticmethod
+	async def fetch_channel(guild: discord.Guild, channel_id: int) :
+		"""Fetches a channel that isn't in discord.py's cache, a failed request is retried a few times with a growing delay. A channel that doesn't exist or can't be seen isn't retried."""
+		for attempt in range(CONFIG_CHANNEL_FETCH_ATTEMPTS) :
+			if attempt :
+				await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+			try :
+				return await guild.fetch_channel(channel_id)
+			except (discord.NotFound, discord.Forbidden) :
+				return None
+			except discord.HTTPException as e :
+				logging.warning(f"Fetching channel {channel_id} in {guild.id} failed (attempt {attempt + 1}): {e}")
+		return None
+
+	def cache_channel(self, guild_id: int, channel_type: str, channel) :
+		"""Caches a resolved channel, None is cached as a negative result that expires."""
+		expires = time.monotonic() + CONFIG_CHANNEL_NEGATIVE_TTL if channel is None else 0
+		self.channels.setdefault(guild_id, {})[channel_type] = (channel, expires)
+
+	def invalidate_channels(self, guild_id: int) :
+		"""Forgets the resolved channels of the guild, this is done when its config or channels change."""
+		self.channels.pop(int(guild_id), None)
+
+	def get_guild(self, guild_id: int) -> dict[str, str | bool | int | None] :
+		guild = self.data.get(int(guild_id))
+		if guild is None :
 			self.load_guild(guild_id)
-		return self.data.get(str(guild_id), {})
+			guild = self.data[int(guild_id)]
+		return guild
 
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import random
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+import discord
+from discord.ext import commands
+
+from classes.support.singleton import Singleton
+from database.database import QueuedTasks
+from database.transactions.QueueTransactions import QueueTransactions
+from resources.configs.Performance import QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_PERSISTENT, QUEUE_RETRY_DELAY, \
+	QUEUE_RETRY_MAX_DELAY
+
+
+async def delete_thread(bot: commands.Bot, thread_id: int, reason: str = None) :
+	thread = bot.get_channel(thread_id) or await bot.fetch_channel(thread_id)
+	await thread.delete(reason=reason)
+
+
+async def delete_message(bot: commands.Bot, channel_id: int, message_id: int, delay: float = None) :
+	await bot.get_partial_messageable(channel_id).get_partial_message(message_id).delete(delay=delay)
+
+
+async def bulk_delete_messages(bot: commands.Bot, channel_id: int, message_ids: list[int]) :
+	from classes.kernel.Queue import Queue
+	channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+	await Queue.delete_messages(channel, [channel.get_partial_message(message_id) for message_id in message_ids])
+
+
+async def unarchive_thread(bot: commands.Bot, thread_id: int) :
+	thread = bot.get_channel(thread_id) or await bot.fetch_channel(thread_id)
+	await thread.edit(archived=False)
+
+
+class StoredTask :
+	"""The in memory side of a stored task, the queue entry holds this instead of the arguments of the call.
+
+	The row is written in the background, the id is only known once the task has been flushed to the database."""
+	__slots__ = ("id", "task_type", "payload", "priority", "guild", "bucket", "forum", "job", "attempts", "cancelled")
+
+	def __init__(self, task_type: str, payload: dict, priority: int = 1, guild: int = None, bucket: int = None, forum: int = None,
+	             job: str = None, task_id: int = None, attempts: int = 0) :
+		self.id = task_id
+		self.task_type = task_type
+		self.payload = payload
+		self.priority = priority
+		self.guild = guild
+		self.bucket = bucket
+		self.forum = forum
+		self.job = job
+		self.attempts = attempts
+		self.cancelled = False
+
+	@classmethod
+	def from_row(cls, row: QueuedTasks) -> "StoredTask" :
+		return cls(row.task_type, json.loads(row.payload), row.priority, row.guild_id, row.bucket, row.forum_id, row.job, row.id,
+		           row.attempts)
+
+	def row(self) -> dict :
+		return {"task_type" : self.task_type, "payload" : json.dumps(self.payload), "priority" : self.priority, "guild_id" : self.guild,
+		        "bucket" : self.bucket, "forum_id" : self.forum, "job" : self.job}
+
+
+class DurableQueue(metaclass=Singleton) :
+	"""Keeps the queued thread deletes, message deletes, bulk deletes and unarchives in the database so a restart doesn't lose them.
+
+	Queue.add recognizes these calls and the bulk deletes of add_message_delete and stores them as a task type with json arguments and the forum and job they're tagged with, the in memory entry only holds the StoredTask. A worker leases the row before running it; a successful task is removed, a failed task is retried with exponential backoff and moved to the dead letter state after QUEUE_MAX_ATTEMPTS. On start up every pending row is queued again.
+
+	None of the database calls are made on the event loop. The tasks that are stored while a write is running are written together in the next transaction, a task that runs before its row is written waits for it.
+	"""
+	# task type -> the function that runs it, every function gets the bot and the stored arguments.
+	handlers: dict[str, Callable[..., Awaitable[Any]]] = {
+		"thread.delete"    : delete_thread,
+		"message.delete"   : delete_message,
+		"message.bulk_delete" : bulk_delete_messages,
+		"thread.unarchive" : unarchive_thread,
+	}
+
+	def __init__(self) :
+		self.bot: commands.Bot | None = None
+		self.enabled = QUEUE_PERSISTENT
+		# the tasks whose row hasn't been written yet, and the task that writes them.
+		self.unwritten: list[StoredTask] = []
+		# the written tasks whose arguments changed, for example a bulk delete that got more messages.
+		self.changed: set[StoredTask] = set()
+		self.flushing: asyncio.Task | None = None
+		# the database calls started from synchronous code, a reference is kept until they're done.
+		self.background: set[asyncio.Task] = set()
+		self.stats = {
+			"stored"    : 0,
+			"completed" : 0,
+			"retried"   : 0,
+			"dead"      : 0,
+		}
+
+	def attach(self, bot: commands.Bot) :
+		"""The tasks are stored as ids, the bot is needed to turn them back into channels and messages."""
+		self.bot = bot
+
+	@property
+	def active(self) -> bool :
+		return self.enabled and self.bot is not None
+
+	@classmethod
+	def register(cls, task_type: str, handler: Callable[..., Awaitable[Any]]) :
+		cls.handlers[task_type] = handler
+
+	@staticmethod
+	def describe(func: Callable, args: tuple, kwargs: dict | None) -> tuple[str, dict] | None :
+		"""Returns the task type and arguments of a call that can be stored, or None when the call has to stay in memory."""
+		target = getattr(func, "__self__", None)
+		name = getattr(func, "__name__", None)
+		kwargs = kwargs or {}
+		if getattr(func, "__qualname__", None) == "Queue.delete_messages" and len(args) == 2 and not kwargs :
+			channel, messages = args
+			return "message.bulk_delete", {"channel_id" : channel.id, "message_ids" : [message.id for message in messages]}
+		if args or target is None :
+			return None
+		if isinstance(target, discord.Thread) and name == "delete" and set(kwargs) <= {"reason"} :
+			return "thread.delete", {"thread_id" : target.id, "reason" : kwargs.get("reason")}
+		if isinstance(target, discord.Thread) and name == "edit" and kwargs == {"archived" : False} :
+			return "thread.unarchive", {"thread_id" : target.id}
+		if isinstance(target, discord.Message) and name == "delete" and set(kwargs) <= {"delay"} :
+			return "message.delete", {"channel_id" : target.channel.id, "message_id" : target.id, "delay" : kwargs.get("delay")}
+		return None
+
+	def store(self, task_type: str, payload: dict, priority: int, guild: int | None, bucket, forum: int = None, job=None) -> StoredTask :
+		"""Stores the task in the background and returns its in memory side, this has to be called from within the event loop."""
+		task = StoredTask(task_type, payload, priority, guild, bucket if isinstance(bucket, int) else None, forum,
+		                  job if isinstance(job, str) else None)
+		self.unwritten.append(task)
+		self.schedule()
+		return task
+
+	def update(self, task: StoredTask) :
+		"""Writes the changed arguments of a stored task in the background."""
+		self.changed.add(task)
+		self.schedule()
+
+	def schedule(self) :
+		if self.flushing is None :
+			self.flushing = asyncio.get_running_loop().create_task(self.flush())
+
+	async def flush(self) :
+		"""Writes the unwritten tasks and the changed arguments, every batch is a single transaction in a worker thread."""
+		try :
+			while self.unwritten or self.changed :
+				tasks, self.unwritten = [task for task in self.unwritten if not task.cancelled], []
+				# the new rows hold the current arguments.
+				self.changed.difference_update(tasks)
+				if tasks :
+					await self.write(tasks)
+				changed = {task.id : json.dumps(task.payload) for task in self.changed if task.id is not None and not task.cancelled}
+				self.changed.clear()
+				if changed :
+					try :
+						await asyncio.to_thread(QueueTransactions().set_payloads, changed)
+					except Exception as e :
+						logging.error(f"Could not update {len(changed)} queue tasks: {e}", exc_info=True)
+		finally :
+			self.flushing = None
+
+	async def write(self, tasks: list[StoredTask]) :
+		try :
+			ids = await asyncio.to_thread(QueueTransactions().add_many, [task.row() for task in tasks])
+		except Exception as e :
+			# the tasks still run from memory, they just won't survive a restart.
+			logging.error(f"Could not store {len(tasks)} queue tasks: {e}", exc_info=True)
+			return
+		for task, task_id in zip(tasks, ids) :
+			task.id = task_id
+		self.stats["stored"] += len(tasks)
+		# tasks that were cancelled while their rows were being written.
+		self.cancel_many([task for task in tasks if task.cancelled])
+
+	def cancel(self, task: StoredTask) :
+		self.cancel_many([task])
+
+	def cancel_many(self, tasks: list[StoredTask]) :
+		"""Cancels the tasks, tasks that haven't been written yet are never written."""
+		ids = []
+		for task in tasks :
+			task.cancelled = True
+			if task.id is not None :
+				ids.append(task.id)
+		if ids :
+			self.run_in_background(QueueTransactions().complete_many, ids)
+
+	def run_in_background(self, func: Callable, *args) :
+		"""Runs a database call in a worker thread without waiting for it, outside the event loop it's run right away."""
+		try :
+			loop = asyncio.get_running_loop()
+		except RuntimeError :
+			func(*args)
+			return
+		task = loop.create_task(asyncio.to_thread(func, *args))
+		self.background.add(task)
+		task.add_done_callback(self.background.discard)
+
+	async def execute(self, task: StoredTask) :
+		"""Runs a stored task, this is the function the in memory entry calls."""
+		if task.id is None and self.flushing is not None :
+			await asyncio.shield(self.flushing)
+		if task.cancelled :
+			return
+		if task.id is None :
+			# the row couldn't be written, the task runs without a lease.
+			await self.handle(task)
+			return
+		row = await asyncio.to_thread(QueueTransactions().lease, task.id, QUEUE_LEASE_SECONDS)
+		if row is None :
+			return
+		task.attempts = row.attempts
+		try :
+			await self.handle(task)
+		except Exception as e :
+			await self.fail(task, e)
+			raise
+		await asyncio.to_thread(QueueTransactions().complete, task.id)
+		self.stats["completed"] += 1
+
+	async def handle(self, task: StoredTask) :
+		handler = self.handlers.get(task.task_type)
+		if handler is None :
+			raise LookupError(f"Unknown task type {task.task_type}")
+		try :
+			await handler(self.bot, **task.payload)
+		except discord.NotFound :
+			# the channel or message is already gone, there's nothing left to do.
+			pass
+
+	async def fail(self, task: StoredTask, error: Exception) :
+		attempts = task.attempts + 1
+		if attempts >= QUEUE_MAX_ATTEMPTS or isinstance(error, (discord.Forbidden, LookupError)) :
+			logging.warning(f"Queue task {task.id} ({task.task_type}) failed {attempts} times, moving it to the dead letters: {error}")
+			await asyncio.to_thread(QueueTransactions().dead, task.id, str(error))
+			self.stats["dead"] += 1
+			return
+		delay = self.backoff(attempts)
+		await asyncio.to_thread(QueueTransactions().retry, task.id, str(error), delay)
+		task.attempts = attempts
+		self.stats["retried"] += 1
+		asyncio.get_running_loop().call_later(delay, self.enqueue, task)
+
+	@staticmethod
+	def backoff(attempts: int) -> float :
+		"""Exponential backoff with jitter, so a failing bucket doesn't retry all of its tasks at the same moment."""
+		delay = min(QUEUE_RETRY_DELAY * 2 ** (attempts - 1), QUEUE_RETRY_MAX_DELAY)
+		return delay * random.uniform(0.8, 1.2)
+
+	def enqueue(self, task: StoredTask) :
+		"""Queues a stored task with the tags it was stored with, so it can still be cancelled by its forum or job."""
+		if task.cancelled :
+			return
+		from classes.kernel.Queue import Queue
+		Queue().add(self.execute, task, priority=task.priority, bucket=task.bucket, guild=task.guild, forum=task.forum,
+		            job=task.job, key=("stored", task.id))
+
+	def resume(self) -> int :
+		"""Queues every pending task again, tasks that were running when the bot stopped are pending again as well."""
+		if not self.active :
+			return 0
+		QueueTransactions().release_leases()
+		tasks = QueueTransactions().get_pending()
+		loop = asyncio.get_running_loop()
+		now = datetime.now(timezone.utc)
+		for task in tasks :
+			available_at = task.available_at
+			if available_at.tzinfo is None :
+				available_at = available_at.replace(tzinfo=timezone.utc)
+			delay = (available_at - now).total_seconds()
+			if delay > 0 :
+				loop.call_later(delay, self.enqueue, StoredTask.from_row(task))
+				continue
+			self.enqueue(StoredTask.from_row(task))
+		logging.info(f"Resumed {len(tasks)} persistent queue tasks")
+		return len(tasks)
+
+	@staticmethod
+	def report(limit: int = 5) -> str :
+		"""The stored tasks per status and the newest dead letters with their error, this queries the database so run it outside the event loop."""
+		counts = QueueTransactions().count()
+		lines = [f"Stored tasks: {', '.join(f'{status}: {count}' for status, count in counts.items()) or 'none'}"]
+		for task in QueueTransactions().get_dead(limit) :
+			lines.append(f"Dead {task.id} ({task.task_type}, guild {task.guild_id}) after {task.attempts} attempts: {task.last_error}")
+		return "\n".join(lines)
+
+	def status(self) -> str :
+		return f"Stored: {self.stats['stored']} Unwritten: {len(self.unwritten)} Completed: {self.stats['completed']} Retried: {self.stats['retried']} Dead: {self.stats['dead']}"
@@ -0,0 +1,93 @@
+from collections import deque
+from typing import Callable, Hashable
+
+
+class FairQueue :
+	"""A queue that takes turns between guilds with deficit round-robin.
+
+	Every guild has its own FIFO, the guilds with waiting tasks take turns in a ring. On its turn a guild is credited one task, so a guild that queued ten thousand tasks gets the same share as a guild that queued one. Tasks without a guild share a single lane.
+
+	Entries need a `cancelled` attribute. Discarded entries are only marked and skipped when they reach the front, so removing a task doesn't have to search the queue.
+	"""
+
+	def __init__(self) :
+		self.queues: dict[Hashable, deque] = {}
+		# The amount of entries per guild that haven't been discarded.
+		self.counts: dict[Hashable, int] = {}
+		self.active: deque[Hashable] = deque()
+		self.deficit: dict[Hashable, int] = {}
+		self.size = 0
+
+	def __len__(self) :
+		return self.size
+
+	def __iter__(self) :
+		for queue in self.queues.values() :
+			for entry in queue :
+				if not entry.cancelled :
+					yield entry
+
+	def depth(self, guild: Hashable) -> int :
+		return self.counts.get(guild, 0)
+
+	def depths(self) -> dict[Hashable, int] :
+		return dict(self.counts)
+
+	def append(self, entry, guild: Hashable = None) :
+		queue = self.queues.get(guild)
+		if queue is None :
+			queue = deque()
+			self.queues[guild] = queue
+			self.counts[guild] = 0
+			self.active.append(guild)
+			self.deficit[guild] = 0
+		queue.append(entry)
+		self.counts[guild] += 1
+		self.size += 1
+
+	def popleft(self, eligible: Callable[[Hashable], bool] = None) :
+		"""Returns the next entry in round-robin order, guilds that aren't eligible (for example because they're at their cap) are skipped."""
+		for _ in range(len(self.active)) :
+			guild = self.active[0]
+			if eligible is not None and not eligible(guild) :
+				self.active.rotate(-1)
+				continue
+			if self.deficit[guild] < 1 :
+				self.deficit[guild] += 1
+			self.deficit[guild] -= 1
+			queue = self.queues[guild]
+			entry = queue.popleft()
+			while entry.cancelled :
+				entry = queue.popleft()
+			self.counts[guild] -= 1
+			self.size -= 1
+			if not self.counts[guild] :
+				# As in DRR a guild that runs out of tasks loses its remaining credit.
+				self.drop(guild)
+			elif self.deficit[guild] < 1 :
+				self.active.rotate(-1)
+			return entry
+		return None
+
+	def discard(self, entry, guild: Hashable = None) :
+		"""Marks the entry as cancelled, it is skipped when it reaches the front of the queue."""
+		if entry.cancelled or guild not in self.counts :
+			return
+		entry.cancelled = True
+		self.counts[guild] -= 1
+		self.size -= 1
+		if not self.counts[guild] :
+			self.drop(guild)
+
+	def drop(self, guild: Hashable) :
+		"""Removes the guild, its remaining credit and its discarded entries from the ring."""
+		self.queues.pop(guild, None)
+		self.counts.pop(guild, None)
+		self.deficit.pop(guild, None)
+		if self.active and self.active[0] == guild :
+			self.active.popleft()
+			return
+		try :
+			self.active.remove(guild)
+		except ValueError :
+			pass
@@ -1,9 +1,22 @@
+import asyncio
 import inspect
 import logging
 import math
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Hashable
 
-from discord import Forbidden, channel
+import discord
+from discord import Forbidden, HTTPException, RateLimited, channel
+from discord_py_utilities.messages import send_message
 
+from classes.kernel.DurableQueue import DurableQueue, StoredTask
+from classes.kernel.FairQueue import FairQueue
+from classes.kernel.QueueBuckets import QueueBuckets, current_bucket
+from classes.kernel.QueueStats import QueueStats
+from resources.configs.Performance import QUEUE_DM_COALESCE_WINDOW, QUEUE_GUILD_MAX_QUEUED, QUEUE_GUILD_MAX_RUNNING, \
+	QUEUE_HIGH_WATER_LOW, QUEUE_HIGH_WATER_NORMAL, QUEUE_WORKERS
 
 
 class Singleton(type) :
@@ -15,84 +28,605 @@ class Singleton(type) :
 		return cls._instances[cls]
 
 
+class QueueEntry :
+	"""A queued task, the coroutine is only created when a worker picks the task up.
+
+	Holding a function and its arguments is a fraction of the size of a suspended coroutine, which matters for a backlog of tens of thousands of deletes. Entries are never searched for and removed from the queue, they're marked as cancelled and skipped.
+	"""
+	__slots__ = ("func", "args", "kwargs", "priority", "bucket", "guild", "forum", "job", "key", "task_type", "enqueued_at",
+	             "deadline", "queued", "cancelled")
+
+	def __init__(self, func, args: tuple = (), kwargs: dict | None = None, priority: int = 1, bucket: Hashable = None,
+	             guild: int = None, key: Hashable = None, forum: int = None, job: Hashable = None) :
+		self.func = func
+		self.args = args
+		self.kwargs = kwargs
+		self.priority = priority
+		self.bucket = bucket
+		self.guild = guild
+		self.forum = forum
+		self.job = job
+		self.key = key
+		# the type the duration is measured under, this defaults to the name of the function.
+		self.task_type = None
+		self.enqueued_at = time.monotonic()
+		# the monotonic time after which the task is no longer worth running, None when it never expires.
+		self.deadline = None
+		# True while the entry is in one of the priority queues, parked and released entries have left them.
+		self.queued = False
+		self.cancelled = False
+
+	def copy(self, priority: int) -> "QueueEntry" :
+		entry = QueueEntry(self.func, self.args, self.kwargs, priority, self.bucket, self.guild, self.key, self.forum, self.job)
+		entry.task_type = self.task_type
+		entry.enqueued_at = self.enqueued_at
+		entry.deadline = self.deadline
+		return entry
+
+	def expired(self) -> bool :
+		return self.deadline is not None and time.monotonic() > self.deadline
+
+	def extend(self, deadline: float | None) :
+		"""Takes the later deadline of a task that is merged into this one, a task without a deadline never expires."""
+		if self.deadline is not None :
+			self.deadline = None if deadline is None else max(self.deadline, deadline)
+
+	@property
+	def tags(self) -> list[tuple[str, Hashable]] :
+		"""The tags the entry can be cancelled by."""
+		return [(kind, value) for kind, value in (("guild", self.guild), ("forum", self.forum), ("job", self.job)) if value is not None]
+
+	@property
+	def name(self) -> str :
+		return getattr(self.func, "__qualname__", None) or getattr(self.func, "__name__", repr(self.func))
+
+	@property
+	def kind(self) -> str :
+		return self.task_type or self.name
+
+	def matches(self, task) -> bool :
+		return self.func is task or self.func == task
+
+	def materialize(self) :
+		"""Calls the function, for a coroutine function this creates the coroutine that the worker awaits."""
+		if inspect.iscoroutine(self.func) :
+			return self.func
+		return self.func(*self.args, **(self.kwargs or {}))
+
+	def close(self) :
+		"""Closes a coroutine that was queued directly, so dropping it doesn't warn that it was never awaited."""
+		if inspect.iscoroutine(self.func) :
+			self.func.close()
+
+
 class Queue(metaclass=Singleton) :
-	high_priority_queue = []
-	normal_priority_queue = []
-	low_priority_queue = []
-	task_finished = True
+	"""Runs the queued discord calls with a pool of worker coroutines, high priority before normal before low and taking turns between guilds within a priority. See `add` for what a task can be given."""
+	high_priority_queue = FairQueue()
+	normal_priority_queue = FairQueue()
+	low_priority_queue = FairQueue()
+	buckets = QueueBuckets()
+	# Parked tasks whose bucket became available, these run before anything else.
+	ready = deque()
+	# The waiting task of every idempotency key.
+	pending: dict[Hashable, QueueEntry] = {}
+	# The tasks that haven't run yet per tag, for example ("forum", forum.id).
+	tagged: dict[tuple[str, Hashable], set[QueueEntry]] = {}
+	# Plain text direct messages that are still waiting are combined, as long as the first one was queued this many seconds ago.
+	dm_window = QUEUE_DM_COALESCE_WINDOW
+	durable = DurableQueue()
+	# The measured duration of every task type, the estimates are based on these. 0.5 seconds is assumed for a type that hasn't run yet.
+	stats = QueueStats(default_duration=0.5)
+	concurrency = QUEUE_WORKERS
+	workers: list[asyncio.Task] = []
+	running = 0
+	# The amount of running tasks per guild, 0 for either cap means there is no limit.
+	in_flight: dict[int, int] = {}
+	max_running = QUEUE_GUILD_MAX_RUNNING
+	max_queued = QUEUE_GUILD_MAX_QUEUED
+	# The amount of queued tasks per priority at which `put` waits, 0 means no limit.
+	high_water: dict[int, int] = {2 : 0, 1 : QUEUE_HIGH_WATER_NORMAL, 0 : QUEUE_HIGH_WATER_LOW}
+	# The amount of expired tasks that were dropped per task type.
+	expired: dict[str, int] = {}
+	# The producers waiting for room per priority.
+	space: dict[int, deque[asyncio.Future]] = {2 : deque(), 1 : deque(), 0 : deque()}
+	# The workers that are waiting in `put`, the last free worker never waits.
+	blocked_workers = 0
+	_wakeup: asyncio.Event | None = None
 
-	def status(self) :
-		return f"Remaining queue: High: {len(self.high_priority_queue)} Normal: {len(self.normal_priority_queue)} Low: {len(self.low_priority_queue)} Estimated time: {round(math.ceil(self.get_queue_time()) / 60, 2)} minutes"
+	def status(self, guilds: bool = True) :
+		status = f"Remaining queue: High: {len(self.high_priority_queue)} Normal: {len(self.normal_priority_queue)} Low: {len(self.low_priority_queue)} Rate limited: {self.buckets.parked()} Waiting producers: {self.producers()} Running: {self.running}/{self.concurrency} Estimated time: {self.minutes(self.get_queue_time())} minutes"
+		if not guilds :
+			return status
+		status += f"\nEstimated time per priority: High: {self.minutes(self.get_queue_time(2))} Normal: {self.minutes(self.get_queue_time(1))} minutes"
+		if self.expired :
+			status += "\nExpired: " + ", ".join([f"{kind}: {count}" for kind, count in self.expired.items()])
+		jobs = self.tag_counts("job")
+		if jobs :
+			status += "\nJobs: " + ", ".join([f"{job}: {count} waiting" for job, count in jobs.items()])
+		depths = sorted(self.guild_depths().items(), key=lambda item : item[1], reverse=True)
+		if not depths :
+			return status
+		return status + "\nGuilds: " + ", ".join(
+			[f"{guild}: {depth} queued, {self.in_flight.get(guild, 0)} running, {self.minutes(self.get_queue_time(guild=guild))} minutes"
+			 for guild, depth in depths[:10]])
 
-	def clear(self):
-		self.high_priority_queue = []
-		self.normal_priority_queue = []
-		self.low_priority_queue = []
-		self.task_finished = True
+	def tag_counts(self, kind: str) -> dict[Hashable, int] :
+		"""The amount of tasks that haven't run yet per tag of this kind."""
+		return {value : len(entries) for (tag_kind, value), entries in self.tagged.items() if tag_kind == kind}
 
-	def empty(self) :
-		return len(self.high_priority_queue) == 0 and len(self.normal_priority_queue) == 0 and len(
-			self.low_priority_queue) == 0
+	def guild_depths(self) -> dict[int, int] :
+		"""The amount of queued tasks per guild across all priorities."""
+		depths: dict[int, int] = {}
+		for queue in self.levels() :
+			for guild, depth in queue.depths().items() :
+				depths[guild] = depths.get(guild, 0) + depth
+		return depths
 
-	def add(self, task, priority: int = 1) -> float :
-		"""Adds a task to the queue with a priority of high(2), normal(1), or low(0)"""
+	def guild_depth(self, guild: int) -> int :
+		return self.high_priority_queue.depth(guild) + self.normal_priority_queue.depth(guild) + self.low_priority_queue.depth(guild)
+
+	def levels(self) -> tuple[FairQueue, FairQueue, FairQueue] :
+		return self.high_priority_queue, self.normal_priority_queue, self.low_priority_queue
+
+	def level(self, priority: int) -> FairQueue :
 		match priority :
 			case 2 :
-				self.high_priority_queue.append(task)
+				return self.high_priority_queue
 			case 1 :
-				self.normal_priority_queue.append(task)
-			case 0 :
-				self.low_priority_queue.append(task)
+				return self.normal_priority_queue
 			case _ :
-				self.low_priority_queue.append(task)
-		return round(self.get_queue_time() / 60, 2)
+				return self.low_priority_queue
 
-	def remove(self, task) :
-		if task in self.high_priority_queue :
-			self.high_priority_queue.remove(task)
-		if task in self.normal_priority_queue :
-			self.normal_priority_queue.remove(task)
-		if task in self.low_priority_queue :
-			self.low_priority_queue.remove(task)
-
-	def process(self) :
-		if len(self.high_priority_queue) > 0 :
-			return self.high_priority_queue.pop(0)
-		if len(self.normal_priority_queue) > 0 :
-			return self.normal_priority_queue.pop(0)
-		if len(self.low_priority_queue) > 0 :
-			return self.low_priority_queue.pop(0)
-
-	async def start(self) :
-		if not self.task_finished or self.empty() :
+	def clear(self) :
+		for queue in self.levels() :
+			for entry in queue :
+				self.drop(entry)
+		self.high_priority_queue = FairQueue()
+		self.normal_priority_queue = FairQueue()
+		self.low_priority_queue = FairQueue()
+		self.pending = {}
+		self.tagged = {}
+		self.stats.reset()
+		for bucket in self.buckets.buckets.values() :
+			for entry in bucket.parked :
+				self.drop(entry)
+			bucket.parked.clear()
+		# released tasks hold their bucket, it has to be freed again.
+		ready, self.ready = self.ready, deque()
+		for entry in ready :
+			self.drop(entry)
+			self.free(entry.bucket)
+		for priority in self.space :
+			self.make_space(priority)
+
+	def empty(self) :
+		return len(self.high_priority_queue) == 0 and len(self.normal_priority_queue) == 0 and len(
+			self.low_priority_queue) == 0 and len(self.ready) == 0 and self.buckets.parked() == 0
+
+	def add(self, task, *args, priority: int = 1, bucket: Hashable = None, guild: int = None, key: Hashable = None,
+	        forum: int = None, job: Hashable = None, ttl: float = None, **kwargs) -> float :
+		"""Adds a task to the queue with a priority of high(2), normal(1), or low(0)
+
+		The task is a function and the arguments it's called with, for example `Queue().add(thread.delete, reason=reason)`. The function is only called when the task runs, so a waiting task doesn't hold a coroutine. A coroutine can still be queued directly, but it can't be given arguments.
+
+		The bucket is the rate limit bucket of the request, use the channel id for deletes and edits (the thread id for a thread, not its forum) and the user id for direct messages. Tasks in different buckets run in parallel, tasks in the same bucket run one at a time. The guild is the guild the task is done for, guilds take turns within a priority and can be capped on the amount of tasks they have running and queued.
+
+		The key identifies the operation, for example `("delete", thread.id)`. When a task with the same key is still waiting the new task is merged into it instead of being queued, the merged task keeps the highest priority.
+
+		The forum and job are tags, together with the guild they're used to cancel the task. A job is a name for a batch of tasks, for example `f"purge:{forum.id}"`.
+
+		The ttl is the amount of seconds the task is worth running for, use it for notifications that are pointless once they're late. A task that expires while it waits is dropped without calling discord and counted in the status.
+
+		When the persistent queue is enabled thread deletes, message deletes, bulk deletes and unarchives are stored in the database (see DurableQueue), so they continue after a restart."""
+		if task is None :
+			return self.minutes(self.get_queue_time(priority, guild))
+		if inspect.iscoroutine(task) and (args or kwargs) :
+			task.close()
+			raise TypeError("Arguments can only be queued with a function, not with a coroutine")
+		priority = priority if priority in (0, 1, 2) else 0
+		entry = QueueEntry(task, args, kwargs or None, priority, bucket, guild, key, forum, job)
+		if ttl is not None :
+			entry.deadline = entry.enqueued_at + ttl
+		waiting = self.pending.get(key) if key is not None else None
+		if waiting is not None and not waiting.cancelled :
+			logging.debug(f"Merging {entry.name} into the waiting task with key {key}")
+			entry.close()
+			waiting.extend(entry.deadline)
+			self.merge(waiting, priority)
+			return self.minutes(self.get_queue_time(priority, guild))
+		if guild is not None and self.max_queued and self.guild_depth(guild) >= self.max_queued :
+			logging.warning(f"Guild {guild} has {self.max_queued} tasks queued, dropping {entry.name}")
+			entry.close()
+			return self.minutes(self.get_queue_time(priority, guild))
+		if self.durable.active :
+			described = self.durable.describe(task, args, kwargs)
+			if described is not None :
+				# the entry only keeps the stored task, its row is written in the background.
+				stored = self.durable.store(*described, priority, guild, bucket, forum, job)
+				entry.func, entry.args, entry.kwargs = self.durable.execute, (stored,), None
+				entry.task_type = described[0]
+		self.push(entry)
+		self.stats.track(priority, guild, entry.kind)
+		if key is not None :
+			self.pending[key] = entry
+		self.wake()
+		return self.minutes(self.get_queue_time(priority, guild))
+
+	async def put(self, task, *args, priority: int = 1, key: Hashable = None, **kwargs) -> float :
+		"""Adds a task like `add`, but waits while the priority holds more tasks than its high-water mark. Use this for producers that queue a task for every thread or message.
+
+		`add` never waits, high priority has no high-water mark and is kept for the notifications people are waiting on. A task that is merged into a waiting task with the same key doesn't take room, it's added right away. A queued task that produces more tasks may wait as well, as long as another worker is free to work off the queue."""
+		priority = priority if priority in (0, 1, 2) else 0
+		while self.full(priority) and not (key is not None and key in self.pending) :
+			worker = asyncio.current_task() in self.workers
+			if worker and self.blocked_workers + 1 >= self.concurrency :
+				break
+			future = asyncio.get_running_loop().create_future()
+			self.space[priority].append(future)
+			self.blocked_workers += worker
+			try :
+				await future
+			finally :
+				self.blocked_workers -= worker
+		return self.add(task, *args, priority=priority, key=key, **kwargs)
+
+	def full(self, priority: int) -> bool :
+		water = self.high_water.get(priority, 0)
+		return bool(water) and len(self.level(priority)) >= water
+
+	def make_space(self, priority: int) :
+		"""Lets as many waiting producers continue as the priority has room for."""
+		waiters = self.space[priority]
+		water = self.high_water.get(priority, 0)
+		room = water - len(self.level(priority)) if water else len(waiters)
+		while waiters and room > 0 :
+			future = waiters.popleft()
+			if not future.done() :
+				future.set_result(None)
+				room -= 1
+
+	def producers(self) -> int :
+		return sum(len(waiters) for waiters in self.space.values())
+
+	def merge(self, entry: QueueEntry, priority: int) :
+		"""Raises the priority of a waiting entry, the entry is moved to the higher priority queue."""
+		if priority <= entry.priority :
 			return
-		self.task_finished = False
-		task = self.process()
-		try :
-			if not task :
-				self.low_priority_queue = [i for i in self.low_priority_queue if i is not None]
-				self.normal_priority_queue = [i for i in self.normal_priority_queue if i is not None]
-				self.high_priority_queue = [i for i in self.high_priority_queue if i is not None]
-				self.task_finished = True
-				return
-			if not inspect.iscoroutine(task) :
-				task()
-				self.task_finished = True
-				logging.info(f"Processing task: {task.__name__}")
+		self.level(entry.priority).discard(entry, entry.guild)
+		self.unindex(entry)
+		self.make_space(entry.priority)
+		moved = entry.copy(priority)
+		self.push(moved)
+		self.stats.untrack(entry.priority, entry.guild, entry.kind)
+		self.stats.track(priority, moved.guild, moved.kind)
+		self.pending[moved.key] = moved
+		self.wake()
+
+	def add_direct_message(self, user: discord.User | discord.Member, content: str, priority: int = 1, guild: int = None,
+	                       ttl: float = None) -> float :
+		"""Queues a plain text direct message, messages to the same user that are still waiting are sent as one message.
+
+		Messages are only combined within the coalesce window of the first message and up to discord's message length, this way a purge that notifies the same user about fifty threads sends a couple of messages instead of fifty."""
+		key = ("dm", user.id)
+		waiting = self.pending.get(key)
+		if waiting is not None and not waiting.cancelled :
+			parts: list[str] = waiting.args[1]
+			if (time.monotonic() - waiting.enqueued_at <= self.dm_window
+					and sum(len(part) + 2 for part in parts) + len(content) <= 2000) :
+				parts.append(content)
+				waiting.extend(None if ttl is None else time.monotonic() + ttl)
+				self.merge(waiting, priority)
+				return self.minutes(self.get_queue_time(priority, guild))
+			# the waiting message is full, it's sent as it is and the next messages are combined in a new one.
+			del self.pending[key]
+		return self.add(self.send_direct_message, user, [content], priority=priority, bucket=user.id, guild=guild, key=key,
+		                ttl=ttl)
+
+	@staticmethod
+	async def send_direct_message(user: discord.User | discord.Member, parts: list[str]) :
+		await send_message(user, "\n\n".join(parts))
 
+	def add_message_delete(self, message: discord.Message, priority: int = 0, guild: int = None, forum: int = None,
+	                       job: Hashable = None) -> float :
+		"""Queues the removal of a message, the waiting deletes of a channel are combined into one bulk delete of up to 100 messages.
+
+		Discord only bulk deletes messages younger than 14 days, older messages are queued as a delete of their own."""
+		channel_id = message.channel.id
+		if not self.bulk_deletable(message.id) :
+			return self.add(message.delete, priority=priority, bucket=channel_id, guild=guild, key=("delete", message.id),
+			                forum=forum, job=job)
+		key = ("bulk-delete", channel_id)
+		waiting = self.pending.get(key)
+		if waiting is not None and not waiting.cancelled :
+			# a stored batch only holds the ids of its messages.
+			stored: StoredTask | None = waiting.args[0] if waiting.func == self.durable.execute else None
+			queued = stored.payload["message_ids"] if stored is not None else [queued.id for queued in waiting.args[1]]
+			if message.id in queued :
+				# discord rejects a bulk delete with the same message twice.
+				return self.minutes(self.get_queue_time(priority, guild))
+			if len(queued) < 100 :
+				if stored is not None :
+					queued.append(message.id)
+					self.durable.update(stored)
+				else :
+					waiting.args[1].append(message)
+				self.merge(waiting, priority)
+				return self.minutes(self.get_queue_time(priority, guild))
+			# the waiting batch is full, it's sent as it is and the next deletes are combined in a new one.
+			del self.pending[key]
+		return self.add(self.delete_messages, message.channel, [message], priority=priority, bucket=channel_id, guild=guild,
+		                key=key, forum=forum, job=job)
+
+	@staticmethod
+	def bulk_deletable(message_id: int) -> bool :
+		# a minute of margin, the batch may wait a little before it's sent.
+		return discord.utils.snowflake_time(message_id) > discord.utils.utcnow() - timedelta(days=14) + timedelta(minutes=1)
+
+	@staticmethod
+	async def delete_messages(channel: discord.abc.Messageable, messages: list[discord.Message]) :
+		"""Deletes a batch of messages with one call, messages that became too old for a bulk delete while the batch waited are deleted one by one."""
+		recent = []
+		old = []
+		for message in messages :
+			(recent if Queue.bulk_deletable(message.id) else old).append(message)
+		if recent :
+			await channel.delete_messages(recent)
+		for message in old :
+			try :
+				await message.delete()
+			except discord.NotFound :
+				pass
+
+	def push(self, entry: QueueEntry) :
+		self.level(entry.priority).append(entry, entry.guild)
+		entry.queued = True
+		self.index(entry)
+
+	def index(self, entry: QueueEntry) :
+		for tag in entry.tags :
+			entries = self.tagged.get(tag)
+			if entries is None :
+				entries = set()
+				self.tagged[tag] = entries
+			entries.add(entry)
+
+	def unindex(self, entry: QueueEntry) :
+		for tag in entry.tags :
+			entries = self.tagged.get(tag)
+			if entries is None :
+				continue
+			entries.discard(entry)
+			if not entries :
+				del self.tagged[tag]
+
+	def remove(self, task) :
+		"""Cancels the queued entries of the task, for example `Queue().remove(thread.delete)`. This searches the whole queue, use `cancel` where the task is tagged."""
+		stored: list[StoredTask] = []
+		entries = [entry for queue in self.levels() for entry in queue if entry.matches(task)]
+		entries += [entry for entry in self.waiting() if entry.matches(task) and not entry.cancelled]
+		for entry in entries :
+			self.discard(entry, stored)
+		self.durable.cancel_many(stored)
+
+	def cancel(self, guild: int = None, forum: int = None, job: Hashable = None) -> int :
+		"""Cancels every task of the guild, forum or job that hasn't started yet and returns how many were cancelled.
+
+		The tasks are looked up in the tag index, so this takes as long as the amount of tasks that are cancelled. Tasks that are already running finish."""
+		stored: list[StoredTask] = []
+		count = 0
+		for tag in [(kind, value) for kind, value in (("guild", guild), ("forum", forum), ("job", job)) if value is not None] :
+			for entry in self.tagged.pop(tag, ()) :
+				if entry.cancelled :
+					continue
+				self.discard(entry, stored)
+				count += 1
+		self.durable.cancel_many(stored)
+		if count :
+			logging.info(f"Cancelled {count} queued tasks for guild {guild}, forum {forum}, job {job}")
+		return count
+
+	def discard(self, entry: QueueEntry, stored: list[StoredTask] = None) :
+		"""Cancels a single entry, an entry that is still in a priority queue is removed from its count right away. Parked and released entries are skipped by the worker that picks them up."""
+		if entry.queued :
+			self.level(entry.priority).discard(entry, entry.guild)
+			entry.queued = False
+			self.make_space(entry.priority)
+		entry.cancelled = True
+		self.forget(entry)
+		self.drop(entry, stored)
+
+	def drop(self, entry: QueueEntry, stored: list[StoredTask] = None) :
+		"""Cleans up an entry that won't run, a stored task is removed from the database as well. Stored tasks are collected in `stored` when given, so they can be removed in one query."""
+		self.stats.untrack(entry.priority, entry.guild, entry.kind)
+		self.unindex(entry)
+		entry.close()
+		if entry.func == self.durable.execute :
+			if stored is None :
+				self.durable.cancel(entry.args[0])
 				return
-			logging.info(f"Processing task: {task.__name__}")
-			await task
+			stored.append(entry.args[0])
+
+	def waiting(self) :
+		"""The entries that left the priority queues but haven't run yet."""
+		for bucket in self.buckets.buckets.values() :
+			yield from bucket.parked
+		yield from self.ready
+
+	def process(self) -> QueueEntry | None :
+		"""Returns the next task that may run, tasks whose bucket is busy or rate limited are parked on the bucket."""
+		if self.ready :
+			return self.claim(self.ready.popleft())
+		while True :
+			entry = self.next()
+			if entry is None or entry.bucket is None :
+				return self.claim(entry)
+			bucket = self.buckets.get(entry.bucket)
+			if bucket.busy or bucket.parked or bucket.until > time.monotonic() :
+				bucket.parked.append(entry)
+				self.schedule_release(bucket)
+				continue
+			bucket.busy = True
+			return self.claim(entry)
+
+	def next(self) -> QueueEntry | None :
+		"""Takes the next task by priority, the guilds take turns (see FairQueue) and guilds at their running cap are skipped."""
+		for queue in self.levels() :
+			while len(queue) > 0 :
+				entry = queue.popleft(self.has_capacity)
+				if entry is None :
+					break
+				entry.queued = False
+				self.make_space(entry.priority)
+				# once a task left the queue a new task with the same key is queued again.
+				self.forget(entry)
+				if entry.expired() :
+					self.expire(entry)
+					continue
+				return entry
+		return None
+
+	def expire(self, entry: QueueEntry) :
+		"""Drops a task that waited past its deadline."""
+		entry.cancelled = True
+		self.expired[entry.kind] = self.expired.get(entry.kind, 0) + 1
+		logging.debug(f"Dropping {entry.name}, it expired before it could run")
+		self.forget(entry)
+		self.drop(entry)
+
+	def forget(self, entry: QueueEntry) :
+		if entry.key is not None and self.pending.get(entry.key) is entry :
+			del self.pending[entry.key]
+
+	def has_capacity(self, guild: int) -> bool :
+		return guild is None or not self.max_running or self.in_flight.get(guild, 0) < self.max_running
+
+	def claim(self, entry: QueueEntry | None) -> QueueEntry | None :
+		if entry is not None and entry.guild is not None :
+			self.in_flight[entry.guild] = self.in_flight.get(entry.guild, 0) + 1
+		return entry
 
-		except Forbidden as e:
+	# == workers ==
 
-			if hasattr(task, 'channel') and isinstance(task.channel, channel.TextChannel) :
-				await task.channel.send(f"{task.channel.name} has been removed from queue.")
-			logging.info(f"No permission for {task.__name__}: {e}")
+	def start(self, workers: int = None) :
+		"""Starts the workers, this has to be called from within the event loop."""
+		if self.workers :
+			return
+		self.concurrency = workers or self.concurrency
+		self._wakeup = asyncio.Event()
+		self.workers = [asyncio.create_task(self.worker(number), name=f"queue-worker-{number}") for number in range(self.concurrency)]
+		logging.info(f"Started {self.concurrency} queue workers")
+
+	def stop(self) :
+		for worker in self.workers :
+			worker.cancel()
+		self.workers = []
+		self._wakeup = None
+
+	def schedule_release(self, bucket) :
+		"""Hands the next parked task of the bucket to the workers once the bucket is free and its rate limit has reset."""
+		if bucket.busy or not bucket.parked or bucket.release_handle is not None :
+			return
+		delay = bucket.until - time.monotonic()
+		if delay > 0 :
+			bucket.release_handle = asyncio.get_running_loop().call_later(delay, self.release, bucket)
+			return
+		self.release(bucket)
+
+	def release(self, bucket) :
+		bucket.release_handle = None
+		if bucket.busy or not bucket.parked :
+			return
+		if bucket.until > time.monotonic() :
+			self.schedule_release(bucket)
+			return
+		bucket.busy = True
+		self.ready.append(bucket.parked.popleft())
+		self.wake()
+
+	def finish(self, entry: QueueEntry) :
+		if entry.guild is not None :
+			running = self.in_flight.get(entry.guild, 0) - 1
+			if running > 0 :
+				self.in_flight[entry.guild] = running
+			else :
+				self.in_flight.pop(entry.guild, None)
+			if self.max_running :
+				# the guild may have tasks waiting for this slot.
+				self.wake()
+		self.free(entry.bucket)
+
+	def free(self, key: Hashable) :
+		if key is None :
+			return
+		bucket = self.buckets.get(key)
+		bucket.busy = False
+		self.schedule_release(bucket)
+		self.buckets.discard(bucket)
+
+	def wake(self) :
+		if self._wakeup is not None :
+			self._wakeup.set()
+
+	async def worker(self, number: int) :
+		"""Runs tasks until stopped, an idle worker sleeps until a task is added so the throughput is limited by discord's rate limits instead of a timer."""
+		while True :
+			entry = self.process()
+			if entry is None :
+				# Nothing can be added between the check and clearing the event, the event loop only switches on await.
+				self._wakeup.clear()
+				await self._wakeup.wait()
+				continue
+			if not entry.cancelled and entry.expired() :
+				# parked tasks can expire while they wait for their bucket.
+				self.expire(entry)
+			self.running += 1
+			token = current_bucket.set(entry.bucket)
+			cancelled = entry.cancelled
+			if not cancelled :
+				self.stats.untrack(entry.priority, entry.guild, entry.kind)
+				self.unindex(entry)
+			start = time.perf_counter()
+			try :
+				await self.run(entry)
+			finally :
+				current_bucket.reset(token)
+				self.running -= 1
+				self.finish(entry)
+			if not cancelled :
+				self.stats.record(entry.kind, time.perf_counter() - start)
+
+	async def run(self, entry: QueueEntry) :
+		if entry.cancelled :
+			return
+		try :
+			logging.info(f"Processing task: {entry.name}")
+			result = entry.materialize()
+			if inspect.isawaitable(result) :
+				await result
+
+		except RateLimited as e :
+			self.buckets.pause(entry.bucket, e.retry_after)
+			logging.warning(f"Rate limited in bucket {entry.bucket} for {entry.name}: {e}")
+		except Forbidden as e :
+			target = getattr(entry.func, '__self__', None)
+			if isinstance(target, channel.TextChannel) :
+				await target.send(f"{target.name} has been removed from queue.")
+			logging.info(f"No permission for {entry.name}: {e}")
+		except HTTPException as e :
+			if e.status == 429 :
+				self.buckets.observe(entry.bucket, e.response.headers)
+			logging.error(f"Error in queue: {e}", exc_info=True)
 		except Exception as e :
 			logging.error(f"Error in queue: {e}", exc_info=True)
-		self.task_finished = True
-		logging.info(self.status())
+		if self.empty() :
+			logging.info(self.status())
+
+	def get_queue_time(self, priority: int = 0, guild: int = None) -> float :
+		"""The estimated seconds until the queue is done, or until a new task at this priority, or of this guild, would run."""
+		if guild is not None :
+			return self.stats.guild_eta(guild, self.concurrency)
+		return self.stats.eta(self.concurrency, priority)
 
-	def get_queue_time(self) -> float :
-		return (len(self.high_priority_queue) + len(self.normal_priority_queue) + len(self.low_priority_queue)) * 0.5
+	@staticmethod
+	def minutes(seconds: float) -> float :
+		return round(math.ceil(seconds) / 60, 2)
@@ -0,0 +1,84 @@
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Hashable
+
+import aiohttp
+
+# The bucket of the task that is running, the trace callbacks run inside the task that made the request so they can read it.
+current_bucket: ContextVar[Hashable | None] = ContextVar("current_bucket", default=None)
+
+
+class Bucket :
+	"""The state of a single rate limit bucket, only one task of a bucket runs at a time."""
+	__slots__ = ("key", "busy", "until", "parked", "release_handle")
+
+	def __init__(self, key: Hashable) :
+		self.key = key
+		self.busy = False
+		# The monotonic time until which discord told us to wait.
+		self.until = 0.0
+		# Tasks that were picked up while the bucket was busy or waiting, these keep their order.
+		self.parked = deque()
+		self.release_handle = None
+
+	def idle(self) -> bool :
+		return not self.busy and not self.parked and self.until <= time.monotonic()
+
+
+class QueueBuckets :
+	"""Keeps track of the rate limit buckets the queued tasks run in.
+
+	A bucket is usually the channel or user a request is made for. Tasks in different buckets run next to each other, tasks in the same bucket run one after another and wait when discord reports that the bucket is exhausted.
+	"""
+
+	def __init__(self) :
+		self.buckets: dict[Hashable, Bucket] = {}
+
+	def __len__(self) :
+		return len(self.buckets)
+
+	def get(self, key: Hashable) -> Bucket :
+		bucket = self.buckets.get(key)
+		if bucket is None :
+			bucket = Bucket(key)
+			self.buckets[key] = bucket
+		return bucket
+
+	def discard(self, bucket: Bucket) :
+		"""Forgets idle buckets so a purge of thousands of channels doesn't keep them all in memory."""
+		if bucket.idle() and bucket.release_handle is None :
+			self.buckets.pop(bucket.key, None)
+
+	def parked(self) -> int :
+		return sum(len(bucket.parked) for bucket in self.buckets.values())
+
+	def pause(self, key: Hashable, seconds: float) :
+		"""Makes the bucket wait for the given amount of seconds before the next task runs."""
+		if key is None or seconds <= 0 :
+			return
+		bucket = self.get(key)
+		bucket.until = max(bucket.until, time.monotonic() + seconds)
+		logging.debug(f"Rate limit bucket {key} paused for {seconds}s")
+
+	def observe(self, key: Hashable, headers) :
+		"""Reads discord's rate limit headers of a response made by a task in the bucket."""
+		if key is None :
+			return
+		retry_after = headers.get("Retry-After")
+		if retry_after is not None :
+			self.pause(key, float(retry_after))
+			return
+		if headers.get("X-RateLimit-Remaining") == "0" :
+			self.pause(key, float(headers.get("X-RateLimit-Reset-After", 0)))
+
+	def trace_config(self) -> aiohttp.TraceConfig :
+		"""The trace config for the bot's http client, this lets the queue see the headers of every request it makes."""
+
+		async def on_request_end(session, context, params: aiohttp.TraceRequestEndParams) :
+			self.observe(current_bucket.get(), params.response.headers)
+
+		trace = aiohttp.TraceConfig()
+		trace.on_request_end.append(on_request_end)
+		return trace
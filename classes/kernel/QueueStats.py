@@ -0,0 +1,133 @@
+import time
+from collections import deque
+from typing import Hashable
+
+
+class TaskTypeStats :
+	"""The smoothed duration of a single task type."""
+	__slots__ = ("duration", "count")
+
+	def __init__(self) :
+		self.duration = 0.0
+		self.count = 0
+
+	def record(self, seconds: float, alpha: float) :
+		self.duration = seconds if self.count == 0 else alpha * seconds + (1 - alpha) * self.duration
+		self.count += 1
+
+
+class QueueStats :
+	"""Measures how long every type of task takes and how many tasks the queue finishes, the queue estimates are based on these.
+
+	Durations are an exponentially weighted moving average per task type, so a change in discord's latency shows up after a couple of tasks. The throughput is measured over the last `window` seconds, this includes the time tasks spend waiting on rate limits.
+	"""
+
+	def __init__(self, default_duration: float = 0.5, alpha: float = 0.2, window: float = 60.0) :
+		self.default_duration = default_duration
+		self.alpha = alpha
+		self.window = window
+		self.types: dict[str, TaskTypeStats] = {}
+		self.finished: deque[float] = deque()
+		# (priority, guild, task type) -> the amount of tasks that haven't run yet.
+		self.queued: dict[tuple[int, Hashable, str], int] = {}
+
+	# == bookkeeping ==
+
+	def track(self, priority: int, guild: Hashable, task_type: str) :
+		key = (priority, guild, task_type)
+		self.queued[key] = self.queued.get(key, 0) + 1
+
+	def untrack(self, priority: int, guild: Hashable, task_type: str) :
+		key = (priority, guild, task_type)
+		count = self.queued.get(key, 0) - 1
+		if count > 0 :
+			self.queued[key] = count
+		else :
+			self.queued.pop(key, None)
+
+	def reset(self) :
+		self.queued = {}
+
+	def record(self, task_type: str, seconds: float) :
+		stats = self.types.get(task_type)
+		if stats is None :
+			stats = TaskTypeStats()
+			self.types[task_type] = stats
+		stats.record(seconds, self.alpha)
+		now = time.monotonic()
+		self.finished.append(now)
+		self.trim(now)
+
+	def trim(self, now: float) :
+		while self.finished and self.finished[0] < now - self.window :
+			self.finished.popleft()
+
+	# == estimates ==
+
+	def duration(self, task_type: str) -> float :
+		stats = self.types.get(task_type)
+		return stats.duration if stats is not None else self.default_duration
+
+	def throughput(self) -> float | None :
+		"""The amount of tasks finished per second, None until enough tasks finished to tell."""
+		self.trim(time.monotonic())
+		if len(self.finished) < 10 :
+			return None
+		return len(self.finished) / self.window
+
+	def estimate(self, count: int, work: float, concurrency: int) -> float :
+		"""The seconds needed for `count` tasks that take `work` seconds together.
+
+		The workers share the work, but the queue can't go faster than the throughput measured recently, which is usually limited by discord's rate limits."""
+		seconds = work / max(concurrency, 1)
+		throughput = self.throughput()
+		if throughput :
+			seconds = max(seconds, count / throughput)
+		return seconds
+
+	def eta(self, concurrency: int, priority: int = 0) -> float :
+		"""The seconds until every task at this priority or higher has run, tasks of a lower priority don't hold these up."""
+		count = 0
+		work = 0.0
+		for (task_priority, _, task_type), amount in self.queued.items() :
+			if task_priority < priority :
+				continue
+			count += amount
+			work += amount * self.duration(task_type)
+		return self.estimate(count, work, concurrency)
+
+	def guild_eta(self, guild: Hashable, concurrency: int) -> float :
+		"""The seconds until every task of the guild has run.
+
+		Guilds take turns, so until its last task runs every other guild runs at most as many tasks as this guild has queued. Higher priorities are done first, every priority is estimated the same way."""
+		per_priority: dict[int, dict[Hashable, tuple[int, float]]] = {}
+		for (priority, task_guild, task_type), amount in self.queued.items() :
+			guilds = per_priority.setdefault(priority, {})
+			count, work = guilds.get(task_guild, (0, 0.0))
+			guilds[task_guild] = (count + amount, work + amount * self.duration(task_type))
+		own_priorities = [priority for priority, guilds in per_priority.items() if guild in guilds]
+		if not own_priorities :
+			return 0.0
+		lowest = min(own_priorities)
+		count = 0
+		work = 0.0
+		for priority, guilds in per_priority.items() :
+			if priority < lowest :
+				continue
+			own = guilds.get(guild, (0, 0.0))[0]
+			for task_guild, (guild_count, guild_work) in guilds.items() :
+				if priority > lowest or task_guild == guild :
+					count += guild_count
+					work += guild_work
+					continue
+				# another guild at the same priority gets as many turns as this guild needs.
+				turns = min(guild_count, own)
+				count += turns
+				work += guild_work / guild_count * turns
+		return self.estimate(count, work, concurrency)
+
+	def status(self) -> str :
+		throughput = self.throughput()
+		types = sorted(self.types.items(), key=lambda item : item[1].count, reverse=True)
+		return "\n".join([f"Throughput: {round(throughput, 2) if throughput else 'measuring'} tasks/s"] +
+		                 [f"{task_type}: {round(stats.duration * 1000)}ms avg over {stats.count} runs" for task_type, stats in types[:15]])
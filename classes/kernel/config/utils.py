@@ -20,7 +20,7 @@ class ConfigUtils(ABC):
 			return
 		logging.info("Logging of configuration changes is enabled.")
 		if not channel:
-			channel = ConfigData().get_channel(guild, ConfigMapping.CHANGE_LOG_CHANNEL)
+			channel = await ConfigData().get_channel(guild, ConfigMapping.CHANGE_LOG_CHANNEL)
 		if channel is None :
 			logging.info("No modlobby channel found for logging configuration changes.")
 			return
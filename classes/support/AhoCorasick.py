@@ -0,0 +1,89 @@
+from collections import deque
+from typing import NamedTuple
+
+
+class WordHit(NamedTuple) :
+	"""A blacklisted word found in a text, start and end are positions in the case-folded text."""
+	start: int
+	end: int
+	word: str
+
+
+class AhoCorasick :
+	"""A case-folded Aho–Corasick automaton for the forum blacklist.
+
+	All words are compiled into a single trie with failure links, a text is then scanned once from left to right. The cost of a scan depends on the length of the text and the amount of hits, not on the amount of words in the blacklist.
+	"""
+
+	def __init__(self, words: list[str], whole_words: bool = False) :
+		self.whole_words = whole_words
+		self.words: list[str] = []
+		# Every node in the trie is an index into these lists, node 0 is the root.
+		self._goto: list[dict[str, int]] = [{}]
+		self._fail: list[int] = [0]
+		self._output: list[tuple[str, ...]] = [()]
+		for word in dict.fromkeys(word.casefold() for word in words) :
+			if not word :
+				continue
+			self.add(word)
+		self.build()
+
+	def __len__(self) :
+		return len(self.words)
+
+	def add(self, word: str) :
+		"""Adds the word to the trie, this has to be done before the automaton is built."""
+		node = 0
+		for char in word :
+			following = self._goto[node].get(char)
+			if following is None :
+				following = len(self._goto)
+				self._goto[node][char] = following
+				self._goto.append({})
+				self._fail.append(0)
+				self._output.append(())
+			node = following
+		self._output[node] = (word,)
+		self.words.append(word)
+
+	def build(self) :
+		"""Creates the failure links breadth first, every node also inherits the words of the node it fails to."""
+		queue = deque(self._goto[0].values())
+		while queue :
+			node = queue.popleft()
+			for char, following in self._goto[node].items() :
+				queue.append(following)
+				fail = self._fail[node]
+				while fail and char not in self._goto[fail] :
+					fail = self._fail[fail]
+				self._fail[following] = self._goto[fail].get(char, 0)
+				self._output[following] = self._output[following] + self._output[self._fail[following]]
+
+	def search(self, text: str, folded: bool = False) -> list[WordHit] :
+		"""Returns every blacklisted word in the text in a single pass. Pass folded=True when the text is already case-folded."""
+		if not self.words :
+			return []
+		if not folded :
+			text = text.casefold()
+		hits = []
+		goto, fail, output = self._goto, self._fail, self._output
+		node = 0
+		for index, char in enumerate(text) :
+			while node and char not in goto[node] :
+				node = fail[node]
+			node = goto[node].get(char, 0)
+			for word in output[node] :
+				start = index - len(word) + 1
+				if self.whole_words and not self.is_whole_word(text, start, index + 1) :
+					continue
+				hits.append(WordHit(start, index + 1, word))
+		return hits
+
+	@staticmethod
+	def is_whole_word(text: str, start: int, end: int) -> bool :
+		"""Checks that the hit isn't part of a bigger word."""
+		if start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_") :
+			return False
+		if end < len(text) and (text[end].isalnum() or text[end] == "_") :
+			return False
+		return True
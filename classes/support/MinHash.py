@@ -0,0 +1,105 @@
+import random
+import struct
+import threading
+import zlib
+from typing import Any
+
+
+class MinHashIndex :
+	"""A MinHash + locality-sensitive hashing index for finding near-duplicate texts.
+
+	Every text is reduced to a short signature, the signature is split into bands and texts that share at least one band end up in the same bucket. A query only looks at the texts in its own buckets, so finding candidates doesn't depend on the amount of texts in the index. The candidates are only likely to be similar, the caller is expected to confirm them.
+
+	The defaults put the threshold near a Jaccard similarity of 0.5 on 5 character shingles, (1/16)^(1/4), which is where texts with a 0.7 edit ratio end up. Shorter shingles or more bands make unrelated texts share a bucket.
+	"""
+	# A mersenne prime, large enough to keep the permutations apart.
+	_prime = (1 << 61) - 1
+
+	def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 5) :
+		if num_perm % bands != 0 :
+			raise ValueError("num_perm has to be divisible by bands")
+		self.num_perm = num_perm
+		self.bands = bands
+		self.rows = num_perm // bands
+		self.shingle_size = shingle_size
+		# a fixed seed keeps signatures comparable between indexes.
+		generator = random.Random(num_perm)
+		self._permutations = [(generator.randrange(1, self._prime), generator.randrange(0, self._prime)) for _ in range(num_perm)]
+		self._buckets: list[dict[tuple[int, ...], set[int]]] = [{} for _ in range(bands)]
+		self._signatures: dict[int, tuple[int, ...]] = {}
+		self._values: dict[int, Any] = {}
+		# queries can come from the automod threads while the event loop adds or removes entries.
+		self._lock = threading.Lock()
+
+	def __len__(self) :
+		return len(self._signatures)
+
+	def __contains__(self, key: int) :
+		return key in self._signatures
+
+	def shingles(self, text: str) -> set[int] :
+		"""Splits the text into hashed, overlapping character shingles."""
+		if len(text) <= self.shingle_size :
+			return {zlib.crc32(text.encode())}
+		return {zlib.crc32(text[i :i + self.shingle_size].encode()) for i in range(len(text) - self.shingle_size + 1)}
+
+	def signature(self, text: str) -> tuple[int, ...] :
+		shingles = self.shingles(text)
+		prime = self._prime
+		return tuple(min((a * shingle + b) % prime for shingle in shingles) for a, b in self._permutations)
+
+	def pack(self, signature: tuple[int, ...]) -> bytes :
+		"""The signature as bytes, so it can be stored instead of being calculated again from the text. The settings it was made with are stored in front of it."""
+		return struct.pack(f"<2H{self.num_perm}Q", self.num_perm, self.shingle_size, *signature)
+
+	def unpack(self, packed: bytes) -> tuple[int, ...] | None :
+		"""Returns the stored signature, or None when it was made with other settings and has to be calculated again."""
+		if len(packed) != struct.calcsize(f"<2H{self.num_perm}Q") or struct.unpack_from("<2H", packed) != (self.num_perm, self.shingle_size) :
+			return None
+		return struct.unpack_from(f"<{self.num_perm}Q", packed, struct.calcsize("<2H"))
+
+	def bands_of(self, signature: tuple[int, ...]) -> list[tuple[int, ...]] :
+		return [signature[band * self.rows :(band + 1) * self.rows] for band in range(self.bands)]
+
+	def add(self, key: int, text: str, value: Any = None) :
+		"""Adds the text to the index, an existing entry with the same key is replaced."""
+		self.add_signature(key, self.signature(text), value)
+
+	def add_signature(self, key: int, signature: tuple[int, ...], value: Any = None) :
+		"""Adds a text by its signature, for texts whose signature was stored."""
+		with self._lock :
+			self._remove(key)
+			self._signatures[key] = signature
+			self._values[key] = value
+			for buckets, band in zip(self._buckets, self.bands_of(signature)) :
+				buckets.setdefault(band, set()).add(key)
+
+	def remove(self, key: int) -> bool :
+		with self._lock :
+			return self._remove(key)
+
+	def _remove(self, key: int) -> bool :
+		signature = self._signatures.pop(key, None)
+		if signature is None :
+			return False
+		self._values.pop(key, None)
+		for buckets, band in zip(self._buckets, self.bands_of(signature)) :
+			bucket = buckets.get(band)
+			if bucket is None :
+				continue
+			bucket.discard(key)
+			if not bucket :
+				del buckets[band]
+		return True
+
+	def query(self, text: str) -> list[tuple[int, Any]] :
+		"""Returns the key and value of every candidate near-duplicate of the text."""
+		return self.query_signature(self.signature(text))
+
+	def query_signature(self, signature: tuple[int, ...]) -> list[tuple[int, Any]] :
+		bands = self.bands_of(signature)
+		candidates = set()
+		with self._lock :
+			for buckets, band in zip(self._buckets, bands) :
+				candidates.update(buckets.get(band, ()))
+			return [(key, self._values[key]) for key in candidates]
@@ -0,0 +1,66 @@
+import functools
+import unicodedata
+
+
+class NormalizedText :
+	"""A normalized view of a message, with the position of every normalized character in the original text."""
+	__slots__ = ("original", "text", "offsets")
+
+	def __init__(self, original: str, text: str, offsets: list[int]) :
+		self.original = original
+		self.text = text
+		self.offsets = offsets
+
+	def __len__(self) :
+		return len(self.text)
+
+	def original_span(self, start: int, end: int) -> str :
+		"""Returns the part of the original text that became text[start:end]."""
+		if start >= end or start >= len(self.offsets) :
+			return ""
+		return self.original[self.offsets[start] :self.offsets[end - 1] + 1]
+
+
+class Normalizer :
+	"""Normalizes a message once so the blacklist and duplicate checks can use the same view.
+
+	Every character is NFKC normalized, case-folded and mapped to its latin lookalike. Zero-width characters, leftover combining marks (zalgo) and the characters discord uses for markdown are removed, so `ѕ*p*a​m` reads as `spam`.
+	"""
+	# Format characters (category Cf) are always removed, these are the invisible ones that aren't in that category.
+	INVISIBLE = frozenset("ᅟᅠㅤﾠ⠀")
+	MARKDOWN = frozenset("*~|`\\")
+	# Cyrillic and greek letters that look the same as a latin letter; NFKC already takes care of fullwidth and mathematical letters.
+	CONFUSABLES = {
+		"а" : "a", "в" : "b", "е" : "e", "ё" : "e", "к" : "k", "м" : "m", "н" : "h", "о" : "o", "р" : "p", "с" : "c",
+		"т" : "t", "у" : "y", "х" : "x", "і" : "i", "ї" : "i", "ј" : "j", "ѕ" : "s", "ԁ" : "d", "ԛ" : "q", "ԝ" : "w",
+		"ɡ" : "g", "ɑ" : "a", "ı" : "i",
+		"α" : "a", "β" : "b", "ε" : "e", "η" : "n", "ι" : "i", "κ" : "k", "ν" : "v", "ο" : "o", "ρ" : "p", "τ" : "t",
+		"υ" : "u", "χ" : "x", "ω" : "w",
+	}
+
+	@classmethod
+	def normalize(cls, text: str) -> NormalizedText :
+		"""Normalizes the text in a single pass."""
+		normalized = []
+		offsets = []
+		for index, char in enumerate(text) :
+			folded = cls.fold(char)
+			if not folded :
+				continue
+			normalized.append(folded)
+			# a character can become more than one character (ß -> ss), they all point back to the same original character.
+			offsets.extend([index] * len(folded))
+		return NormalizedText(text, "".join(normalized), offsets)
+
+	@staticmethod
+	@functools.lru_cache(maxsize=8192)
+	def fold(char: str) -> str :
+		"""Normalizes a single character, messages reuse the same characters so the result is cached."""
+		if char in Normalizer.MARKDOWN or char in Normalizer.INVISIBLE or unicodedata.category(char) == "Cf" :
+			return ""
+		folded = []
+		for part in unicodedata.normalize("NFKC", char).casefold() :
+			if unicodedata.category(part) == "Mn" :
+				continue
+			folded.append(Normalizer.CONFUSABLES.get(part, part))
+		return "".join(folded)
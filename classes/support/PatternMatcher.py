@@ -0,0 +1,63 @@
+import logging
+from typing import NamedTuple
+
+import re2
+
+
+class PatternRule(NamedTuple) :
+	"""A single automod pattern, the id and name are the ones stored in the database."""
+	id: int
+	name: str
+	action: str
+	pattern: str
+
+
+class PatternMatcher :
+	"""Matches every pattern of a forum against a message in a single pass.
+
+	All patterns are added to one re2.Set, re2 then scans the message once and returns the index of every pattern that matched. This replaces a separate scan for the block, warn and each required pattern.
+	"""
+
+	def __init__(self, rules: list[PatternRule]) :
+		self.rules: list[PatternRule] = []
+		# the single pattern regexes are only compiled when a rule fired and its match has to be shown, the set is compiled up front.
+		self._regexes: dict[str, re2._Regexp] = {}
+		self._set = re2.Set.SearchSet(self.options())
+		for rule in rules :
+			try :
+				self._set.Add(rule.pattern)
+			except re2.error as e :
+				logging.warning(f"Skipping invalid pattern `{rule.name}` (`{rule.pattern}`): {e}")
+				continue
+			# The index returned by re2 is the position in this list, so we only append patterns re2 accepted.
+			self.rules.append(rule)
+		self._set.Compile()
+
+	@staticmethod
+	def options() -> re2.Options :
+		options = re2.Options()
+		options.case_sensitive = False
+		return options
+
+	def match(self, content: str) -> list[PatternRule] :
+		"""Returns every rule that matched the content, in the order they were added."""
+		if not self.rules :
+			return []
+		return [self.rules[index] for index in sorted(self._set.Match(content) or [])]
+
+	def matched_text(self, rule: PatternRule, content: str) -> str :
+		"""Returns the text the rule matched, this is only used to explain a hit to the user so the extra search is only done when a rule fired."""
+		start, end = self.matched_span(rule, content)
+		return content[start:end]
+
+	def matched_span(self, rule: PatternRule, content: str) -> tuple[int, int] :
+		"""Returns the start and end of the first match of the rule, (0, 0) if it doesn't match."""
+		regex = self._regexes.get(rule.pattern)
+		if regex is None :
+			regex = re2.compile(rule.pattern, options=self.options())
+			self._regexes[rule.pattern] = regex
+		result = regex.search(content)
+		return result.span() if result else (0, 0)
+
+	def of_type(self, action: str) -> list[PatternRule] :
+		return [rule for rule in self.rules if rule.action == action]
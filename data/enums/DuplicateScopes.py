@@ -0,0 +1,6 @@
+from enum import StrEnum
+
+
+class DuplicateScopes(StrEnum) :
+	AUTHOR = "AUTHOR" # only threads by the same user are compared, this is the default.
+	ANY = "ANY" # threads by every user are compared, this also catches reposts from alt accounts.
@@ -0,0 +1,7 @@
+from enum import StrEnum
+
+
+class QueueTaskStatus(StrEnum) :
+	PENDING = "PENDING" # waiting to run, or waiting for its next attempt.
+	LEASED = "LEASED" # a worker is running the task, the lease expires when the bot stops while running it.
+	DEAD = "DEAD" # the task failed too many times, it's kept for inspection and won't run again.
@@ -1,12 +1,15 @@
 # python
+import logging
 import os
 from datetime import datetime
 from typing import List
 
 import pymysql
-from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, String, Text, create_engine
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, LargeBinary, String, Text, UniqueConstraint, \
+	create_engine, delete, inspect, literal, select, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
 from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import AddConstraint
 from sqlalchemy.sql import func
 from sqlalchemy_utils import create_database, database_exists
 
@@ -32,6 +35,8 @@ class Base(DeclarativeBase) :
 
 class Config(Base) :
 	__tablename__ = "config"
+	# a guild has one value per key, this is what the config upserts rely on.
+	__table_args__ = (UniqueConstraint("guild", "key", name="uq_config_guild_key"),)
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	guild: Mapped[int] = mapped_column(BigInteger, ForeignKey("servers.id", ondelete="CASCADE"))
 	key: Mapped[str] = mapped_column(String(512))
@@ -67,6 +72,9 @@ class Forums(Base) :
 	server: Mapped["Servers"] = relationship("Servers", back_populates="forums")
 	minimum_characters: Mapped[int] = mapped_column(BigInteger, default=0)
 	duplicates: Mapped[bool] = mapped_column(Boolean, default=True)
+	blacklist_whole_words: Mapped[bool] = mapped_column(Boolean, default=False)
+	duplicate_threshold: Mapped[float] = mapped_column(Float, default=0.7)
+	duplicate_scope: Mapped[str] = mapped_column(String(100), default="AUTHOR")  # AUTHOR, ANY
 	patterns: Mapped[List["ForumPatterns"]] = relationship("ForumPatterns", back_populates="forum",
 	                                                       cascade="all, delete-orphan")
 	cleanup: Mapped[List["ForumCleanup"]] = relationship("ForumCleanup", back_populates="forum",
@@ -93,6 +101,39 @@ class ForumCleanup(Base) :
 	forum: Mapped["Forums"] = relationship("Forums", back_populates="cleanup")
 
 
+class ThreadFingerprints(Base) :
+	"""The normalized starter message of every thread in a watched forum, used by automod to detect duplicate posts without fetching old threads."""
+	__tablename__ = "thread_fingerprints"
+	__table_args__ = (Index("ix_thread_fingerprints_forum_owner", "forum_id", "owner_id"),)
+	id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # thread id
+	forum_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("forums.id", ondelete="CASCADE"))
+	owner_id: Mapped[int] = mapped_column(BigInteger)
+	content: Mapped[str] = mapped_column(Text)
+	# the packed MinHash signature of the content, the duplicate index is built from these without hashing every thread again.
+	signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=True, default=None)
+	created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class QueuedTasks(Base) :
+	"""The tasks of the persistent queue, these survive a restart of the bot."""
+	__tablename__ = "queue_tasks"
+	__table_args__ = (Index("ix_queue_tasks_status_available", "status", "available_at"),)
+	id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+	task_type: Mapped[str] = mapped_column(String(100))
+	payload: Mapped[str] = mapped_column(Text)  # the json encoded arguments of the task
+	priority: Mapped[int] = mapped_column(default=1)
+	guild_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+	bucket: Mapped[int] = mapped_column(BigInteger, nullable=True)
+	forum_id: Mapped[int] = mapped_column(BigInteger, nullable=True, default=None)
+	job: Mapped[str] = mapped_column(String(200), nullable=True, default=None)
+	status: Mapped[str] = mapped_column(String(20), default="PENDING")
+	attempts: Mapped[int] = mapped_column(default=0)
+	available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+	leased_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
+	last_error: Mapped[str] = mapped_column(Text, nullable=True, default=None)
+	created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
 class Staff(Base) :
 	__tablename__ = "staff"
 	id: Mapped[int] = mapped_column(primary_key=True)
@@ -107,11 +148,61 @@ class database :
 	@staticmethod
 	def create() :
 		Base.metadata.create_all(engine)
+		upgrade_bot_database()
 		print("Database built")
 
 
 def create_bot_database() :
 	Base.metadata.create_all(engine)
+	upgrade_bot_database()
+
+
+def upgrade_bot_database() :
+	"""create_all only creates missing tables, the columns and unique constraints that were added to an existing table are added here. Existing rows get the default of the column."""
+	inspector = inspect(engine)
+	tables = set(inspector.get_table_names())
+	with engine.begin() as connection :
+		for table in Base.metadata.sorted_tables :
+			if table.name not in tables :
+				continue
+			existing = {column["name"] for column in inspector.get_columns(table.name)}
+			for column in table.columns :
+				if column.name in existing :
+					continue
+				connection.execute(text(f"ALTER TABLE {engine.dialect.identifier_preparer.format_table(table)} ADD COLUMN {column_definition(column)}"))
+				logging.info(f"Added column {column.name} to {table.name}")
+			add_unique_constraints(connection, inspector, table)
+
+
+def add_unique_constraints(connection, inspector, table) :
+	"""Adds the unique constraints an existing table is missing, the rows that break the constraint are removed first and the newest row of every duplicate is kept."""
+	# compared by their columns, the database names an unnamed constraint itself.
+	existing = {frozenset(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table.name)}
+	existing |= {frozenset(index["column_names"]) for index in inspector.get_indexes(table.name) if index["unique"]}
+	for constraint in table.constraints :
+		if not isinstance(constraint, UniqueConstraint) or frozenset(constraint.columns.keys()) in existing :
+			continue
+		columns = list(constraint.columns)
+		key = list(table.primary_key.columns)[0]
+		duplicates = connection.execute(select(*columns, func.max(key)).group_by(*columns).having(func.count() > 1)).all()
+		for *values, newest in duplicates :
+			connection.execute(delete(table).where(*[column == value for column, value in zip(columns, values)], key != newest))
+		if engine.dialect.name == "sqlite" :
+			# sqlite can't alter a constraint into a table, a unique index enforces the same.
+			Index(constraint.name or f"uq_{table.name}_{'_'.join(column.name for column in columns)}", *columns, unique=True).create(connection)
+		else :
+			connection.execute(AddConstraint(constraint))
+		logging.info(f"Added unique constraint {constraint.name} to {table.name}, removed {len(duplicates)} duplicates")
+
+
+def column_definition(column: Column) -> str :
+	"""The definition of a column that is added to a table with rows, a column without a default has to allow null."""
+	definition = f"{engine.dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+	default = column.default.arg if column.default is not None and column.default.is_scalar else None
+	if default is None :
+		return definition + " NULL"
+	value = literal(default, column.type).compile(dialect=engine.dialect, compile_kwargs={"literal_binds" : True})
+	return definition + f"{'' if column.nullable else ' NOT NULL'} DEFAULT {value}"
 
 
 def drop_bot_database() :
@@ -1,6 +1,7 @@
 import logging
 
-from sqlalchemy import Select
+from sqlalchemy import Select, delete, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 
 from database.transactions.DatabaseTransactions import DatabaseTransactions
 import database.database as db
@@ -10,162 +11,129 @@ import database.database as db
 
 
 class ConfigTransactions(DatabaseTransactions) :
+	"""Every guild has a single row per key, writes are done with one upsert statement instead of checking if the key exists first. Databases without an upsert fall back to looking the keys up."""
+
+	@staticmethod
+	def rows(guildid: int, values: dict) -> list[dict] :
+		return [{"guild" : guildid, "key" : key.upper(), "value" : str(value)} for key, value in values.items()]
+
+	@classmethod
+	def upsert(cls, session, rows: list[dict], overwrite: bool = True) -> int :
+		"""Writes the rows and returns how many were inserted or updated, existing keys are updated or, without overwrite, left alone."""
+		statement = cls.upsert_statement(session, rows, overwrite)
+		if statement is None :
+			return cls.select_update(session, rows, overwrite)
+		return session.execute(statement).rowcount
+
+	@staticmethod
+	def upsert_statement(session, rows: list[dict], overwrite: bool = True) :
+		"""Builds the insert statement for the dialect of the database, None when the dialect has no upsert."""
+		match session.get_bind().dialect.name :
+			case "mysql" | "mariadb" :
+				statement = mysql.insert(db.Config).values(rows)
+				if not overwrite :
+					return statement.prefix_with("IGNORE")
+				return statement.on_duplicate_key_update(value=statement.inserted.value)
+			case "postgresql" :
+				statement = postgresql.insert(db.Config).values(rows)
+			case "sqlite" :
+				statement = sqlite.insert(db.Config).values(rows)
+			case _ :
+				return None
+		if not overwrite :
+			return statement.on_conflict_do_nothing(index_elements=["guild", "key"])
+		return statement.on_conflict_do_update(index_elements=["guild", "key"], set_={"value" : statement.excluded.value})
+
+	@staticmethod
+	def select_update(session, rows: list[dict], overwrite: bool = True) -> int :
+		"""The upsert for other databases, the existing keys are looked up first and the rest is inserted."""
+		written = 0
+		for row in rows :
+			existing = session.scalar(Select(db.Config.id).where(db.Config.guild == row["guild"], db.Config.key == row["key"]).limit(1))
+			if existing is None :
+				session.add(db.Config(**row))
+				written += 1
+			elif overwrite :
+				written += session.execute(
+					update(db.Config).where(db.Config.guild == row["guild"], db.Config.key == row["key"]).values(value=row["value"])).rowcount
+		return written
 
-	
-	
 	def config_update(self, guildid: int, key: str, value) :
 		with self.createsession() as session :
 
-			if not ConfigTransactions().key_exists_check(guildid, key) :
-				return False
-			exists = session.scalar(Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()))
-			exists.value = value
+			result = session.execute(
+				update(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()).values(value=str(value)))
 			DatabaseTransactions().commit(session)
-			return True
+			return result.rowcount > 0
 
-	
-	
 	def config_unique_add(self, guildid: int, key: str, value, overwrite=False) :
-		# This function should check if the item already exists, if so it will override it or throw an error.
+		# Without overwrite an existing key is kept, the database decides this in the same statement.
 		with self.createsession() as session :
 
-			value = str(value)
-			# Use a version of key_exists_check that doesn't delete
-			exists = self.key_exists_check(guildid, key)
-			if exists and not overwrite :
+			written = self.upsert(session, self.rows(guildid, {key : value}), overwrite=overwrite)
+			DatabaseTransactions().commit(session)
+			if not overwrite and written == 0 :
 				logging.warning(
 					f"Attempted to add unique key with data: {guildid}, {key}, {value}, and overwrite {overwrite}, but one already existed. No changes")
 				return False
-
-			if exists and overwrite :
-
-				# Explicitly delete existing entries if overwrite is True
-				item = session.scalar(Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()))
-
-				item.value = value
-				session.add(item)
-				DatabaseTransactions().commit(session)
-				logging.info(f"Overwriting unique key with data: {guildid}, {key}, {value}, and overwrite {overwrite}")
-				return True
-
-			# A single commit is more efficient
-			# self.commit(session)
-
-			item = db.Config(guild=guildid, key=key.upper(), value=value)
-			session.add(item)
-			DatabaseTransactions().commit(session)
-			logging.info(f"Adding unique key with data: {guildid}, {key}, {value}, and overwrite {overwrite}")
+			logging.info(f"Setting unique key with data: {guildid}, {key}, {value}, and overwrite {overwrite}")
 			return True
 
-
-	
-	def toggle_welcome(self, guildid: int, key: str, value) :
-		# This function should check if the item already exists, if so it will override it or throw an error.
+	def config_upsert_many(self, guildid: int, values: dict) :
+		"""Sets multiple keys of a guild in one transaction, for example a settings page that saves at once."""
+		if not values :
+			return True
 		with self.createsession() as session :
 
-			value = str(value)
-			guilddata = session.scalar(Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()))
-			if guilddata is None :
-				ConfigTransactions().config_unique_add(guildid, key, value, overwrite=True)
-				return None
-			guilddata.value = value
+			self.upsert(session, self.rows(guildid, values))
 			DatabaseTransactions().commit(session)
-
+			logging.info(f"Setting {len(values)} keys in {guildid}: {values}")
 			return True
 
-	
-	
-	def config_unique_get(self, guildid: int, key: str) :
-		with self.createsession() as session :
-
-			if not ConfigTransactions().key_exists_check(guildid, key) :
-				return None
-			exists = session.scalar(Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()))
-			return exists.value
 
-	
-	
-	def config_key_add(self, guildid: int, key: str, value) :
-		with self.createsession() as session :
 
-			value = str(value)
-			if ConfigTransactions().key_multiple_exists_check(guildid, key, value) :
-				return False
-			item = db.Config(guild=guildid, key=key.upper(), value=value)
-			session.add(item)
-			DatabaseTransactions().commit(session)
+	def toggle_welcome(self, guildid: int, key: str, value) :
+		self.config_unique_add(guildid, key, value, overwrite=True)
+		return True
 
-			return True
 
-	
-	
-	def key_multiple_exists_check(self, guildid: int, key: str, value) :
-		with self.createsession() as session :
 
-			exists = session.scalar(
-				Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key, db.Config.value == value))
-			session.close()
-			if exists is not None :
-				return True
-			return False
-
-	
-	
-	def config_key_remove(self, guildid: int, key: str, value) :
+	def config_unique_get(self, guildid: int, key: str) :
 		with self.createsession() as session :
 
-			if not ConfigTransactions().key_multiple_exists_check(guildid, key, value) :
-				return False
-			exists = session.scalar(
-				Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key, db.Config.value == value))
-			session.delete(exists)
-			DatabaseTransactions().commit(session)
-			return None
+			return session.scalar(Select(db.Config.value).where(db.Config.guild == guildid, db.Config.key == key.upper()))
 
 	def config_unique_remove(self, guild_id: int, key: str) :
 		with self.createsession() as session :
 
-			if not ConfigTransactions().key_exists_check(guild_id, key) :
-				return False
-			exists = session.scalar(
-				Select(db.Config).where(db.Config.guild == guild_id, db.Config.key == key))
-			session.delete(exists)
+			result = session.execute(delete(db.Config).where(db.Config.guild == guild_id, db.Config.key == key.upper()))
 			DatabaseTransactions().commit(session)
-			return None
+			return result.rowcount > 0
 
 	def key_exists_check(self, guildid: int, key: str) :
 		with self.createsession() as session :
 
 			exists = session.scalar(
-				Select(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()))
-			if exists is None :
-				session.close()
-				return False
-			return True
+				Select(db.Config.id).where(db.Config.guild == guildid, db.Config.key == key.upper()))
+			return exists is not None
+
+
 
-	
-	
 	def toggle_add(self, guildid, key, value=False) :
-		with self.createsession() as session :
+		self.config_unique_add(guildid, key, value, overwrite=True)
+		logging.info(f"Set toggle '{key}' with value '{value}' in {guildid}")
+		from classes.kernel.ConfigData import ConfigData
+		ConfigData().patch(guildid, {key : value})
 
-			if ConfigTransactions().key_exists_check(guildid, key.upper()) :
-				item = session.query(db.Config).where(db.Config.guild == guildid, db.Config.key == key.upper()).first()
-				item.value = value
-				from classes.kernel.ConfigData import ConfigData
-				DatabaseTransactions().commit(session)
-				ConfigData().load_guild(guildid)
-				return
-			welcome = db.Config(guild=guildid, key=key.upper(), value=value)
-			session.merge(welcome)
-			logging.info(f"Added toggle '{key}' with value '{value}' in {guildid}")
-			DatabaseTransactions().commit(session)
-			from classes.kernel.ConfigData import ConfigData
-			ConfigData().load_guild(guildid)
 
 
-	
-	
 	def server_config_get(self, guildid) :
 		with self.createsession() as session :
 
 			return session.scalars(Select(db.Config).where(db.Config.guild == guildid)).all()
+
+	def config_get_all(self) :
+		"""Returns the config rows of every guild in one query."""
+		with self.createsession() as session :
+
+			return session.scalars(Select(db.Config)).all()
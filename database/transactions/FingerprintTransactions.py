@@ -0,0 +1,64 @@
+from sqlalchemy import delete, select, update
+
+from database.database import ThreadFingerprints
+from database.transactions.DatabaseTransactions import DatabaseTransactions
+
+
+class FingerprintTransactions(DatabaseTransactions) :
+
+	def add(self, thread_id: int, forum_id: int, owner_id: int, content: str, signature: bytes = None) -> ThreadFingerprints :
+		"""Adds the fingerprint of a thread, an existing fingerprint for the same thread is overwritten."""
+		with self.createsession() as session :
+			fingerprint = ThreadFingerprints(
+				id=thread_id,
+				forum_id=forum_id,
+				owner_id=owner_id,
+				content=content,
+				signature=signature
+			)
+			fingerprint = session.merge(fingerprint)
+			self.commit(session)
+			return fingerprint
+
+	def add_many(self, fingerprints: list[ThreadFingerprints]) -> None :
+		"""Adds the fingerprints in one transaction, existing fingerprints of the same threads are overwritten."""
+		with self.createsession() as session :
+			for fingerprint in fingerprints :
+				session.merge(fingerprint)
+			self.commit(session)
+
+	def get(self, thread_id: int) -> ThreadFingerprints | None :
+		with self.createsession() as session :
+			return session.get(ThreadFingerprints, thread_id)
+
+	def get_ids(self, forum_id: int) -> set[int] :
+		"""Returns the ids of the threads in the forum that have a fingerprint."""
+		with self.createsession() as session :
+			return set(session.scalars(select(ThreadFingerprints.id).where(ThreadFingerprints.forum_id == forum_id)).all())
+
+	def get_signatures(self, forum_id: int) -> list :
+		"""Returns the id, owner and signature of every fingerprint in the forum, the content isn't loaded."""
+		with self.createsession() as session :
+			return session.execute(select(ThreadFingerprints.id, ThreadFingerprints.owner_id, ThreadFingerprints.signature)
+			                       .where(ThreadFingerprints.forum_id == forum_id)).all()
+
+	def get_contents(self, thread_ids: list[int]) -> dict[int, str] :
+		"""Returns the content of the fingerprints by thread id."""
+		if not thread_ids :
+			return {}
+		with self.createsession() as session :
+			return dict(session.execute(select(ThreadFingerprints.id, ThreadFingerprints.content)
+			                            .where(ThreadFingerprints.id.in_(thread_ids))).all())
+
+	def set_signatures(self, signatures: dict[int, bytes]) -> None :
+		"""Stores the signatures of fingerprints that were added without one."""
+		with self.createsession() as session :
+			for thread_id, signature in signatures.items() :
+				session.execute(update(ThreadFingerprints).where(ThreadFingerprints.id == thread_id).values(signature=signature))
+			self.commit(session)
+
+	def delete(self, thread_id: int) -> bool :
+		with self.createsession() as session :
+			result = session.execute(delete(ThreadFingerprints).where(ThreadFingerprints.id == thread_id))
+			self.commit(session)
+			return result.rowcount > 0
@@ -1,5 +1,5 @@
 from sqlalchemy import select, text
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 
 from database.database import ForumPatterns, Forums
 from database.transactions.DatabaseTransactions import DatabaseTransactions
@@ -24,7 +24,7 @@ class ForumTransactions(DatabaseTransactions):
 			self.commit(session)
 			return forum
 
-	def update(self, channel_id: int, name: str = None, minimum_characters: int = None, duplicates:bool = None) -> Forums | None :
+	def update(self, channel_id: int, name: str = None, minimum_characters: int = None, duplicates:bool = None, blacklist_whole_words: bool = None, duplicate_threshold: float = None, duplicate_scope: str = None) -> Forums | None :
 		with self.createsession() as session:
 			forum = self.get(channel_id)
 			if forum is None :
@@ -32,7 +32,10 @@ class ForumTransactions(DatabaseTransactions):
 			available_fields = {
 				"name": name,
 				"minimum_characters": minimum_characters,
-				"duplicates": duplicates
+				"duplicates": duplicates,
+				"blacklist_whole_words": blacklist_whole_words,
+				"duplicate_threshold": duplicate_threshold,
+				"duplicate_scope": duplicate_scope
 			}
 			for key, value in available_fields.items():
 				if value is not None:
@@ -61,6 +64,12 @@ class ForumTransactions(DatabaseTransactions):
 				return session.scalars(select(Forums.id).where(Forums.server_id == server_id)).all()
 			return session.scalars(select(Forums).where(Forums.server_id == server_id)).unique().all()
 
+	def get_all_with_rules(self, cleanup: bool = True) -> list[Forums] :
+		"""Returns every forum with its patterns and, unless cleanup is False, its cleanup rules. This takes a query per relation no matter how many forums there are."""
+		with self.createsession() as session:
+			return session.scalars(select(Forums).options(selectinload(Forums.patterns),
+			                                              selectinload(Forums.cleanup) if cleanup else raiseload(Forums.cleanup))).all()
+
 	# === Patterns === #
 	# Patterns are added here, because they are directly linked to forums. A separate transaction class would be overkill.
 
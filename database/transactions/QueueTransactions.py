@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from data.enums.QueueTaskStatus import QueueTaskStatus
+from database.database import QueuedTasks
+from database.transactions.DatabaseTransactions import DatabaseTransactions
+
+
+class QueueTransactions(DatabaseTransactions) :
+
+	@staticmethod
+	def now() -> datetime :
+		return datetime.now(timezone.utc)
+
+	def add_many(self, rows: list[dict]) -> list[int] :
+		"""Stores the tasks in one transaction and returns their ids in the same order, a row holds the arguments of `add`."""
+		with self.createsession() as session :
+			tasks = [QueuedTasks(**row, status=QueueTaskStatus.PENDING, attempts=0, available_at=self.now()) for row in rows]
+			session.add_all(tasks)
+			self.commit(session)
+			return [task.id for task in tasks]
+
+	def set_payloads(self, payloads: dict[int, str]) -> None :
+		"""Replaces the arguments of the tasks, the dict maps the id of a task to its json encoded arguments."""
+		with self.createsession() as session :
+			for task_id, payload in payloads.items() :
+				session.execute(update(QueuedTasks).where(QueuedTasks.id == task_id).values(payload=payload))
+			self.commit(session)
+
+	def get(self, task_id: int) -> QueuedTasks | None :
+		with self.createsession() as session :
+			return session.get(QueuedTasks, task_id)
+
+	def lease(self, task_id: int, seconds: float) -> QueuedTasks | None :
+		"""Claims the task for the given amount of seconds, returns None when the task is gone, dead or leased by someone else."""
+		now = self.now()
+		with self.createsession() as session :
+			result = session.execute(
+				update(QueuedTasks)
+				.where(QueuedTasks.id == task_id,
+				       or_(QueuedTasks.status == QueueTaskStatus.PENDING,
+				           and_(QueuedTasks.status == QueueTaskStatus.LEASED, QueuedTasks.leased_until < now)))
+				.values(status=QueueTaskStatus.LEASED, leased_until=now + timedelta(seconds=seconds))
+			)
+			self.commit(session)
+			if result.rowcount != 1 :
+				return None
+		return self.get(task_id)
+
+	def complete(self, task_id: int) -> bool :
+		with self.createsession() as session :
+			result = session.execute(delete(QueuedTasks).where(QueuedTasks.id == task_id))
+			self.commit(session)
+			return result.rowcount > 0
+
+	def complete_many(self, task_ids: list[int]) -> int :
+		with self.createsession() as session :
+			result = session.execute(delete(QueuedTasks).where(QueuedTasks.id.in_(task_ids)))
+			self.commit(session)
+			return result.rowcount
+
+	def retry(self, task_id: int, error: str, delay: float) -> None :
+		"""Puts the task back as pending after a failed attempt, it becomes available again after the delay."""
+		with self.createsession() as session :
+			session.execute(
+				update(QueuedTasks)
+				.where(QueuedTasks.id == task_id)
+				.values(status=QueueTaskStatus.PENDING, attempts=QueuedTasks.attempts + 1, leased_until=None,
+				        last_error=error, available_at=self.now() + timedelta(seconds=delay))
+			)
+			self.commit(session)
+
+	def dead(self, task_id: int, error: str) -> None :
+		"""Moves the task to the dead letter state, it won't run again."""
+		with self.createsession() as session :
+			session.execute(
+				update(QueuedTasks)
+				.where(QueuedTasks.id == task_id)
+				.values(status=QueueTaskStatus.DEAD, attempts=QueuedTasks.attempts + 1, leased_until=None, last_error=error)
+			)
+			self.commit(session)
+
+	def release_leases(self) -> int :
+		"""Returns every leased task to pending, this is done on start up when no task can be running."""
+		with self.createsession() as session :
+			result = session.execute(
+				update(QueuedTasks)
+				.where(QueuedTasks.status == QueueTaskStatus.LEASED)
+				.values(status=QueueTaskStatus.PENDING, leased_until=None)
+			)
+			self.commit(session)
+			return result.rowcount
+
+	def get_pending(self) -> list[QueuedTasks] :
+		with self.createsession() as session :
+			return session.scalars(
+				select(QueuedTasks)
+				.where(QueuedTasks.status == QueueTaskStatus.PENDING)
+				.order_by(QueuedTasks.priority.desc(), QueuedTasks.id)
+			).all()
+
+	def get_dead(self, limit: int = 10) -> list[QueuedTasks] :
+		"""Returns the newest dead letters."""
+		with self.createsession() as session :
+			return session.scalars(
+				select(QueuedTasks).where(QueuedTasks.status == QueueTaskStatus.DEAD).order_by(QueuedTasks.id.desc()).limit(limit)
+			).all()
+
+	def count(self) -> dict[str, int] :
+		"""The amount of tasks per status."""
+		with self.createsession() as session :
+			return dict(session.execute(select(QueuedTasks.status, func.count()).group_by(QueuedTasks.status)).all())
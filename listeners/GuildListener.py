@@ -0,0 +1,38 @@
+import logging
+
+import discord
+from discord.ext.commands import Bot, Cog
+
+from classes.kernel.ConfigData import ConfigData
+from classes.kernel.Queue import Queue
+
+
+class GuildListener(Cog) :
+
+	def __init__(self, bot: Bot) :
+		self.bot = bot
+
+	@Cog.listener('on_guild_remove')
+	async def on_guild_remove(self, guild: discord.Guild) :
+		"""This event is triggered when the bot leaves a guild or is removed from it, the queued work for the guild can only fail from here on."""
+		cancelled = Queue().cancel(guild=guild.id)
+		ConfigData().invalidate_channels(guild.id)
+		logging.info(f"Left {guild.name}, cancelled {cancelled} queued tasks")
+
+	@Cog.listener('on_guild_channel_delete')
+	async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) :
+		"""This event is triggered when a channel is deleted, the queued work for a deleted forum would only hit missing threads."""
+		ConfigData().invalidate_channels(channel.guild.id)
+		if isinstance(channel, discord.ForumChannel) :
+			Queue().cancel(forum=channel.id)
+
+	@Cog.listener('on_guild_channel_update')
+	async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) :
+		"""This event is triggered when a channel changes, for example its permissions. The log channels are resolved again on their next use."""
+		ConfigData().invalidate_channels(after.guild.id)
+
+
+async def setup(bot: Bot) :
+	await bot.add_cog(
+		GuildListener(bot),
+	)
@@ -3,7 +3,7 @@ import asyncio
 import discord
 from discord.ext.commands import Cog, Bot
 
-from classes.discordcontrollers.forum.AutoMod import AutoMod
+from classes.discordcontrollers.forum.AutoMod import AutoMod, REMOVAL_ACTIONS
 
 
 class ThreadAutoMod(Cog) :
@@ -14,6 +14,8 @@ class ThreadAutoMod(Cog) :
 	@Cog.listener('on_thread_create')
 	async def on_thread_create(self, thread: discord.Thread) :
 		"""This event is triggered when a thread is created."""
+		if thread.parent_id not in AutoMod().watched :
+			return
 		message = await self.fetch_message(thread)
 		if message is False:
 			# the reason why we check none and false if because these have different meanings in this context.
@@ -21,20 +23,46 @@ class ThreadAutoMod(Cog) :
 		if message is None :
 			# TODO: add a log here for failed message fetches, this is important for debugging and improving the system.
 			return
-		await AutoMod().run(message)
+		# the threads from before the fingerprints were stored have to be known before the first duplicate check in the forum.
+		await AutoMod().backfill_fingerprints(thread.parent)
+		action = await AutoMod().run(message)
+		# threads that were removed by automod shouldn't count towards the duplicate check.
+		if action not in REMOVAL_ACTIONS :
+			await AutoMod().add_fingerprint(message)
+
+	@Cog.listener('on_raw_thread_delete')
+	async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent) :
+		"""This event is triggered when a thread is deleted, even when it isn't cached."""
+		if payload.parent_id not in AutoMod().watched :
+			return
+		await AutoMod().remove_fingerprint(payload.thread_id, payload.parent_id)
 
 
-	@Cog.listener('on_message_update')
-	async def on_message_update(self, before, after) :
-		"""This event is triggered when a message is updated."""
+	@Cog.listener('on_message_edit')
+	async def on_message_edit(self, before, after) :
+		"""This event is triggered when a message is updated, this includes embed unfurls and pins that don't change the content."""
+		# Most messages the bot sees aren't in a watched forum, these are discarded before anything else is done.
+		if getattr(after.channel, 'parent_id', None) not in AutoMod().watched :
+			return
 		await AutoMod().run(after)
 
 
 	@Cog.listener('on_message')
 	async def on_message(self, message) :
 		"""This event is triggered when a message is created."""
+		if getattr(message.channel, 'parent_id', None) not in AutoMod().watched :
+			return
+		# the starter message is checked by on_thread_create, after the forum's fingerprints are backfilled.
+		if message.id == message.channel.id :
+			return
 		await AutoMod().run(message)
 
+	@Cog.listener('on_guild_channel_delete')
+	async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) :
+		"""This event is triggered when a channel is deleted, a deleted forum no longer has to be watched."""
+		if channel.id in AutoMod().watched :
+			AutoMod().unwatch(channel.id)
+
 
 
 	async def fetch_message(self, thread: discord.Thread) -> discord.Message | None:
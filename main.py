@@ -15,6 +15,8 @@ from sqlalchemy.orm import Session
 
 import api
 from classes.kernel.AccessControl import AccessControl
+from classes.kernel.CacheWarmup import CacheWarmup
+from classes.kernel.Queue import Queue
 from data.env.loader import env, load_environment
 from project.data import BOT_NAME, VERSION
 
@@ -34,7 +36,9 @@ intents.message_content = True
 intents.members = True
 # this sets your bots activity
 activity = discord.Activity(type=discord.ActivityType.watching, name="over SERVER NAME")
-bot = commands.Bot(command_prefix="fm?", case_insensitive=False, intents=intents, activity=activity)
+# the http trace lets the queue pace its tasks with the rate limit headers discord sends back.
+bot = commands.Bot(command_prefix="fm?", case_insensitive=False, intents=intents, activity=activity,
+                   http_trace=Queue().buckets.trace_config())
 
 
 # Api imports, this allows you to run the bot as an api if required. This is 100% optional.
@@ -96,6 +100,7 @@ async def send_startup_notification() :
 async def on_ready() :
 	# You can add the items you want on start up here.
 	await send_startup_notification()
+	# the staff and premium guilds may have changed while the bot was disconnected.
 	AccessControl().reload()
 
 	# Synchronises the slash commands with discord.
@@ -122,6 +127,8 @@ async def setup_hook() :
 			os.mkdir(directory)
 			pass
 	logging.info(f'Loaded {len(loaded)} modules: {", ".join(loaded)}')
+	# the config, staff and forum rules are loaded before the bot connects, so the first events are handled from memory.
+	CacheWarmup.run()
 
 
 # runs the bot with the token
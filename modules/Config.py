@@ -60,9 +60,8 @@ class Config(GroupCog, name="config", description="Commands for configuring the
 					return send_response(interaction,
 					                     f"The lobby welcome message has been disabled. Users will no longer receive a welcome message or the verification button in the lobby channel. To allow users to verify, please use the /lobby command in the channel.",
 					                     ephemeral=True)
-		Queue().add(
-			ConfigUtils.log_change(interaction.guild, {key.value : action.value.upper()}, user_name=interaction.user.mention,
-			                       ))
+		Queue().add(ConfigUtils.log_change, interaction.guild, {key.value : action.value.upper()},
+		            user_name=interaction.user.mention, guild=interaction.guild.id)
 		return await send_response(interaction, f"{key.value} has been set to {action.value}", ephemeral=True)
 
 
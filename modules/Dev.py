@@ -1,3 +1,4 @@
+import asyncio
 import os
 
 import discord
@@ -6,7 +7,11 @@ from discord.app_commands import Choice
 from discord.ext.commands import GroupCog, Bot
 from discord_py_utilities.messages import send_response
 
+from classes.discordcontrollers.forum.AutoMod import AutoMod
+from classes.discordcontrollers.forum.AutoModExecutor import AutoModExecutor
 from classes.kernel.AccessControl import AccessControl
+from classes.kernel.DurableQueue import DurableQueue
+from classes.kernel.Queue import Queue
 from data.env.loader import env, load_environment
 from database.transactions.StaffTransactions import StaffTransactions
 
@@ -69,6 +74,49 @@ class Dev(GroupCog) :
 		await send_response(interaction, f"Staff member {user.mention} successfully removed!")
 		AccessControl().reload()
 
+	@app_commands.command(name="automod_stats", description="[DEV] Shows the automod performance counters.")
+	@AccessControl().check_access("dev")
+	async def automod_stats(self, interaction: discord.Interaction) :
+		"""
+		[DEV] Shows how many automod evaluations were offloaded, timed out or failed, how often the verdict cache was hit and the latency of every stage.
+
+		**Permissions:**
+		- `Developer`
+		"""
+		await send_response(interaction, f"AutoMod executor: {AutoModExecutor().status()}\n"
+		                                 f"Verdict cache: {AutoMod().verdicts.status()}\n"
+		                                 f"Stages:\n{AutoMod().pipeline.status()}", ephemeral=True)
+
+	@app_commands.command(name="queue_stats", description="[DEV] Shows the queue, its estimates and the measured task durations.")
+	@AccessControl().check_access("dev")
+	async def queue_stats(self, interaction: discord.Interaction) :
+		"""
+		[DEV] Shows the remaining queue per priority and guild, the measured duration of every task type, the persistent queue counters and its newest dead letters.
+
+		**Permissions:**
+		- `Developer`
+		"""
+		await send_response(interaction, f"{Queue().status()}\n"
+		                                 f"{Queue().stats.status()}\n"
+		                                 f"Persistent queue: {DurableQueue().status()}\n"
+		                                 f"{await asyncio.to_thread(DurableQueue().report)}", ephemeral=True)
+
+	@app_commands.command(name="cancel", description="[DEV] Cancels the queued tasks of a guild, forum or job.")
+	@AccessControl().check_access("dev")
+	async def cancel(self, interaction: discord.Interaction, guild: str = None, forum: str = None, job: str = None) :
+		"""
+		[DEV] Cancels every queued task of the guild, forum or job that hasn't started yet, for example a runaway purge with `job:purge:<forum id>`. The running jobs are listed in `/dev queue_stats`.
+
+		**Permissions:**
+		- `Developer`
+		"""
+		if not any([guild, forum, job]) :
+			return await send_response(interaction, "Please give a guild, forum or job to cancel.", ephemeral=True)
+		if not all(value.isdigit() for value in [guild, forum] if value) :
+			return await send_response(interaction, "The guild and forum have to be ids.", ephemeral=True)
+		cancelled = Queue().cancel(guild=int(guild) if guild else None, forum=int(forum) if forum else None, job=job)
+		await send_response(interaction, f"Cancelled {cancelled} queued task(s).", ephemeral=True)
+
 
 async def setup(bot: Bot) :
 	await bot.add_cog(
@@ -17,6 +17,7 @@ from classes.kernel.ConfigData import ConfigData
 from classes.kernel.Queue import Queue
 from classes.support.ThreadArchive import ThreadArchive
 from classes.support.regex import verify_regex_length, verify_regex_pattern
+from data.enums.DuplicateScopes import DuplicateScopes
 from data.enums.PatternTypes import ForumPatterns
 from database.transactions.ForumTransactions import ForumTransactions
 from resources.configs.ConfigMapping import ConfigMapping
@@ -56,7 +57,7 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 				server_id=interaction.guild.id,
 				name=forum.name,
 			)
-		AutoMod().clear_cache()
+			AutoMod().watch(forum.id)
 		await interaction.followup.send(f"Added {len(forums)} forum channel(s) to the database.", ephemeral=True)
 
 	@app_commands.command(name="remove", description="Removes the chosen forum channel for the bot")
@@ -72,7 +73,9 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 		forums = await ForumController.select_forums(interaction, "Select your forum channel(s) to remove")
 		for forum in forums :
 			ForumTransactions().delete(forum.id)
-		AutoMod().clear_cache()
+			AutoMod().unwatch(forum.id)
+			# the cleanups and deletes that are still queued for the forum would run against a forum the bot no longer manages.
+			Queue().cancel(forum=forum.id)
 		await send_response(interaction, f"Removed {len(forums)} forum channel(s) from the database.", ephemeral=True)
 
 	@app_commands.command(name="patterns", description="Adds/removes/lists patterns for forum threads (regex)")
@@ -193,6 +196,34 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 		                    f"{operation.name}ed the word `{word}` {'to' if operation.value == 'add' else 'from'} the blacklist for {len(forums)} forum channel(s).",
 		                    ephemeral=True)
 
+	@app_commands.command(name="blacklist_whole_words",
+	                      description="Only match blacklisted words as whole words in the selected forums")
+	@app_commands.checks.has_permissions(manage_guild=True)
+	async def blacklist_whole_words(self, interaction: discord.Interaction, enabled: bool = True) :
+		"""
+		Only match blacklisted words as whole words in the selected forums. When enabled, the word `cat` no longer matches `concatenate`.
+
+		Permissions:
+		- Manage guild
+		"""
+		forums = await ForumController.select_forums(interaction,
+		                                             f"Select your forum channel(s) to {'enable' if enabled else 'disable'} whole word blacklist matching!")
+		blacklist = ForumPatternController(interaction.guild.id)
+		success = 0
+
+		for forum in forums :
+			result = blacklist.check_forum_in_config(forum.id)
+			if not result :
+				continue
+			ForumTransactions().update(forum.id, blacklist_whole_words=enabled)
+			AutoMod().refresh_rules(forum.id)
+
+			success += 1
+
+		await send_response(interaction,
+		                    f"{'Enabled' if enabled else 'Disabled'} whole word blacklist matching for {success} forum channel(s).",
+		                    ephemeral=True)
+
 	@app_commands.command(name="minimum_characters",
 	                      description="Sets the minimum character requirement for threads in the selected forums")
 	@app_commands.choices(operation=OPERATION_CHOICES)
@@ -217,6 +248,7 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 					if not result :
 						continue
 					ForumTransactions().update(forum.id, minimum_characters=character_count)
+					AutoMod().refresh_rules(forum.id)
 
 					success += 1
 
@@ -225,6 +257,7 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 					if result is not None :
 						continue
 					ForumTransactions().update(forum.id, minimum_characters=0)
+					AutoMod().refresh_rules(forum.id)
 					success += 1
 				case "list" :
 					forum_conf = ForumTransactions().get(forum.id)
@@ -241,10 +274,15 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 	@app_commands.command(name="duplicates",
 	                      description="Sets the minimum character requirement for threads in the selected forums")
 	@app_commands.checks.has_permissions(manage_guild=True)
+	@app_commands.choices(scope=[
+		Choice(name="Same author only", value=DuplicateScopes.AUTHOR),
+		Choice(name="Any author", value=DuplicateScopes.ANY),
+	])
 	@AccessControl().check_premium()
-	async def duplicates(self, interaction: discord.Interaction, allow:bool = True) :
+	async def duplicates(self, interaction: discord.Interaction, allow:bool = True,
+	                     threshold: app_commands.Range[float, 0.1, 1.0] = None, scope: Choice[str] = None) :
 		"""
-		Allow or disallow duplicate threads in the selected forums. Duplicate threads are threads with the same starter message content. This is determined on a user basis, so different users can create threads with the same content without being considered duplicates.
+		Allow or disallow duplicate threads in the selected forums. Duplicate threads are threads with a similar starter message content. By default this is determined on a user basis, so different users can create threads with the same content without being considered duplicates; set the scope to "Any author" to also catch reposts from other accounts. The threshold (0.1-1.0, default 0.7) controls how similar two posts have to be.
 
 		Permissions:
 		- Manage guild
@@ -259,7 +297,9 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 			result = blacklist.check_forum_in_config(forum.id)
 			if not result :
 				continue
-			ForumTransactions().update(forum.id, duplicates=allow)
+			ForumTransactions().update(forum.id, duplicates=allow, duplicate_threshold=threshold,
+			                           duplicate_scope=scope.value if scope else None)
+			AutoMod().refresh_rules(forum.id)
 
 			success += 1
 
@@ -306,7 +346,7 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 		for channel in channels :
 			logging.debug(f"[Forum Manager] Checking {channel.name}")
 			forum = ForumTask(channel, self.bot)
-			Queue().add(forum.start())
+			Queue().add(forum.start, guild=interaction.guild.id, forum=channel.id, key=("forum-check", channel.id))
 
 	# TODO: Also copy over configurations like patterns, minimum character count, etc.
 	@app_commands.command(name="copy", description="Copy a forum with all settings!")
@@ -318,11 +358,11 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 		[await f.create_tag(name=tag.name, moderated=tag.moderated, emoji=tag.emoji,
 		                    reason="Forum copied through forum manager") for tag in forum.available_tags if
 		 tag.name not in f.available_tags]
-		Queue().add(f.edit(default_thread_slowmode_delay=forum.default_thread_slowmode_delay,
-		                   default_auto_archive_duration=forum.default_auto_archive_duration,
-		                   default_layout=forum.default_layout,
-		                   default_sort_order=forum.default_sort_order,
-		                   default_reaction_emoji=forum.default_reaction_emoji), priority=2)
+		Queue().add(f.edit, default_thread_slowmode_delay=forum.default_thread_slowmode_delay,
+		            default_auto_archive_duration=forum.default_auto_archive_duration,
+		            default_layout=forum.default_layout,
+		            default_sort_order=forum.default_sort_order,
+		            default_reaction_emoji=forum.default_reaction_emoji, priority=2, bucket=f.id, guild=interaction.guild.id)
 		await send_message(interaction.channel, f"Forum {forum.mention} copied to {f.mention}")
 
 	@app_commands.command(name="add_all", description="Adds all forums to the bot.")
@@ -331,6 +371,7 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 		forums = [forum for forum in interaction.guild.channels if forum.type == discord.ChannelType.forum]
 		for forum in forums :
 			ForumTransactions().add(forum.id, interaction.user.id, forum.name)
+			AutoMod().watch(forum.id)
 		await send_response(interaction, f"Successfully added all forums to {interaction.user.name}!")
 
 	# TODO: upgrade this command to work with archived threads and add an option to notify the thread starter with the contents of their thread before purging, as well as a confirmation button to prevent accidental purges AND add the option to create an export of each purged thread.
@@ -348,6 +389,8 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 			return
 
 		await send_response(interaction, f"Purge all threads in {forum.name}", ephemeral=True)
+		# the purge can be stopped with `/dev cancel job:purge:<forum id>`.
+		job = f"purge:{forum.id}"
 		for thread in forum.threads :
 			if notify_user :
 				try :
@@ -358,11 +401,13 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 					starter_msg = None
 				if not starter_msg :
 					logging.error(f"Could not fetch message for thread {thread.name} in {forum.name}")
-					Queue().add(thread.delete())
+					await Queue().put(thread.delete, bucket=thread.id, guild=interaction.guild.id, forum=forum.id, job=job,
+					                  key=("delete", thread.id))
 					continue
-				Queue().add(send_message(thread.owner,
-				                         f"Your thread {thread.name} in {forum.name} is being purged, here are the contents:"
-				                         f"\ntitle: {thread.name}\ncontent: {starter_msg.content}"), priority=2)
+				Queue().add_direct_message(thread.owner,
+				                           f"Your thread {thread.name} in {forum.name} is being purged, here are the contents:"
+				                           f"\ntitle: {thread.name}\ncontent: {starter_msg.content}", priority=2,
+				                           guild=interaction.guild.id)
 			if archive:
 				archive_name = f"{interaction.guild.name}_{thread.name}"
 				archiver = ThreadArchive(archive_name, thread)
@@ -371,11 +416,13 @@ class Forums(GroupCog, name="forum", description="Forum management commands") :
 				await archiver.clean_up()
 
 
-			Queue().add(thread.delete())
+			await Queue().put(thread.delete, bucket=thread.id, guild=interaction.guild.id, forum=forum.id, job=job,
+			                  key=("delete", thread.id))
 		else :
-			Queue().add(send_message(interaction.channel, f"Purge complete for {forum.name}"), 0)
-		Queue().add(send_message(interaction.channel, f"Queueing purge of {len(forum.threads)} threads in {forum.name}."),
-		            priority=2)
+			Queue().add(send_message, interaction.channel, f"Purge complete for {forum.name}", priority=0, bucket=interaction.channel.id, guild=interaction.guild.id,
+			            job=job)
+		Queue().add(send_message, interaction.channel, f"Queueing purge of {len(forum.threads)} threads in {forum.name}.",
+		            priority=2, bucket=interaction.channel.id, guild=interaction.guild.id)
 
 
 
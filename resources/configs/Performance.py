@@ -0,0 +1,52 @@
+# This document defines the performance settings of the bot, these can be overridden in the .env file without having to change the code. The defaults are tuned for a bot in a few thousand servers.
+from data.env.loader import env, load_environment
+
+load_environment()
+
+# == automod ==
+
+# The amount of threads that evaluate messages, re2 releases the GIL so these can run next to each other.
+AUTOMOD_WORKERS = int(env('AUTOMOD_WORKERS', 4))
+# The maximum amount of seconds a single message may spend in the automod checks.
+AUTOMOD_TIME_BUDGET = float(env('AUTOMOD_TIME_BUDGET', 2.0))
+# What happens to a message when the checks didn't finish in time or failed: ALLOW lets it through, REVIEW sends it to the warn log for a manual review.
+AUTOMOD_TIMEOUT_ACTION = env('AUTOMOD_TIMEOUT_ACTION', 'REVIEW').upper()
+# The amount of message verdicts that are remembered, edits that don't change the content reuse these.
+AUTOMOD_VERDICT_CACHE_SIZE = int(env('AUTOMOD_VERDICT_CACHE_SIZE', 10000))
+
+# == queue ==
+
+# The amount of queued discord calls that run at the same time, discord's rate limits decide how fast they actually go.
+QUEUE_WORKERS = int(env('QUEUE_WORKERS', 4))
+
+# The maximum amount of tasks a single guild may have running at the same time, 0 means no limit.
+QUEUE_GUILD_MAX_RUNNING = int(env('QUEUE_GUILD_MAX_RUNNING', 0))
+# The maximum amount of tasks a single guild may have queued, new tasks are dropped when it's reached. 0 means no limit.
+QUEUE_GUILD_MAX_QUEUED = int(env('QUEUE_GUILD_MAX_QUEUED', 0))
+# Plain text direct messages to the same user that are still queued within this many seconds are sent as one message.
+QUEUE_DM_COALESCE_WINDOW = float(env('QUEUE_DM_COALESCE_WINDOW', 60))
+# The amount of queued tasks at which bulk producers (Queue.put) wait until the workers made room, 0 means no limit.
+# High priority has no limit, it's the lane for automod notifications and other messages people are waiting on.
+QUEUE_HIGH_WATER_NORMAL = int(env('QUEUE_HIGH_WATER_NORMAL', 5000))
+QUEUE_HIGH_WATER_LOW = int(env('QUEUE_HIGH_WATER_LOW', 2000))
+# Automod logs and the direct messages about removed posts are dropped when they couldn't be sent within this many seconds.
+QUEUE_NOTIFICATION_TTL = float(env('QUEUE_NOTIFICATION_TTL', 3600))
+
+# == persistent queue ==
+
+# Stores thread deletes, message deletes and unarchives in the database so they continue after a restart.
+QUEUE_PERSISTENT = env('QUEUE_PERSISTENT', 'false').lower() in ('true', '1', 'yes')
+# The amount of attempts a persistent task gets before it's moved to the dead letter state.
+QUEUE_MAX_ATTEMPTS = int(env('QUEUE_MAX_ATTEMPTS', 5))
+# The delay before the first retry in seconds, it doubles with every attempt up to QUEUE_RETRY_MAX_DELAY.
+QUEUE_RETRY_DELAY = float(env('QUEUE_RETRY_DELAY', 5))
+QUEUE_RETRY_MAX_DELAY = float(env('QUEUE_RETRY_MAX_DELAY', 900))
+# How long a running task is leased, a task that is still leased after this is considered lost.
+QUEUE_LEASE_SECONDS = float(env('QUEUE_LEASE_SECONDS', 300))
+
+# == config ==
+
+# How long a config channel that isn't set or can't be found is remembered in seconds, the guild is notified at most once in this time.
+CONFIG_CHANNEL_NEGATIVE_TTL = float(env('CONFIG_CHANNEL_NEGATIVE_TTL', 300))
+# The amount of times a channel that isn't in the cache is fetched before it's given up on, the delay between attempts doubles.
+CONFIG_CHANNEL_FETCH_ATTEMPTS = int(env('CONFIG_CHANNEL_FETCH_ATTEMPTS', 3))
@@ -27,14 +27,17 @@ class ForumTask(Cog) :
 	async def check_forums_task(self) :
 		# This is a sample task that runs every 30 minutes.
 		logging.info("Checking forums...")
+		# the forums of every guild and their cleanup rules are loaded at once, instead of a query per guild.
+		configs: dict[int, list] = {}
+		for forum_config in ForumTransactions().get_all_with_rules() :
+			configs.setdefault(forum_config.server_id, []).append(forum_config)
 		for guild in  self.bot.guilds:
-			forum_configs = ForumTransactions().get_all(guild.id)
-			for forum_config in forum_configs :
+			for forum_config in configs.get(guild.id, []) :
 				f = guild.get_channel(forum_config.id)
 				if f is None or not isinstance(f, discord.ForumChannel):
 					continue
 				forum_manager = ForumManager(f, forum_config, self.bot)
-				Queue().add(forum_manager.start(), 0)
+				Queue().add(forum_manager.start, priority=0, guild=guild.id, forum=f.id, key=("forum-check", f.id))
 
 	@tasks.loop(hours=1)
 	async def clear_cache(self):
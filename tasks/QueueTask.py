@@ -1,6 +1,9 @@
+import asyncio
+
 import discord
 from discord.ext import commands, tasks
 
+from classes.kernel.DurableQueue import DurableQueue
 from classes.kernel.Queue import Queue
 
 
@@ -9,15 +12,22 @@ class QueueTask(commands.Cog) :
 
 	def __init__(self, bot: commands.Bot) :
 		self.bot = bot
-		self.queue.start()
 		self.display_status.start()
 
+	async def cog_load(self) :
+		self.starter = asyncio.create_task(self.start_workers())
+
 	def cog_unload(self) :
-		self.queue.cancel()
+		self.starter.cancel()
+		Queue().stop()
 
-	@tasks.loop(seconds=0.5)
-	async def queue(self) :
-		await Queue().start()
+	async def start_workers(self) :
+		"""The workers are woken up when a task is added, they don't poll the queue."""
+		await self.bot.wait_until_ready()
+		Queue().start()
+		# the stored tasks of the persistent queue are turned back into channels and messages with the bot.
+		DurableQueue().attach(self.bot)
+		DurableQueue().resume()
 
 	@tasks.loop(seconds=3)
 	async def display_status(self) :
@@ -25,17 +35,13 @@ class QueueTask(commands.Cog) :
 		status = "over the community"
 		if not Queue().empty() :
 			status = f"Processing {len(Queue().status())} bans"
-			status = Queue().status()
+			status = Queue().status(guilds=False)
 		if self.status and self.status == status :
 			return
 		self.status = status
 		await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name=status))
 
-	@queue.before_loop
-	async def before_queue(self) :
-		await self.bot.wait_until_ready()
-
-	@queue.before_loop
+	@display_status.before_loop
 	async def before_display(self) :
 		await self.bot.wait_until_ready()
 
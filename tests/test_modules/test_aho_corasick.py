@@ -0,0 +1,32 @@
+import unittest
+
+from classes.support.AhoCorasick import AhoCorasick
+
+
+class TestAhoCorasick(unittest.TestCase) :
+
+	def test_finds_every_word_in_one_pass(self) :
+		blacklist = AhoCorasick(["he", "she", "his", "hers"])
+		words = [hit.word for hit in blacklist.search("ushers")]
+
+		self.assertEqual(["she", "he", "hers"], words)
+
+	def test_case_folded(self) :
+		blacklist = AhoCorasick(["Spam"])
+		hits = blacklist.search("buy SPAM now")
+
+		self.assertEqual(1, len(hits))
+		self.assertEqual((4, 8, "spam"), tuple(hits[0]))
+
+	def test_whole_words(self) :
+		blacklist = AhoCorasick(["cat"], whole_words=True)
+
+		self.assertEqual(1, len(blacklist.search("a cat!")))
+		self.assertEqual(0, len(blacklist.search("concatenate")))
+		self.assertEqual(0, len(blacklist.search("cat_name")))
+
+	def test_empty_and_duplicate_words(self) :
+		blacklist = AhoCorasick(["", "word", "WORD"])
+
+		self.assertEqual(1, len(blacklist))
+		self.assertEqual([], AhoCorasick([]).search("anything"))
@@ -0,0 +1,43 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from classes.discordcontrollers.forum.AutoModExecutor import AutoModExecutor
+
+
+class TestAutoModExecutor(unittest.TestCase) :
+
+	def setUp(self) :
+		self.executor = AutoModExecutor()
+		self.pool, self.budget = self.executor.pool, self.executor.budget
+		self.executor.pool = ThreadPoolExecutor(max_workers=1)
+		self.executor.budget = 0.3
+
+	def tearDown(self) :
+		self.executor.pool.shutdown()
+		self.executor.pool, self.executor.budget = self.pool, self.budget
+
+	@staticmethod
+	def slow(seconds: float, result: str) -> str :
+		time.sleep(seconds)
+		return result
+
+	def test_budget_starts_when_the_job_runs(self) :
+		async def burst() :
+			# every job fits the budget, but the last one waits longer than the budget for the only thread.
+			return await asyncio.gather(*[self.executor.run(self.slow, 0.15, f"job {number}", fallback="timed out") for number in range(3)])
+
+		self.assertEqual(["job 0", "job 1", "job 2"], asyncio.run(burst()))
+
+	def test_slow_job_returns_the_fallback(self) :
+		timed_out = self.executor.stats["timed_out"]
+
+		self.assertIsNone(asyncio.run(self.executor.run(self.slow, 0.5, "done")))
+		self.assertEqual(timed_out + 1, self.executor.stats["timed_out"])
+
+	def test_failed_job_returns_the_failure_result(self) :
+		def broken() :
+			raise ValueError("broken")
+
+		self.assertEqual("failed", asyncio.run(self.executor.run(broken, fallback="timed out", failure="failed")))
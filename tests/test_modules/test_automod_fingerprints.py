@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+import unittest.mock
+from types import SimpleNamespace
+
+import discord
+
+from classes.discordcontrollers.forum.AutoMod import AutoMod, AutoModActions
+from classes.support.Normalizer import Normalizer
+from database.database import create_bot_database, drop_bot_database
+from database.transactions.FingerprintTransactions import FingerprintTransactions
+from database.transactions.ForumTransactions import ForumTransactions
+
+
+class TestAutoModFingerprints(unittest.TestCase) :
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+	owner_id = 987654321098765432
+	post = "looking for a long term roleplay partner, i like fantasy and scifi, dm me if interested"
+
+	def setUp(self) :
+		create_bot_database()
+		ForumTransactions().add(channel_id=self.channel_id, server_id=self.guild_id, name="Test Forum Channel")
+		ForumTransactions().update(self.channel_id, duplicates=False)
+		self.reset()
+
+	def tearDown(self) :
+		self.reset()
+		drop_bot_database()
+
+	@staticmethod
+	def reset() :
+		AutoMod()._rules = {}
+		AutoMod()._duplicates = {}
+		AutoMod()._backfilled = set()
+		AutoMod()._backfills = {}
+
+	def thread(self, thread_id: int, content: str) :
+		message = SimpleNamespace(id=thread_id, content=content)
+		return SimpleNamespace(id=thread_id, owner_id=self.owner_id, starter_message=None,
+		                       fetch_message=unittest.mock.AsyncMock(return_value=message))
+
+	def forum(self, threads: list, archived: list) :
+		async def archived_threads(limit: int = None) :
+			for thread in archived[:limit] :
+				yield thread
+
+		forum = unittest.mock.MagicMock(spec=discord.ForumChannel)
+		forum.id = self.channel_id
+		forum.name = "Test Forum Channel"
+		forum.threads = threads
+		forum.archived_threads = archived_threads
+		return forum
+
+	def test_backfills_existing_threads_once(self) :
+		known = self.thread(1, "already fingerprinted")
+		active = self.thread(2, self.post)
+		archived = self.thread(3, "selling my old graphics card, only used for a year, send me an offer")
+		FingerprintTransactions().add(known.id, self.channel_id, self.owner_id, "already fingerprinted")
+		forum = self.forum([known, active], [archived])
+
+		asyncio.run(AutoMod().backfill_fingerprints(forum))
+
+		known.fetch_message.assert_not_called()
+		self.assertEqual({1, 2, 3}, FingerprintTransactions().get_ids(self.channel_id))
+		self.assertEqual(self.post, FingerprintTransactions().get(2).content)
+		self.assertIn(3, AutoMod().duplicate_index(self.channel_id))
+
+		asyncio.run(AutoMod().backfill_fingerprints(forum))
+		active.fetch_message.assert_called_once()
+
+	def test_forums_that_allow_duplicates_are_skipped(self) :
+		ForumTransactions().update(self.channel_id, duplicates=True)
+		active = self.thread(2, self.post)
+
+		asyncio.run(AutoMod().backfill_fingerprints(self.forum([active], [])))
+
+		active.fetch_message.assert_not_called()
+		self.assertEqual(set(), FingerprintTransactions().get_ids(self.channel_id))
+
+	def test_index_is_built_from_stored_signatures(self) :
+		# a fingerprint from before the signatures were stored.
+		FingerprintTransactions().add(1, self.channel_id, self.owner_id, self.post)
+		AutoMod().store_fingerprints(self.channel_id, [(2, self.owner_id + 1, "what is everyone's favourite pizza topping?")])
+		self.assertNotIn(self.channel_id, AutoMod()._duplicates)
+
+		index = AutoMod().duplicate_index(self.channel_id)
+
+		self.assertEqual(2, len(index))
+		self.assertIsNotNone(FingerprintTransactions().get(1).signature)
+		# the index only keeps the owner, not the content.
+		self.assertEqual([(1, self.owner_id)], index.query(self.post))
+
+	def test_check_duplicate(self) :
+		AutoMod().store_fingerprints(self.channel_id, [(1, self.owner_id, self.post)])
+		rules = AutoMod().get_rules(self.channel_id)
+		thread = SimpleNamespace(id=2, owner_id=self.owner_id, guild=SimpleNamespace(id=self.guild_id))
+		message = SimpleNamespace(id=2)
+
+		action, reason = AutoMod().check_duplicate(Normalizer.normalize(self.post.upper() + "!"), message, thread, rules)
+		self.assertEqual(AutoModActions.DUPLICATE, action)
+		self.assertTrue(reason.endswith(f"/{self.guild_id}/1"))
+
+		thread.owner_id += 1
+		self.assertEqual((None, None), AutoMod().check_duplicate(Normalizer.normalize(self.post), message, thread, rules))
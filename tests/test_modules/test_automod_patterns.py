@@ -0,0 +1,38 @@
+import unittest
+
+from classes.discordcontrollers.forum.AutoMod import AutoMod, AutoModActions
+from data.enums.PatternTypes import ForumPatterns
+from database.database import create_bot_database, drop_bot_database
+from database.transactions.ForumTransactions import ForumTransactions
+
+
+class TestAutoModPatterns(unittest.TestCase) :
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+
+	def setUp(self) :
+		create_bot_database()
+		ForumTransactions().add(channel_id=self.channel_id, server_id=self.guild_id, name="Test Forum Channel")
+
+	def tearDown(self) :
+		AutoMod()._rules = {}
+		drop_bot_database()
+
+	def rules(self) :
+		return AutoMod().refresh_rules(self.channel_id)
+
+	def test_markdown_pattern(self) :
+		ForumTransactions().add_pattern(self.channel_id, "price", r"\*\*Price:\*\*", ForumPatterns.required)
+		rules = self.rules()
+
+		self.assertEqual((None, None), AutoMod().check_patterns("**Price:** 10 gold", rules))
+		self.assertEqual(AutoModActions.REQUIRED, AutoMod().check_patterns("Price: 10 gold", rules)[0])
+
+	def test_non_latin_pattern(self) :
+		ForumTransactions().add_pattern(self.channel_id, "greeting", r"привет", ForumPatterns.block)
+		rules = self.rules()
+
+		action, reason = AutoMod().check_patterns("Всем ПРИВЕТ!", rules)
+		self.assertEqual(AutoModActions.BLOCK, action)
+		self.assertIn("`ПРИВЕТ`", reason)
+		self.assertEqual((None, None), AutoMod().check_patterns("hello everyone", rules))
@@ -0,0 +1,61 @@
+import unittest
+from types import SimpleNamespace
+
+from classes.discordcontrollers.forum.AutoModPipeline import AutoModContext, AutoModPipeline, AutoModStage
+
+
+class TestAutoModPipeline(unittest.TestCase) :
+	forum_id = 192837465564738291
+
+	def context(self, premium: bool = True) -> AutoModContext :
+		return AutoModContext(message=None, thread=None, rules=SimpleNamespace(forum_id=self.forum_id), premium=premium)
+
+	def test_default_order_and_short_circuit(self) :
+		ran = []
+		pipeline = AutoModPipeline([
+			AutoModStage("first", lambda context : ran.append("first") or (None, None)),
+			AutoModStage("block", lambda context : ran.append("block") or ("BLOCK", "blocked")),
+			AutoModStage("last", lambda context : ran.append("last") or (None, None)),
+		])
+
+		self.assertEqual(("BLOCK", "blocked"), pipeline.run(self.context()))
+		self.assertEqual(["first", "block"], ran)
+
+	def test_warning_does_not_short_circuit(self) :
+		pipeline = AutoModPipeline([
+			AutoModStage("warn", lambda context : ("WARN", "warned")),
+			AutoModStage("block", lambda context : ("BLOCK", "blocked")),
+		])
+		self.assertEqual(("BLOCK", "blocked"), pipeline.run(self.context()))
+
+		pipeline = AutoModPipeline([AutoModStage("warn", lambda context : ("WARN", "warned"))])
+		self.assertEqual(("WARN", "warned"), pipeline.run(self.context()))
+
+	def test_premium_stages_are_skipped(self) :
+		pipeline = AutoModPipeline([AutoModStage("premium", lambda context : ("BLOCK", "blocked"), premium=True)])
+
+		self.assertEqual((None, None), pipeline.run(self.context(premium=False)))
+
+	def test_reorders_by_hit_rate(self) :
+		pipeline = AutoModPipeline([
+			AutoModStage("staff", lambda context : (None, None), pinned=True),
+			AutoModStage("never", lambda context : (None, None)),
+			AutoModStage("always", lambda context : ("BLOCK", "blocked")),
+		], min_samples=5, reorder_every=1)
+
+		for _ in range(10) :
+			pipeline.run(self.context())
+		names = [stage.name for stage in pipeline.order(self.forum_id)]
+		self.assertEqual(["staff", "always", "never"], names)
+
+	def test_reorders_without_premium_stages(self) :
+		pipeline = AutoModPipeline([
+			AutoModStage("never", lambda context : (None, None)),
+			AutoModStage("premium", lambda context : (None, None), premium=True),
+			AutoModStage("always", lambda context : ("BLOCK", "blocked")),
+		], min_samples=5, reorder_every=1)
+
+		for _ in range(10) :
+			pipeline.run(self.context(premium=False))
+		names = [stage.name for stage in pipeline.order(self.forum_id)]
+		self.assertEqual(["always", "never", "premium"], names)
@@ -0,0 +1,148 @@
+import unittest
+import unittest.mock
+from types import SimpleNamespace
+
+import discord
+
+from classes.kernel.ConfigData import ConfigData
+from database.database import create_bot_database, drop_bot_database
+from database.transactions.ConfigTransactions import ConfigTransactions
+
+
+class TestConfigData(unittest.TestCase) :
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+
+	def setUp(self) :
+		create_bot_database()
+		ConfigData().data = {}
+
+	def tearDown(self) :
+		drop_bot_database()
+		ConfigData().data = {}
+
+	def test_values_are_typed_when_loaded(self) :
+		for key, value in {"modchannel" : self.channel_id, "enabled" : "TRUE", "disabled" : "0", "mode" : "ENABLED", "empty" : ""}.items() :
+			ConfigTransactions().config_unique_add(self.guild_id, key, value)
+		ConfigData().reload()
+
+		self.assertEqual(self.channel_id, ConfigData().data[self.guild_id]["MODCHANNEL"])
+		self.assertEqual(self.channel_id, ConfigData().get_key(self.guild_id, "modchannel"))
+		self.assertIs(True, ConfigData().get_key(self.guild_id, "enabled"))
+		self.assertIs(False, ConfigData().get_key(self.guild_id, "disabled"))
+		self.assertEqual("ENABLED", ConfigData().get_key(self.guild_id, "mode"))
+		self.assertEqual("default", ConfigData().get_key(self.guild_id, "empty", "default"))
+		self.assertTrue(ConfigData().get_toggle(self.guild_id, "enabled"))
+		self.assertTrue(ConfigData().get_toggle(self.guild_id, "disabled", "DISABLED"))
+
+	def test_defaults_are_read_like_values(self) :
+		self.assertIsNone(ConfigData().get_key(self.guild_id, "missing"))
+		self.assertIs(True, ConfigData().get_key(self.guild_id, "missing", "1"))
+		self.assertEqual(5, ConfigData().get_key(self.guild_id, "missing", "5"))
+
+	def test_guilds_without_config_are_cached(self) :
+		ConfigData().get_key(self.guild_id, "modchannel")
+		self.assertEqual({}, ConfigData().data[self.guild_id])
+		ConfigTransactions().config_unique_add(self.guild_id, "modchannel", self.channel_id)
+
+		# the cached miss is used until the guild is loaded again.
+		self.assertIsNone(ConfigData().get_key(str(self.guild_id), "modchannel"))
+		ConfigData().load_guild(self.guild_id)
+		self.assertEqual(self.channel_id, ConfigData().get_key(self.guild_id, "modchannel"))
+
+	def test_writes_are_upserted_and_patched_in_the_cache(self) :
+		ConfigData().get_guild(self.guild_id)
+		ConfigData().add_key(self.guild_id, "modchannel", 1)
+		ConfigData().add_key(self.guild_id, "modchannel", 2)
+		self.assertEqual(1, ConfigData().get_key(self.guild_id, "modchannel"))
+
+		ConfigData().add_key(self.guild_id, "modchannel", self.channel_id, overwrite=True)
+		ConfigData().set_keys(self.guild_id, {"enabled" : True, "mode" : "ENABLED"})
+		ConfigData().remove_key(self.guild_id, "mode")
+
+		expected = {"MODCHANNEL" : self.channel_id, "ENABLED" : True}
+		self.assertEqual(expected, ConfigData().data[self.guild_id])
+		self.assertEqual(1, len([item for item in ConfigTransactions().server_config_get(self.guild_id) if item.key == "MODCHANNEL"]))
+		ConfigData().load_guild(self.guild_id)
+		self.assertEqual(expected, ConfigData().data[self.guild_id])
+
+	def test_writes_without_a_dialect_upsert(self) :
+		with unittest.mock.patch.object(ConfigTransactions, "upsert_statement", return_value=None) :
+			self.assertTrue(ConfigTransactions().config_unique_add(self.guild_id, "modchannel", 1))
+			self.assertFalse(ConfigTransactions().config_unique_add(self.guild_id, "modchannel", 2))
+			ConfigTransactions().config_upsert_many(self.guild_id, {"modchannel" : 3, "mode" : "ENABLED"})
+
+		rows = {row.key : row.value for row in ConfigTransactions().server_config_get(self.guild_id)}
+		self.assertEqual({"MODCHANNEL" : "3", "MODE" : "ENABLED"}, rows)
+
+
+class TestConfigChannels(unittest.IsolatedAsyncioTestCase) :
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+
+	def setUp(self) :
+		create_bot_database()
+		ConfigData().data = {self.guild_id : {"AUTOMOD_LOG" : self.channel_id}}
+		ConfigData().channels = {}
+		self.lookups = []
+		self.fetches = []
+		self.channel = SimpleNamespace(id=self.channel_id)
+
+	def tearDown(self) :
+		drop_bot_database()
+		ConfigData().data = {}
+		ConfigData().channels = {}
+
+	def guild(self, cached: bool, error: Exception = None) :
+		async def fetch_channel(channel_id) :
+			self.fetches.append(channel_id)
+			if error is not None :
+				raise error
+			return self.channel
+
+		def get_channel(channel_id) :
+			self.lookups.append(channel_id)
+			return self.channel if cached else None
+
+		return SimpleNamespace(id=self.guild_id, name="Test Guild", get_channel=get_channel, fetch_channel=fetch_channel)
+
+	async def test_resolved_channels_are_cached(self) :
+		guild = self.guild(cached=True)
+
+		self.assertIs(self.channel, await ConfigData().get_channel(guild, "automod_log", optional=True))
+		self.assertIs(self.channel, await ConfigData().get_channel(guild, "automod_log", optional=True))
+		self.assertEqual(1, len(self.lookups))
+
+		ConfigData().patch(self.guild_id, {"automod_log" : self.channel_id})
+		await ConfigData().get_channel(guild, "automod_log", optional=True)
+		self.assertEqual(2, len(self.lookups))
+
+	async def test_missing_channels_are_fetched_a_bounded_amount_of_times(self) :
+		response = SimpleNamespace(status=500, reason="Server Error")
+		guild = self.guild(cached=False, error=discord.HTTPException(response, "unavailable"))
+		with unittest.mock.patch("classes.kernel.ConfigData.asyncio.sleep") as sleep, \
+				unittest.mock.patch("classes.kernel.ConfigData.send_message") as notify, \
+				unittest.mock.patch("classes.kernel.ConfigData.find_first_accessible_text_channel") :
+			self.assertIsNone(await ConfigData().get_channel(guild, "automod_log"))
+			# the missing channel is remembered, it isn't fetched and notified about again.
+			self.assertIsNone(await ConfigData().get_channel(guild, "automod_log"))
+			self.assertEqual(3, len(self.fetches))
+			self.assertEqual(2, sleep.call_count)
+			self.assertEqual(1, notify.call_count)
+
+			# a channel that doesn't exist isn't fetched again.
+			ConfigData().invalidate_channels(self.guild_id)
+			guild = self.guild(cached=False, error=discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "gone"))
+			self.assertIsNone(await ConfigData().get_channel(guild, "automod_log"))
+			self.assertEqual(4, len(self.fetches))
+
+	async def test_optional_lookups_do_not_suppress_the_notification(self) :
+		guild = self.guild(cached=False)
+		with unittest.mock.patch("classes.kernel.ConfigData.send_message") as notify, \
+				unittest.mock.patch("classes.kernel.ConfigData.find_first_accessible_text_channel") :
+			self.assertIsNone(await ConfigData().get_channel(guild, "modchannel", optional=True))
+			self.assertEqual(0, notify.call_count)
+
+			self.assertIsNone(await ConfigData().get_channel(guild, "modchannel"))
+			self.assertIsNone(await ConfigData().get_channel(guild, "modchannel"))
+			self.assertEqual(1, notify.call_count)
@@ -0,0 +1,75 @@
+import unittest
+
+from sqlalchemy import BigInteger, Column, Integer, MetaData, String, Table, inspect, text
+
+from database.database import Base, Config, create_bot_database, drop_bot_database, engine, upgrade_bot_database
+from database.transactions.ConfigTransactions import ConfigTransactions
+from database.transactions.ForumTransactions import ForumTransactions
+
+
+class TestDatabaseUpgrade(unittest.TestCase) :
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+
+	def setUp(self) :
+		create_bot_database()
+
+	def tearDown(self) :
+		drop_bot_database()
+
+	@staticmethod
+	def unique_keys(table: str) -> list[tuple[str, ...]] :
+		"""The columns of every unique constraint and unique index of the table."""
+		inspector = inspect(engine)
+		keys = [tuple(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table)]
+		keys += [tuple(index["column_names"]) for index in inspector.get_indexes(table)
+		         if index["unique"] and not index.get("duplicates_constraint")]
+		return keys
+
+	def test_adds_missing_columns(self) :
+		ForumTransactions().add(channel_id=self.channel_id, server_id=self.guild_id, name="Test Forum Channel")
+		# a table that was created before these columns existed.
+		with engine.begin() as connection :
+			for column in ("blacklist_whole_words", "duplicate_threshold", "duplicate_scope") :
+				connection.execute(text(f"ALTER TABLE forums DROP COLUMN {column}"))
+		# the upgrade runs when the bot starts, with new connections.
+		engine.dispose()
+
+		upgrade_bot_database()
+
+		columns = {column["name"] for column in inspect(engine).get_columns("forums")}
+		self.assertTrue({"blacklist_whole_words", "duplicate_threshold", "duplicate_scope"} <= columns)
+		forum = ForumTransactions().get(self.channel_id)
+		self.assertFalse(forum.blacklist_whole_words)
+		self.assertEqual(0.7, forum.duplicate_threshold)
+		self.assertEqual("AUTHOR", forum.duplicate_scope)
+
+	def test_adds_missing_unique_constraints(self) :
+		# a config table from before the constraint, with a key that was stored twice.
+		legacy = Table("config", MetaData(), Column("id", Integer, primary_key=True, autoincrement=True),
+		               Column("guild", BigInteger), Column("key", String(512)), Column("value", String(1980)))
+		with engine.begin() as connection :
+			Config.__table__.drop(connection)
+			legacy.create(connection)
+			for value in ("1", "2") :
+				connection.execute(legacy.insert().values(guild=self.guild_id, key="MODCHANNEL", value=value))
+			connection.execute(legacy.insert().values(guild=self.guild_id, key="OTHER", value="3"))
+		engine.dispose()
+
+		upgrade_bot_database()
+
+		self.assertIn(("guild", "key"), self.unique_keys("config"))
+		self.assertEqual(["2", "3"], sorted(row.value for row in ConfigTransactions().server_config_get(self.guild_id)))
+		ConfigTransactions().config_unique_add(self.guild_id, "modchannel", "4", overwrite=True)
+		self.assertEqual("4", ConfigTransactions().config_unique_get(self.guild_id, "modchannel"))
+		self.assertEqual(2, len(ConfigTransactions().server_config_get(self.guild_id)))
+
+	def test_upgrade_is_idempotent(self) :
+		before = {table.name : sorted(self.unique_keys(table.name)) for table in Base.metadata.sorted_tables}
+
+		upgrade_bot_database()
+		engine.dispose()
+		upgrade_bot_database()
+
+		self.assertEqual(before, {table.name : sorted(self.unique_keys(table.name)) for table in Base.metadata.sorted_tables})
+		self.assertIn(("forum_id",), before["forum_cleanup"])
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import discord
+
+from classes.kernel.DurableQueue import DurableQueue
+from classes.kernel.Queue import Queue
+from data.enums.QueueTaskStatus import QueueTaskStatus
+from database.database import create_bot_database, drop_bot_database
+from database.transactions.QueueTransactions import QueueTransactions
+
+
+class TestDurableQueue(unittest.IsolatedAsyncioTestCase) :
+	guild_id = 123456789012345678
+	forum_id = 192837465564738291
+
+	async def asyncSetUp(self) :
+		create_bot_database()
+		self.calls = []
+		self.failures = 0
+		self.durable = DurableQueue()
+		self.durable.enabled = True
+		self.durable.attach(object())
+		self.durable.register("test.call", self.handler)
+		self.queue = Queue()
+		self.queue.stop()
+		self.queue.clear()
+
+	async def asyncTearDown(self) :
+		self.queue.stop()
+		self.queue.clear()
+		if self.durable.flushing is not None :
+			await self.durable.flushing
+		await asyncio.gather(*self.durable.background)
+		DurableQueue.handlers.pop("test.call")
+		self.durable.bot = None
+		drop_bot_database()
+
+	async def handler(self, bot, name: str) :
+		if self.failures :
+			self.failures -= 1
+			raise RuntimeError("failed")
+		self.calls.append(name)
+
+	def store(self, name: str) :
+		return self.durable.store("test.call", {"name" : name}, 1, self.guild_id, None, self.forum_id, f"purge:{self.forum_id}")
+
+	async def test_tasks_are_written_together(self) :
+		with patch.object(QueueTransactions, "add_many", wraps=QueueTransactions().add_many) as add_many :
+			tasks = [self.store(str(number)) for number in range(3)]
+			self.assertTrue(all(task.id is None for task in tasks))
+			await self.durable.flushing
+
+		add_many.assert_called_once()
+		stored = QueueTransactions().get(tasks[0].id)
+		self.assertEqual(self.forum_id, stored.forum_id)
+		self.assertEqual(f"purge:{self.forum_id}", stored.job)
+
+		await self.durable.execute(tasks[0])
+		self.assertEqual(["0"], self.calls)
+		self.assertIsNone(QueueTransactions().get(tasks[0].id))
+
+	async def test_execute_waits_for_the_write(self) :
+		task = self.store("first")
+		await self.durable.execute(task)
+
+		self.assertEqual(["first"], self.calls)
+		self.assertIsNone(QueueTransactions().get(task.id))
+
+	async def test_cancelled_tasks_are_not_written(self) :
+		cancelled, kept = self.store("cancelled"), self.store("kept")
+		self.durable.cancel(cancelled)
+		await self.durable.flushing
+		await self.durable.execute(cancelled)
+
+		self.assertIsNone(cancelled.id)
+		self.assertEqual([kept.id], [task.id for task in QueueTransactions().get_pending()])
+		self.assertEqual([], self.calls)
+
+	async def test_retries_keep_their_tags(self) :
+		self.failures = 1
+		task = self.store("retried")
+		with patch.object(DurableQueue, "backoff", return_value=0) :
+			with self.assertRaises(RuntimeError) :
+				await self.durable.execute(task)
+		await asyncio.sleep(0.01)
+
+		self.assertEqual(QueueTaskStatus.PENDING, QueueTransactions().get(task.id).status)
+		self.assertEqual(1, self.queue.cancel(forum=self.forum_id))
+		await asyncio.gather(*self.durable.background)
+		self.assertIsNone(QueueTransactions().get(task.id))
+
+	async def test_bulk_deletes_are_stored(self) :
+		channel = SimpleNamespace(id=1)
+		messages = [SimpleNamespace(id=discord.utils.time_snowflake(discord.utils.utcnow()) + number, channel=channel)
+		            for number in range(3)]
+		self.queue.add_message_delete(messages[0], guild=self.guild_id, forum=self.forum_id)
+		await self.durable.flushing
+		for message in messages[1:] + messages[:1] :
+			self.queue.add_message_delete(message, guild=self.guild_id, forum=self.forum_id)
+		await self.durable.flushing
+
+		stored = QueueTransactions().get_pending()
+		self.assertEqual(["message.bulk_delete"], [task.task_type for task in stored])
+		self.assertEqual({"channel_id" : 1, "message_ids" : [message.id for message in messages]}, json.loads(stored[0].payload))
+		self.assertEqual(self.forum_id, stored[0].forum_id)
+
+	async def test_report_lists_the_dead_letters(self) :
+		task = self.store("dead")
+		await self.durable.flushing
+		QueueTransactions().dead(task.id, "forbidden")
+
+		report = self.durable.report()
+		self.assertIn(f"{QueueTaskStatus.DEAD}: 1", report)
+		self.assertIn(f"Dead {task.id} (test.call, guild {self.guild_id}) after 1 attempts: forbidden", report)
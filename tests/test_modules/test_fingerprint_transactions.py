@@ -0,0 +1,53 @@
+import unittest
+
+from database.database import ThreadFingerprints, create_bot_database, drop_bot_database
+from database.transactions.FingerprintTransactions import FingerprintTransactions
+from database.transactions.ForumTransactions import ForumTransactions
+
+
+class TestFingerprintTransactions(unittest.TestCase) :
+	fingerprintclass = FingerprintTransactions()
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+	owner_id = 987654321098765432
+	thread_id = 564738291192837465
+
+	def setUp(self) :
+		create_bot_database()
+		ForumTransactions().add(
+			channel_id=self.channel_id,
+			server_id=self.guild_id,
+			name="Test Forum Channel",
+		)
+
+	def tearDown(self) :
+		drop_bot_database()
+
+	def test_add_fingerprint(self) :
+		self.fingerprintclass.add(self.thread_id, self.channel_id, self.owner_id, "looking for a group")
+		fingerprint = self.fingerprintclass.get(self.thread_id)
+
+		self.assertEqual("looking for a group", fingerprint.content)
+		self.assertEqual(self.owner_id, fingerprint.owner_id)
+
+		# adding the same thread again overwrites the content
+		self.fingerprintclass.add(self.thread_id, self.channel_id, self.owner_id, "edited")
+		self.assertEqual("edited", self.fingerprintclass.get(self.thread_id).content)
+
+	def test_add_many_and_get_ids(self) :
+		self.fingerprintclass.add(self.thread_id, self.channel_id, self.owner_id, "first")
+		self.fingerprintclass.add_many([
+			ThreadFingerprints(id=self.thread_id, forum_id=self.channel_id, owner_id=self.owner_id, content="replaced"),
+			ThreadFingerprints(id=self.thread_id + 1, forum_id=self.channel_id, owner_id=self.owner_id, content="second"),
+		])
+
+		self.assertEqual({self.thread_id, self.thread_id + 1}, self.fingerprintclass.get_ids(self.channel_id))
+		self.assertEqual("replaced", self.fingerprintclass.get(self.thread_id).content)
+		self.assertEqual(set(), self.fingerprintclass.get_ids(12345))
+
+	def test_delete_fingerprint(self) :
+		self.fingerprintclass.add(self.thread_id, self.channel_id, self.owner_id, "first")
+
+		self.assertTrue(self.fingerprintclass.delete(self.thread_id))
+		self.assertIsNone(self.fingerprintclass.get(self.thread_id))
+		self.assertFalse(self.fingerprintclass.delete(self.thread_id))
@@ -0,0 +1,66 @@
+import unittest
+
+from classes.discordcontrollers.forum.AutoMod import AutoMod
+from classes.discordcontrollers.forum.ForumRuleSet import ForumRuleSet
+from data.enums.PatternTypes import ForumPatterns
+from database.database import create_bot_database, drop_bot_database
+from database.transactions.ForumTransactions import ForumTransactions
+
+
+class TestForumRuleSet(unittest.TestCase) :
+	guild_id = 123456789012345678
+	channel_id = 192837465564738291
+
+	def setUp(self) :
+		create_bot_database()
+		ForumTransactions().add(channel_id=self.channel_id, server_id=self.guild_id, name="Test Forum Channel")
+		AutoMod()._rules = {}
+
+	def tearDown(self) :
+		AutoMod()._rules = {}
+		drop_bot_database()
+
+	def test_compiles_the_forum_rules(self) :
+		ForumTransactions().add_pattern(self.channel_id, "spam", "spam", ForumPatterns.blacklist)
+		ForumTransactions().add_pattern(self.channel_id, "links", r"https?://", ForumPatterns.block)
+		ForumTransactions().add_pattern(self.channel_id, "price", r"price:", ForumPatterns.required)
+		ForumTransactions().add_pattern(self.channel_id, "broken", r"(unclosed", ForumPatterns.warn)
+
+		rules = ForumRuleSet(ForumTransactions().get(self.channel_id))
+
+		self.assertEqual(self.channel_id, rules.forum_id)
+		self.assertEqual(0, rules.minimum_characters)
+		self.assertEqual(["spam"], [hit.word for hit in rules.blacklist.search("this is spam")])
+		# the invalid pattern is skipped, the others are compiled.
+		self.assertEqual(["links", "price"], [rule.name for rule in rules.patterns.rules])
+		self.assertEqual(["price"], [rule.name for rule in rules.required])
+
+	def test_rules_are_cached_until_refreshed(self) :
+		rules = AutoMod().get_rules(self.channel_id)
+		self.assertIs(rules, AutoMod().get_rules(self.channel_id))
+
+		ForumTransactions().add_pattern(self.channel_id, "links", r"https?://", ForumPatterns.block)
+		self.assertEqual([], AutoMod().get_rules(self.channel_id).patterns.rules)
+
+		refreshed = AutoMod().refresh_rules(self.channel_id)
+		self.assertIs(refreshed, AutoMod().get_rules(self.channel_id))
+		self.assertGreater(refreshed.version, rules.version)
+		self.assertEqual(["links"], [rule.name for rule in refreshed.patterns.rules])
+
+	def test_refresh_of_a_removed_forum(self) :
+		AutoMod().get_rules(self.channel_id)
+		ForumTransactions().delete(self.channel_id)
+
+		self.assertIsNone(AutoMod().refresh_rules(self.channel_id))
+		self.assertNotIn(self.channel_id, AutoMod()._rules)
+
+	def test_clear_cache_keeps_the_rules_of_watched_forums(self) :
+		AutoMod().watched.add(self.channel_id)
+		rules = AutoMod().get_rules(self.channel_id)
+		AutoMod()._rules[1] = rules
+
+		AutoMod().clear_cache()
+
+		self.assertIs(rules, AutoMod().get_rules(self.channel_id))
+		self.assertNotIn(1, AutoMod()._rules)
+		AutoMod().watched.discard(self.channel_id)
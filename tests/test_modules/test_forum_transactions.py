@@ -1,6 +1,7 @@
 import unittest
 
 from database.database import create_bot_database, drop_bot_database
+from database.transactions.ForumCleanupTransactions import ForumCleanupTransactions
 from database.transactions.ForumTransactions import ForumTransactions
 
 
@@ -74,3 +75,21 @@ class TestForumTransactions(unittest.TestCase) :
 
 		self.assertEqual(pattern, forum.patterns[0].pattern)
 		self.assertEqual(1, len(forum.patterns))
+
+	def test_get_all_with_rules(self) :
+		channel2 = 564738291192837465
+		self.forumclass.add(channel_id=self.channel_id, server_id=self.guild_id, name="Test Forum Channel")
+		self.forumclass.add(channel_id=channel2, server_id=self.guild_id, name="Test Forum Channel 2")
+		self.forumclass.add_pattern(channel_id=self.channel_id, name="Help pattern", pattern=".*help.*")
+		self.forumclass.add_pattern(channel_id=self.channel_id, name="Other pattern", pattern=".*other.*")
+		ForumCleanupTransactions().add(channel2, "CLEANUPDAYS", days=30)
+
+		forums = {forum.id : forum for forum in self.forumclass.get_all_with_rules()}
+
+		self.assertEqual(2, len(forums))
+		self.assertEqual(2, len(forums[self.channel_id].patterns))
+		self.assertEqual([], forums[self.channel_id].cleanup)
+		self.assertEqual(30, forums[channel2].cleanup[0].days)
+		# the cleanup rules aren't loaded for the automod rules.
+		forums = {forum.id : forum for forum in self.forumclass.get_all_with_rules(cleanup=False)}
+		self.assertEqual(2, len(forums[self.channel_id].patterns))
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+from classes.support.MinHash import MinHashIndex
+
+
+class TestMinHashIndex(unittest.TestCase) :
+	post = "looking for a long term roleplay partner, i like fantasy and scifi, dm me if interested"
+
+	def test_finds_near_duplicate(self) :
+		index = MinHashIndex()
+		index.add(1, self.post, "first")
+		index.add(2, "selling my old graphics card, only used for a year, send me an offer", "second")
+
+		candidates = index.query(self.post.replace("fantasy", "horror") + " thanks!")
+		self.assertEqual([(1, "first")], candidates)
+
+	def test_unrelated_text_has_no_candidates(self) :
+		index = MinHashIndex()
+		index.add(1, self.post)
+
+		self.assertEqual([], index.query("what is everyone's favourite pizza topping?"))
+
+	def test_remove_and_replace(self) :
+		index = MinHashIndex()
+		index.add(1, self.post)
+		index.add(1, "completely different text about gardening")
+
+		self.assertEqual(1, len(index))
+		self.assertEqual([], index.query(self.post))
+		self.assertTrue(index.remove(1))
+		self.assertFalse(index.remove(1))
+		self.assertEqual(0, len(index))
+
+	def test_stored_signatures(self) :
+		index = MinHashIndex()
+		signature = index.signature(self.post)
+		packed = index.pack(signature)
+
+		self.assertEqual(signature, index.unpack(packed))
+		index.add_signature(1, index.unpack(packed), "first")
+		self.assertEqual([(1, "first")], index.query(self.post))
+		self.assertEqual([(1, "first")], index.query_signature(signature))
+		# a signature made with other settings is calculated again.
+		self.assertIsNone(MinHashIndex(shingle_size=3).unpack(packed))
+		self.assertIsNone(index.unpack(packed[4 :]))
+
+	def test_unrelated_texts_share_few_buckets(self) :
+		words = ("the a and to of in is it you that for on with are this be have i my me we your can if just not so but looking "
+		         "selling buying game server friends play roleplay partner art commission price offer dm message new old long term "
+		         "short story character fantasy scifi horror welcome join community discord channel help need want like love time "
+		         "day week year people anyone someone please thanks hello hi interested free paid good great best first last open "
+		         "closed slots available request requests style color colour drawing design logo").split()
+		generator = random.Random(1)
+		index = MinHashIndex()
+		for key in range(1000) :
+			index.add(key, " ".join(generator.choice(words) for _ in range(generator.randint(15, 40))))
+
+		candidates = [len(index.query(" ".join(generator.choice(words) for _ in range(30)))) for _ in range(50)]
+		self.assertLessEqual(max(candidates), 10)
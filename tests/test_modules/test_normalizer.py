@@ -0,0 +1,21 @@
+import unittest
+
+from classes.support.Normalizer import Normalizer
+
+
+class TestNormalizer(unittest.TestCase) :
+
+	def test_obfuscated_words(self) :
+		for text in ["ѕ*p*a​m", "ＳＰＡＭ", "s̷p̷a̷m̷", "𝐬𝐩𝐚𝐦", "||sp||am"] :
+			self.assertEqual("spam", Normalizer.normalize(text).text, text)
+
+	def test_expanding_characters(self) :
+		self.assertEqual("strasse", Normalizer.normalize("Straße").text)
+
+	def test_original_span(self) :
+		normalized = Normalizer.normalize("buy **ЅPAM** now")
+		start = normalized.text.index("spam")
+
+		self.assertEqual("ЅPAM", normalized.original_span(start, start + 4))
+		self.assertEqual("", normalized.original_span(3, 3))
+
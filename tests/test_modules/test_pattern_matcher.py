@@ -0,0 +1,38 @@
+import unittest
+
+from classes.support.PatternMatcher import PatternMatcher, PatternRule
+
+
+class TestPatternMatcher(unittest.TestCase) :
+
+	def test_matches_every_rule_in_one_pass(self) :
+		links = PatternRule(1, "links", "BLOCK", r"https?://")
+		price = PatternRule(2, "price", "REQUIRED", r"price:\s*\d+")
+		swear = PatternRule(3, "swear", "WARN", r"darn")
+		matcher = PatternMatcher([links, price, swear])
+
+		self.assertEqual([links, price], matcher.match("Price: 10, see HTTPS://example.com"))
+		self.assertEqual([swear], matcher.match("darn"))
+		self.assertEqual([], matcher.match("nothing to see here"))
+		self.assertEqual([price], matcher.of_type("REQUIRED"))
+
+	def test_invalid_patterns_are_skipped(self) :
+		valid = PatternRule(2, "valid", "BLOCK", r"spam")
+		matcher = PatternMatcher([PatternRule(1, "broken", "BLOCK", r"(unclosed"), valid])
+
+		self.assertEqual([valid], matcher.rules)
+		self.assertEqual([valid], matcher.match("spam"))
+		self.assertEqual([], PatternMatcher([]).match("spam"))
+
+	def test_matched_span(self) :
+		first = PatternRule(1, "first", "BLOCK", r"b+")
+		second = PatternRule(2, "second", "WARN", r"c+")
+		# the same rule can be stored more than once, every copy still reports its own match.
+		matcher = PatternMatcher([first, second, first, second])
+		content = "aabbbcc"
+
+		self.assertEqual((2, 5), matcher.matched_span(first, content))
+		self.assertEqual((5, 7), matcher.matched_span(second, content))
+		self.assertEqual((5, 7), matcher.matched_span(matcher.rules[3], content))
+		self.assertEqual("bbb", matcher.matched_text(matcher.rules[2], content))
+		self.assertEqual((0, 0), matcher.matched_span(first, "no match"))
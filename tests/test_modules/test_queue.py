@@ -0,0 +1,324 @@
+import asyncio
+import unittest
+from datetime import timedelta
+from types import SimpleNamespace
+
+import discord
+
+from classes.kernel.Queue import Queue
+
+
+class TestQueue(unittest.IsolatedAsyncioTestCase) :
+
+	async def asyncSetUp(self) :
+		self.queue = Queue()
+		self.queue.stop()
+		self.queue.clear()
+
+	async def asyncTearDown(self) :
+		self.queue.stop()
+		self.queue.clear()
+		self.queue.expired.clear()
+
+	async def test_workers_run_tasks_concurrently(self) :
+		running = []
+		peak = []
+
+		async def task() :
+			running.append(1)
+			peak.append(len(running))
+			await asyncio.sleep(0.05)
+			running.pop()
+
+		self.queue.start(4)
+		for _ in range(8) :
+			self.queue.add(task)
+		await asyncio.sleep(0.2)
+
+		self.assertTrue(self.queue.empty())
+		self.assertEqual(4, max(peak))
+
+	async def test_priority_order(self) :
+		order = []
+
+		async def task(name) :
+			order.append(name)
+
+		self.queue.add(task, "low", priority=0)
+		self.queue.add(task, "normal", priority=1)
+		self.queue.add(task, "high", priority=2)
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual(["high", "normal", "low"], order)
+
+	async def test_buckets_serialize_and_parallelize(self) :
+		running: dict[int, int] = {}
+		peaks: dict[int, int] = {}
+
+		async def task(bucket) :
+			running[bucket] = running.get(bucket, 0) + 1
+			peaks[bucket] = max(peaks.get(bucket, 0), running[bucket])
+			await asyncio.sleep(0.02)
+			running[bucket] -= 1
+
+		self.queue.start(4)
+		for _ in range(3) :
+			for bucket in (1, 2) :
+				self.queue.add(task, bucket, bucket=bucket)
+		await asyncio.sleep(0.03)
+
+		# both buckets run at the same time, but never twice in the same bucket.
+		self.assertEqual({1 : 1, 2 : 1}, running)
+		await asyncio.sleep(0.1)
+		self.assertTrue(self.queue.empty())
+		self.assertEqual({1 : 1, 2 : 1}, peaks)
+
+	async def test_rate_limited_bucket_waits(self) :
+		done = []
+
+		async def task(name) :
+			done.append(name)
+
+		self.queue.buckets.observe("channel", {"X-RateLimit-Remaining" : "0", "X-RateLimit-Reset-After" : "0.1"})
+		self.queue.add(task, "limited", bucket="channel")
+		self.queue.add(task, "free", bucket="other")
+		self.queue.start(2)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual(["free"], done)
+		await asyncio.sleep(0.1)
+		self.assertEqual(["free", "limited"], done)
+
+	async def test_guilds_take_turns(self) :
+		order = []
+
+		async def task(guild) :
+			order.append(guild)
+
+		for _ in range(5) :
+			self.queue.add(task, "busy", guild=1)
+		self.queue.add(task, "quiet", guild=2)
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual("quiet", order[1])
+		self.assertEqual({}, self.queue.guild_depths())
+
+	async def test_guild_caps(self) :
+		self.queue.max_queued = 2
+		try :
+			async def task() :
+				pass
+
+			for _ in range(4) :
+				self.queue.add(task, guild=1)
+			self.queue.add(task, guild=2)
+
+			self.assertEqual({1 : 2, 2 : 1}, self.queue.guild_depths())
+			self.assertIn("1: 2 queued", self.queue.status())
+		finally :
+			self.queue.max_queued = 0
+
+	async def test_tasks_are_created_when_they_run(self) :
+		calls = []
+
+		async def task(name, suffix="") :
+			calls.append(name + suffix)
+
+		async def removed() :
+			calls.append("removed")
+
+		self.queue.add(task, "first", suffix="!")
+		self.queue.add(removed)
+		self.queue.remove(removed)
+
+		self.assertEqual([], calls)
+		self.assertEqual(1, len(self.queue.normal_priority_queue))
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual(["first!"], calls)
+
+	async def test_coroutines_can_not_have_arguments(self) :
+		async def task() :
+			pass
+
+		with self.assertRaises(TypeError) :
+			self.queue.add(task(), 0)
+
+	async def test_keyed_tasks_are_merged(self) :
+		calls = []
+
+		async def task(name) :
+			calls.append(name)
+
+		self.queue.add(task, "first", priority=0, key=("delete", 1))
+		self.queue.add(task, "duplicate", priority=2, key=("delete", 1))
+		self.queue.add(task, "other", priority=1)
+
+		self.assertEqual(0, len(self.queue.low_priority_queue))
+		self.assertEqual(1, len(self.queue.high_priority_queue))
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual(["first", "other"], calls)
+		self.assertEqual({}, self.queue.pending)
+
+	async def test_direct_messages_are_coalesced(self) :
+		user = SimpleNamespace(id=5)
+
+		self.queue.add_direct_message(user, "first")
+		self.queue.add_direct_message(user, "second")
+		self.queue.add_direct_message(SimpleNamespace(id=6), "other user")
+		self.queue.add_direct_message(user, "x" * 1990)
+
+		self.assertEqual(3, len(self.queue.normal_priority_queue))
+		self.assertEqual(["first", "second"], [entry for entry in self.queue.normal_priority_queue][0].args[1])
+
+	async def test_put_waits_for_room(self) :
+		high_water = self.queue.high_water
+		self.queue.high_water = {2 : 0, 1 : 0, 0 : 2}
+		try :
+			calls = []
+
+			async def task(name) :
+				calls.append(name)
+
+			async def producer() :
+				for number in range(5) :
+					await self.queue.put(task, number, priority=0)
+
+			producing = asyncio.create_task(producer())
+			await asyncio.sleep(0.01)
+			self.assertEqual(2, len(self.queue.low_priority_queue))
+			self.assertEqual(1, self.queue.producers())
+			# the reserved lane is never held up by the bulk producer.
+			self.queue.add(task, "notification", priority=2)
+
+			self.queue.start(1)
+			await asyncio.wait_for(producing, 1)
+			await asyncio.sleep(0.05)
+
+			self.assertEqual(["notification", 0, 1, 2, 3, 4], calls)
+		finally :
+			self.queue.high_water = high_water
+
+	async def test_last_worker_does_not_wait(self) :
+		high_water = self.queue.high_water
+		self.queue.high_water = {2 : 0, 1 : 0, 0 : 1}
+		try :
+			calls = []
+
+			async def task(number) :
+				calls.append(number)
+
+			async def producer() :
+				for number in range(3) :
+					await self.queue.put(task, number, priority=0)
+
+			self.queue.add(producer, priority=2)
+			self.queue.start(1)
+			await asyncio.sleep(0.05)
+
+			self.assertEqual([0, 1, 2], calls)
+		finally :
+			self.queue.high_water = high_water
+
+	async def test_expired_tasks_are_dropped(self) :
+		calls = []
+
+		async def notify(name) :
+			calls.append(name)
+
+		self.queue.add(notify, "late", ttl=0.01)
+		self.queue.add(notify, "merged", ttl=0.01, key=("log", 1))
+		self.queue.add(notify, "merged", ttl=10, key=("log", 1))
+		self.queue.add(notify, "no deadline")
+		await asyncio.sleep(0.02)
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual(["merged", "no deadline"], calls)
+		self.assertEqual(1, self.queue.expired[notify.__qualname__])
+		self.assertIn("Expired:", self.queue.status())
+
+	async def test_message_deletes_are_batched(self) :
+		bulk = []
+		single = []
+
+		async def delete_messages(messages) :
+			bulk.append([message.id for message in messages])
+
+		channel = SimpleNamespace(id=1, delete_messages=delete_messages)
+
+		def message(age: timedelta, offset: int) :
+			message_id = discord.utils.time_snowflake(discord.utils.utcnow() - age) + offset
+
+			async def delete() :
+				single.append(message_id)
+
+			return SimpleNamespace(id=message_id, channel=channel, delete=delete)
+
+		messages = [message(timedelta(hours=1), number) for number in range(150)]
+		for queued in messages + messages[-5:] :
+			self.queue.add_message_delete(queued)
+		old = message(timedelta(days=20), 0)
+		self.queue.add_message_delete(old)
+
+		self.assertEqual(3, len(self.queue.low_priority_queue))
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual([100, 50], [len(ids) for ids in bulk])
+		self.assertEqual([old.id], single)
+
+	async def test_cancel_by_tag(self) :
+		calls = []
+
+		async def task(name) :
+			calls.append(name)
+
+		self.queue.add(task, "purge", guild=1, forum=10, job="purge:10", bucket=10)
+		self.queue.add(task, "purge", guild=1, forum=10, job="purge:10", bucket=10)
+		# the second task of the bucket is parked behind the first.
+		self.queue.process()
+		self.queue.process()
+		self.queue.add(task, "cleanup", guild=1, forum=11, priority=0)
+		self.queue.add(task, "other guild", guild=2, forum=20, key=("delete", 20))
+
+		self.assertEqual(2, self.queue.cancel(job="purge:10"))
+		self.assertEqual(1, self.queue.cancel(guild=1))
+		self.assertEqual(0, self.queue.cancel(forum=10))
+		self.assertEqual({2 : 1}, self.queue.guild_depths())
+		self.queue.free(10)
+		self.queue.in_flight.clear()
+		self.queue.start(1)
+		await asyncio.sleep(0.05)
+
+		self.assertEqual(["other guild"], calls)
+		self.assertEqual({}, self.queue.tagged)
+		self.assertEqual({}, self.queue.pending)
+
+	async def test_estimates_use_measured_durations(self) :
+		async def slow() :
+			await asyncio.sleep(0.05)
+
+		async def fast() :
+			pass
+
+		self.queue.start(1)
+		self.queue.add(slow)
+		self.queue.add(fast)
+		await asyncio.sleep(0.1)
+		self.queue.stop()
+
+		for _ in range(10) :
+			self.queue.add(slow, guild=1)
+		self.queue.add(fast, priority=2, guild=2)
+
+		self.assertAlmostEqual(0.5, self.queue.get_queue_time(), delta=0.1)
+		self.assertLess(self.queue.get_queue_time(2), 0.01)
+		# guild 2 only waits for its own task, guild 1 for everything.
+		self.assertLess(self.queue.get_queue_time(guild=2), 0.01)
+		self.assertAlmostEqual(0.5, self.queue.get_queue_time(guild=1), delta=0.1)
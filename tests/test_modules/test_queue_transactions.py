@@ -0,0 +1,74 @@
+import unittest
+
+from data.enums.QueueTaskStatus import QueueTaskStatus
+from database.database import create_bot_database, drop_bot_database
+from database.transactions.QueueTransactions import QueueTransactions
+
+
+class TestQueueTransactions(unittest.TestCase) :
+	queueclass = QueueTransactions()
+	guild_id = 123456789012345678
+	thread_id = 564738291192837465
+
+	def setUp(self) :
+		create_bot_database()
+
+	def tearDown(self) :
+		drop_bot_database()
+
+	def add(self, priority: int = 1) :
+		task_id, = self.queueclass.add_many([{"task_type" : "thread.delete", "payload" : f'{{"thread_id": {self.thread_id}}}',
+		                                      "priority" : priority, "guild_id" : self.guild_id}])
+		return self.queueclass.get(task_id)
+
+	def test_add_task(self) :
+		task = self.add()
+		stored = self.queueclass.get(task.id)
+
+		self.assertEqual("thread.delete", stored.task_type)
+		self.assertEqual(QueueTaskStatus.PENDING, stored.status)
+		self.assertEqual(0, stored.attempts)
+
+	def test_lease_is_exclusive(self) :
+		task = self.add()
+
+		self.assertIsNotNone(self.queueclass.lease(task.id, 60))
+		self.assertIsNone(self.queueclass.lease(task.id, 60))
+		self.assertEqual(QueueTaskStatus.LEASED, self.queueclass.get(task.id).status)
+
+	def test_expired_lease_can_be_taken(self) :
+		task = self.add()
+		self.queueclass.lease(task.id, -1)
+
+		self.assertIsNotNone(self.queueclass.lease(task.id, 60))
+
+	def test_retry_and_dead_letter(self) :
+		task = self.add()
+		self.queueclass.lease(task.id, 60)
+		self.queueclass.retry(task.id, "server error", 5)
+		retried = self.queueclass.get(task.id)
+
+		self.assertEqual(QueueTaskStatus.PENDING, retried.status)
+		self.assertEqual(1, retried.attempts)
+		self.assertEqual("server error", retried.last_error)
+
+		self.queueclass.dead(task.id, "forbidden")
+
+		self.assertEqual(QueueTaskStatus.DEAD, self.queueclass.get(task.id).status)
+		self.assertEqual([task.id], [dead.id for dead in self.queueclass.get_dead()])
+		self.assertEqual([], self.queueclass.get_pending())
+
+	def test_release_leases_on_start_up(self) :
+		low = self.add(0)
+		high = self.add(2)
+		self.queueclass.lease(low.id, 60)
+
+		self.assertEqual(1, self.queueclass.release_leases())
+		self.assertEqual([high.id, low.id], [task.id for task in self.queueclass.get_pending()])
+		self.assertEqual({QueueTaskStatus.PENDING : 2}, self.queueclass.count())
+
+	def test_complete_task(self) :
+		task = self.add()
+
+		self.assertTrue(self.queueclass.complete(task.id))
+		self.assertIsNone(self.queueclass.get(task.id))
@@ -0,0 +1,28 @@
+import unittest
+import unittest.mock
+from types import SimpleNamespace
+
+from classes.discordcontrollers.forum.AutoMod import AutoMod
+from listeners.ThreadAutoMod import ThreadAutoMod
+
+
+class TestThreadAutoMod(unittest.IsolatedAsyncioTestCase) :
+	forum_id = 192837465564738291
+	thread_id = 564738291192837465
+
+	def setUp(self) :
+		self.watched = set(AutoMod().watched)
+		AutoMod().watched.add(self.forum_id)
+
+	def tearDown(self) :
+		AutoMod().watched.intersection_update(self.watched)
+
+	async def test_starter_messages_are_left_to_on_thread_create(self) :
+		thread = SimpleNamespace(id=self.thread_id, parent_id=self.forum_id)
+		with unittest.mock.patch.object(AutoMod, "run") as run :
+			await ThreadAutoMod(None).on_message(SimpleNamespace(id=self.thread_id, channel=thread))
+			run.assert_not_called()
+
+			reply = SimpleNamespace(id=self.thread_id + 1, channel=thread)
+			await ThreadAutoMod(None).on_message(reply)
+			run.assert_called_once_with(reply)
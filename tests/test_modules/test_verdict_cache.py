@@ -0,0 +1,39 @@
+import unittest
+
+from classes.discordcontrollers.forum.VerdictCache import VerdictCache
+
+
+class TestVerdictCache(unittest.TestCase) :
+	verdict = ("BLOCK", "blocked")
+
+	def test_reuses_the_verdict_of_unchanged_content(self) :
+		cache = VerdictCache()
+		signature = cache.signature("hello", 1, False)
+		cache.put(1, signature, self.verdict)
+
+		self.assertEqual(self.verdict, cache.get(1, cache.signature("hello", 1, False)))
+		self.assertIsNone(cache.get(1, cache.signature("hello, edited", 1, False)))
+		self.assertIsNone(cache.get(2, signature))
+		self.assertEqual(1, cache.hits)
+		self.assertEqual(2, cache.misses)
+
+	def test_rule_changes_invalidate_the_verdict(self) :
+		cache = VerdictCache()
+		cache.put(1, cache.signature("hello", 1, False), self.verdict)
+
+		# new rules get a new version, and premium enables more checks.
+		self.assertIsNone(cache.get(1, cache.signature("hello", 2, False)))
+		self.assertIsNone(cache.get(1, cache.signature("hello", 1, True)))
+
+	def test_evicts_the_least_recently_used(self) :
+		cache = VerdictCache(maxsize=2)
+		for message_id in (1, 2) :
+			cache.put(message_id, cache.signature("hello", 1, False), self.verdict)
+		# reading the first verdict makes the second one the oldest.
+		cache.get(1, cache.signature("hello", 1, False))
+		cache.put(3, cache.signature("hello", 1, False), self.verdict)
+
+		self.assertEqual(2, len(cache))
+		self.assertIsNone(cache.get(2, cache.signature("hello", 1, False)))
+		self.assertEqual(self.verdict, cache.get(1, cache.signature("hello", 1, False)))
+		self.assertEqual(self.verdict, cache.get(3, cache.signature("hello", 1, False)))